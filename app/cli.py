@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+"""
+Command line entry point for operational tasks
+
+usage:
+    python -m app.cli import doctor doctors.csv
+    python -m app.cli import patient patients.ndjson --batch-size 2000
+    python -m app.cli export doctor -o doctors.csv --with-hashes
+    python -m app.cli migrate
+    python -m app.cli purge-refresh-tokens
+    python -m app.cli run-jobs
+    python -m app.cli retry-failed-jobs image_variants
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+from app.engine import schema
+from app.engine.bulk import export_records, import_records, read_records
+from app.engine.db_storage import DBStorage
+from app.utils.jobs import job_queue, retry_failed_statement
+from app.utils.refresh_tokens import purge_statement
+
+
+def _format(path: str | None, fmt: str | None) -> str:
+    """picks the format from --format, else from the file extension"""
+    if fmt:
+        return fmt
+    if path and os.path.splitext(path)[1].lower() in (".ndjson", ".jsonl"):
+        return "ndjson"
+    return "csv"
+
+
+def run_import(args):
+    fmt = _format(args.file, args.format)
+    with open(args.file, newline="", encoding="utf-8") as stream:
+        report = import_records(
+            read_records(stream, fmt), args.role,
+            batch_size=args.batch_size, workers=args.workers,
+        )
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 1 if report["failed"] else 0
+
+
+def run_export(args):
+    fmt = _format(args.output, args.format)
+    out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for chunk in export_records(args.role, fmt, include_hashes=args.with_hashes):
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+def run_migrate(args):
+    schema.upgrade(args.revision)
+    return 0
+
+
+def run_purge_refresh_tokens(args):
+    DBStorage.init_engine()
+    with DBStorage.engine.begin() as conn:
+        deleted = conn.execute(purge_statement()).rowcount
+    print(f"deleted {deleted} expired refresh tokens")
+    return 0
+
+
+def run_jobs(args):
+    if args.workers:
+        job_queue.workers = args.workers
+
+    async def work():
+        await job_queue.start()
+        try:
+            # until interrupted
+            await asyncio.Event().wait()
+        finally:
+            await job_queue.stop()
+
+    try:
+        asyncio.run(work())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def run_retry_failed_jobs(args):
+    DBStorage.init_engine()
+    with DBStorage.engine.begin() as conn:
+        retried = conn.execute(retry_failed_statement(args.name)).rowcount
+    print(f"queued {retried} failed jobs again")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    imp = commands.add_parser("import", help="bulk create doctors or patients")
+    imp.add_argument("role", choices=["doctor", "patient"])
+    imp.add_argument("file")
+    imp.add_argument("--format", choices=["csv", "ndjson"])
+    imp.add_argument("--batch-size", type=int)
+    imp.add_argument("--workers", type=int, help="bcrypt worker processes")
+    imp.set_defaults(func=run_import)
+
+    exp = commands.add_parser("export", help="stream doctors or patients out")
+    exp.add_argument("role", choices=["doctor", "patient"])
+    exp.add_argument("-o", "--output", help="defaults to stdout")
+    exp.add_argument("--format", choices=["csv", "ndjson"])
+    exp.add_argument("--with-hashes", action="store_true",
+                     help="include password hashes so the file can be re-imported")
+    exp.set_defaults(func=run_export)
+
+    mig = commands.add_parser("migrate", help="apply pending schema migrations")
+    mig.add_argument("revision", nargs="?", default="head")
+    mig.set_defaults(func=run_migrate)
+
+    purge = commands.add_parser(
+        "purge-refresh-tokens", help="delete expired refresh tokens (run daily)"
+    )
+    purge.set_defaults(func=run_purge_refresh_tokens)
+
+    work = commands.add_parser(
+        "run-jobs", help="run background jobs without serving HTTP (e.g. JOBS_ENABLED=false on the API)"
+    )
+    work.add_argument("--workers", type=int, help="concurrent jobs, defaults to JOB_WORKERS")
+    work.set_defaults(func=run_jobs)
+
+    retry = commands.add_parser("retry-failed-jobs", help="give failed jobs a fresh set of attempts")
+    retry.add_argument("name", nargs="?", help="only the jobs of this name")
+    retry.set_defaults(func=run_retry_failed_jobs)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
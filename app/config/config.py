@@ -28,11 +28,100 @@ class Settings(BaseSettings):
     DB_HOST: str
     DB_PORT: str
 
+    # connection pool settings
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # connections each worker opens and primes before it reports ready
+    DB_POOL_PREWARM: int = 4
+    # serve the patient/doctor/auth routers on the asyncio engine
+    DB_ASYNC: bool = False
+    # refuse to start unless the database is at the newest migration
+    DB_SCHEMA_CHECK: bool = True
+    # read replicas for read-only routes: "host[:port],..." sharing the
+    # primary's credentials and database; empty reads from the primary
+    DB_REPLICA_HOSTS: str = ""
+    DB_REPLICA_MAX_LAG_SECONDS: int = 5
+    DB_REPLICA_CHECK_SECONDS: int = 5
+    # a client that wrote reads from the primary for this long afterwards
+    DB_READ_YOUR_WRITES_SECONDS: int = 10
+
+    # serve Prometheus metrics on /metrics and time every request
+    METRICS_ENABLED: bool = True
+    # debug/test mode checking each request's SQL: "off", "warn" or "raise"
+    QUERY_AUDIT: str = "off"
+    # distinct parameter sets of one statement in a request that count as N+1
+    QUERY_AUDIT_N_PLUS_ONE: int = 5
+
+    # blob storage settings
+    BLOB_STORE_BACKEND: str = "local"
+    BLOB_STORE_PATH: str = "media"
+
+    # profile image uploads and their resized variants (needs Pillow)
+    IMAGE_UPLOAD_MAX_BYTES: int = 5 * 1024 * 1024
+    IMAGE_AVATAR_SIZE: int = 512
+    IMAGE_THUMBNAIL_SIZE: int = 128
+    IMAGE_VARIANT_QUALITY: int = 80
+
     # JWT settings
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     REFRESH_TOKEN_EXPIRE_MINUTES: int
+    # a refresh token replayed later than this after its rotation counts as stolen
+    REFRESH_TOKEN_REUSE_GRACE_SECONDS: int = 10
+
+    # background jobs: claimed from the jobs table by every API process
+    JOBS_ENABLED: bool = True
+    JOB_WORKERS: int = 2
+    JOB_POLL_SECONDS: float = 1.0
+    JOB_MAX_ATTEMPTS: int = 5
+    JOB_BACKOFF_SECONDS: int = 5
+    JOB_BACKOFF_MAX_SECONDS: int = 600
+    # a running job not finished by then is presumed lost and run again
+    JOB_LEASE_SECONDS: int = 300
+
+    # bcrypt process pool; logins beyond max pending get a 429. Kept well
+    # below the request threadpool (40) and the DB pool (DB_POOL_SIZE +
+    # DB_MAX_OVERFLOW) so an auth burst cannot starve other routes
+    HASHER_WORKERS: int = 2
+    HASHER_MAX_PENDING: int = 8
+
+    # bulk onboarding
+    BULK_BATCH_SIZE: int = 1000
+    BULK_HASH_WORKERS: int = 4
+
+    # doctor search index
+    SEARCH_INDEX_REFRESH_SECONDS: int = 30
+    # re-read on every refresh, covering doctor edits committed late or
+    # stamped by an app host whose clock lags by up to this much
+    SEARCH_INDEX_OVERLAP_SECONDS: int = 60
+
+    # public doctor catalog response cache
+    CATALOG_CACHE_SIZE: int = 1000
+    CATALOG_CACHE_TTL: int = 30
+
+    # authenticated principal cache
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL: int = 60
+    # recently signed-in users loaded into the principal cache at startup
+    PRINCIPAL_PREWARM: int = 500
+
+    # how often each process pulls token revocations made by the others
+    TOKEN_VERSION_REFRESH_SECONDS: int = 30
+    # re-read on every poll, so a revocation committed late (or stamped by a
+    # lagging clock) is still seen; far longer than any revoking transaction
+    TOKEN_VERSION_OVERLAP_SECONDS: int = 60
+
+    # vitals: most buckets a series query returns, and the profile-card summary cache
+    VITALS_SERIES_POINTS: int = 200
+    VITALS_SERIES_MAX_POINTS: int = 1000
+    VITALS_SUMMARY_CACHE_SIZE: int = 10000
+    # a recording only invalidates its own worker's entry, so this bounds
+    # how long the other workers serve the previous summary
+    VITALS_SUMMARY_TTL: int = 15
 
     class Config:
         env_file = "../.env"
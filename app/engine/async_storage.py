@@ -0,0 +1,328 @@
+#!/usr/bin/env python
+"""
+Async counterpart of DBStorage built on SQLAlchemy's asyncio extension
+
+contains:
+    - class methods:
+        - init_engine: build the process-wide async engine and pool
+        - dispose_engine: close every pooled connection
+        - check_replicas: health-check the read replicas
+    - instance:
+        - find_one: first object matching the given criteria
+        - find_all: every object matching the given criteria
+        - find_by_id: object by primary key
+        - attach: bind a copy of a detached object without reloading it
+        - transaction: unit of work committed once for a whole block
+        - stage: add an object to the current unit of work
+        - execute: run an arbitrary statement
+        - add / update / delete: persist changes and commit
+        - commit / refresh / close
+
+    - attributes:
+        - engine
+        - session_factory
+        - replicas
+        - __session
+"""
+import logging
+import threading
+from contextlib import asynccontextmanager
+
+from app.config.config import settings
+from app.engine.db_storage import get_db_url, pool_options
+from app.engine.replicas import Replica, ReplicaSet, replica_hosts
+from app.engine.schema import check_schema
+from app.utils.metrics import TimedAsyncAdaptedQueuePool, instrument_engine
+from sqlalchemy import exc, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDBStorage:
+    """
+    Handles database operations on an asyncio engine so request handlers can
+    await the database instead of holding a threadpool slot.
+    """
+
+    engine = None
+    session_factory = None
+    replicas = ReplicaSet()
+    # whether this session reads from a replica, which may lag the primary
+    from_replica = False
+    __lock = threading.Lock()
+    __session = None
+
+    def __init__(self):
+        """Binds to the process-wide async engine, creating it on first use"""
+        if AsyncDBStorage.engine is None:
+            AsyncDBStorage.build_engine()
+        self.__session = None
+
+    @classmethod
+    def build_engine(cls):
+        """
+        Desc:
+            creates the async engine and session factory without connecting
+        """
+        with cls.__lock:
+            if cls.engine is not None:
+                return
+            engine = create_async_engine(
+                get_db_url("asyncpg"), poolclass=TimedAsyncAdaptedQueuePool, **pool_options()
+            )
+            instrument_engine(engine.sync_engine, "async")
+            cls.session_factory = sessionmaker(
+                bind=engine, class_=AsyncSession, expire_on_commit=False
+            )
+            cls.engine = engine
+
+            for i, (host, port) in enumerate(replica_hosts()):
+                replica = create_async_engine(
+                    get_db_url("asyncpg", host, port),
+                    poolclass=TimedAsyncAdaptedQueuePool, **pool_options()
+                )
+                instrument_engine(replica.sync_engine, f"async-replica-{i}")
+                cls.replicas.add(Replica(
+                    f"{host}:{port}", replica,
+                    sessionmaker(bind=replica, class_=AsyncSession, expire_on_commit=False),
+                    sync_engine=replica.sync_engine,
+                ))
+
+    @classmethod
+    async def init_engine(cls):
+        """
+        Desc:
+            builds the engine, verifies connectivity and the schema revision
+        """
+        cls.build_engine()
+        try:
+            async with cls.engine.connect() as conn:
+                if settings.DB_SCHEMA_CHECK:
+                    await conn.run_sync(check_schema)
+        except exc.SQLAlchemyError as e:
+            logger.error("Failed to connect to the database: %s", e)
+            raise
+        await cls.check_replicas()
+
+    @classmethod
+    async def check_replicas(cls):
+        """
+        Desc:
+            puts the replicas that answer and keep up in rotation and takes
+            the others out
+        """
+        await cls.replicas.check_async()
+
+    @classmethod
+    async def dispose_engine(cls):
+        """
+        Desc:
+            closes every pooled connection and forgets the engine
+        """
+        if cls.engine is not None:
+            await cls.engine.dispose()
+        for replica in cls.replicas.clear():
+            await replica.engine.dispose()
+        cls.engine = None
+        cls.session_factory = None
+
+    def setup_db(self, read_only: bool = False):
+        """
+        Desc:
+             checks a session out of the shared connection pool, or out of
+             a healthy replica's for read_only sessions
+        """
+        replica = self.replicas.pick() if read_only else None
+        factory = replica.session_factory if replica is not None else self.session_factory
+        self.__session = factory()
+        self.from_replica = replica is not None
+
+    async def execute(self, stmt):
+        """
+        Executes a statement in the current session.
+
+        Parameters:
+            stmt (Executable): A SQLAlchemy Core or ORM statement.
+
+        Returns:
+            Result: The SQLAlchemy result of the statement.
+        """
+        return await self.__session.execute(stmt)
+
+    async def find_one(self, cls, *criteria):
+        """
+        Retrieves the first object of cls matching every criterion.
+
+        Parameters:
+            cls (Base): The model class to query.
+            criteria: SQLAlchemy filter expressions.
+
+        Returns:
+            instance of cls: The retrieved object, or None if no object found.
+        """
+        result = await self.__session.execute(select(cls).filter(*criteria).limit(1))
+        return result.scalars().first()
+
+    async def find_all(self, cls, *criteria):
+        """
+        Retrieves every object of cls matching the given criteria.
+
+        Parameters:
+            cls (Base): The model class to query.
+            criteria: SQLAlchemy filter expressions.
+
+        Returns:
+            list: The retrieved objects.
+        """
+        result = await self.__session.execute(select(cls).filter(*criteria))
+        return result.scalars().all()
+
+    async def find_by_id(self, cls, id):
+        """
+        Retrieves an object by its ID.
+
+        Parameters:
+            cls (Base): The class of the object to retrieve.
+            id (str): The primary key of the object in the database.
+
+        Returns:
+            instance of cls: The retrieved object, or None if no object found.
+        """
+        return await self.__session.get(cls, id)
+
+    async def attach(self, obj):
+        """
+        Attaches a copy of a detached object (e.g. a cached principal) to the session
+        without reloading it, so it can be modified and saved.
+
+        Parameters:
+            obj (Base): A clean, detached instance.
+
+        Returns:
+            instance of obj's class: The session-bound copy; obj itself is left untouched.
+        """
+        return await self.__session.merge(obj, load=False)
+
+    def detach(self, obj):
+        """
+        Removes a loaded object, and the related objects loaded with it, from
+        the session, so it can outlive the session (e.g. in a cache) and a
+        later attach() merges into a fresh copy instead of handing it back.
+
+        Parameters:
+            obj (Base): A persistent instance of this session.
+        """
+        state = inspect(obj)
+        for relationship in state.mapper.relationships:
+            if relationship.key in state.unloaded:
+                continue
+            value = state.attrs[relationship.key].loaded_value
+            for related in value if relationship.uselist else [value]:
+                if related is not None and related in self.__session:
+                    self.__session.expunge(related)
+        self.__session.expunge(obj)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Unit of work for one request: objects staged or modified inside the
+        block are flushed together and committed once on exit. Only the
+        attributes that actually changed are written, so each row gets a
+        partial UPDATE. Any error rolls the whole block back.
+
+        Raises:
+            SQLAlchemyError: If the commit fails.
+        """
+        try:
+            yield self
+            await self.__session.commit()
+        except exc.SQLAlchemyError as e:
+            await self.__session.rollback()
+            logger.error("Failed to commit transaction: %s", e)
+            raise
+        except BaseException:
+            await self.__session.rollback()
+            raise
+
+    def stage(self, obj):
+        """
+        Adds an object to the session without committing; it is written by
+        the enclosing transaction().
+
+        Parameters:
+            obj (Base): An instance of a SQLAlchemy model.
+        """
+        self.__session.add(obj)
+
+    async def add(self, obj):
+        """
+        Adds a new object to the session and commits it to the database.
+
+        Parameters:
+            obj (Base): An instance of a SQLAlchemy model to be added to the database.
+
+        Raises:
+            SQLAlchemyError: If the database operation fails.
+        """
+        try:
+            self.__session.add(obj)
+            await self.__session.commit()
+        except exc.SQLAlchemyError as e:
+            await self.__session.rollback()
+            logger.error("Failed to add object to database: %s", e)
+            raise
+
+    async def delete(self, obj):
+        """
+        Removes an object from the session and the database.
+
+        Parameters:
+            obj (Base): An instance of a SQLAlchemy model to be deleted from the database.
+
+        Raises:
+            SQLAlchemyError: If the database operation fails.
+        """
+        try:
+            await self.__session.delete(obj)
+            await self.__session.commit()
+        except exc.SQLAlchemyError as e:
+            await self.__session.rollback()
+            logger.error("Failed to delete object from database: %s", e)
+            raise
+
+    async def update(self, obj):
+        """
+        Updates an existing object in the session and commits changes to the database.
+
+        Parameters:
+            obj (Base): An instance of a SQLAlchemy model that has been modified.
+
+        Raises:
+            SQLAlchemyError: If the database operation fails.
+        """
+        try:
+            await self.__session.merge(obj)
+            await self.__session.commit()
+        except exc.SQLAlchemyError as e:
+            await self.__session.rollback()
+            logger.error("Failed to update object in database: %s", e)
+            raise
+
+    async def commit(self):
+        """
+        Desc:
+            commit changes
+        """
+        await self.__session.commit()
+
+    async def refresh(self, obj):
+        await self.__session.refresh(obj)
+
+    async def close(self):
+        """
+        Desc:
+            closes the __session
+        """
+        await self.__session.close()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+"""
+Content-addressed blob storage for user uploaded media
+
+contains:
+    - BlobStore: interface every backend implements
+    - LocalBlobStore: keeps blobs on the local filesystem
+    - get_blob_store: returns the configured process-wide store
+    - media_url: public URL of a stored blob
+"""
+import hashlib
+from abc import ABC, abstractmethod
+import os
+import tempfile
+import threading
+
+from app.config.config import settings
+
+MEDIA_PREFIX = "/v1/media"
+CHUNK_SIZE = 64 * 1024
+
+
+def media_url(key: str | None) -> str | None:
+    """
+    Returns the URL a client can fetch a blob from, or None if there is no blob.
+    """
+    if not key:
+        return None
+    return f"{MEDIA_PREFIX}/{key}"
+
+
+class BlobStore(ABC):
+    """
+    Interface of a content-addressed blob store. Blobs are keyed by the
+    hex sha256 of their content, so writing the same bytes twice is a no-op
+    and a key never changes meaning.
+    """
+
+    @staticmethod
+    def key_for(data: bytes) -> str:
+        """returns the content hash used as the key of data"""
+        return hashlib.sha256(data).hexdigest()
+
+    @abstractmethod
+    def put(self, data: bytes) -> str:
+        """stores data and returns its key"""
+
+    def put_file(self, f) -> str:
+        """stores the rest of a binary file object and returns its key"""
+        return self.put(f.read())
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """checks whether a blob is stored under key"""
+
+    @abstractmethod
+    def open(self, key: str):
+        """returns a binary file object reading the blob"""
+
+    def path(self, key: str) -> str | None:
+        """returns a local filesystem path for the blob, if the backend has one"""
+        return None
+
+    @abstractmethod
+    def delete(self, key: str):
+        """removes the blob stored under key"""
+
+
+class LocalBlobStore(BlobStore):
+    """
+    Stores blobs as files under root, sharded by the first two bytes of
+    the key (root/ab/cd/abcd...).
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def put(self, data: bytes) -> str:
+        key = self.key_for(data)
+        path = self._path(key)
+        if os.path.exists(path):
+            return key
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write to a temp file first so readers never see a partial blob
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return key
+
+    def put_file(self, f) -> str:
+        # copied in chunks while hashing, so an upload is never held in memory
+        digest = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(dir=self.root)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    out.write(chunk)
+            key = digest.hexdigest()
+            path = self._path(key)
+            if os.path.exists(path):
+                os.unlink(tmp)
+                return key
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return key
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self._path(key))
+
+    def open(self, key: str):
+        return open(self._path(key), "rb")
+
+    def path(self, key: str) -> str | None:
+        return self._path(key)
+
+    def delete(self, key: str):
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+BACKENDS = {
+    "local": lambda: LocalBlobStore(settings.BLOB_STORE_PATH),
+}
+
+_store = None
+_lock = threading.Lock()
+
+
+def get_blob_store() -> BlobStore:
+    """
+    Returns the process-wide blob store selected by BLOB_STORE_BACKEND.
+    """
+    global _store
+    if _store is None:
+        with _lock:
+            if _store is None:
+                _store = BACKENDS[settings.BLOB_STORE_BACKEND]()
+    return _store
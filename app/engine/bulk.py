@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+"""
+Bulk onboarding of doctors and patients
+
+contains:
+    - read_records: parse a CSV or NDJSON stream into dicts
+    - import_records: validate, hash and insert records in batches
+    - export_records: stream doctors or patients out as CSV or NDJSON
+
+Each import batch costs one multi-row INSERT per table; rows that collide
+with an existing phone or email are skipped by ON CONFLICT DO NOTHING and
+reported, so one bad row never aborts the rest of the file.
+"""
+import csv
+import io
+import json
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from enum import Enum
+from itertools import islice
+
+from app.config.config import settings
+from app.engine.db_storage import DBStorage
+from app.models.doctor import Doctor
+from app.models.emergency_contact import EmergencyContact
+from app.models.patient import Patient
+from app.models.user import User
+from app.schema.bulk import ImportDoctor, ImportPatient, ImportUser
+from app.utils.hasher import bcrypt_hash
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+ROLES = {
+    "doctor": (Doctor, ImportDoctor),
+    "patient": (Patient, ImportPatient),
+}
+
+USER_FIELDS = ("first_name", "last_name", "email", "phone")
+SOS_FIELDS = ("SOS_fullname", "SOS_phone")
+
+# keeps the report bounded when a whole file is malformed
+MAX_REPORTED_ERRORS = 1000
+
+
+class HashPool:
+    """
+    The bcrypt processes shared by every import a server process runs, so
+    an import request does not pay for starting a pool of its own.
+
+    Created on first use, so each forked server worker gets its own pool.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.__executor = None
+        self.__lock = threading.Lock()
+
+    def get(self) -> ProcessPoolExecutor:
+        with self.__lock:
+            if self.__executor is None:
+                self.__executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self.__executor
+
+    def shutdown(self):
+        """stops the worker processes"""
+        with self.__lock:
+            if self.__executor is not None:
+                self.__executor.shutdown(wait=True)
+            self.__executor = None
+
+
+bulk_hash_pool = HashPool(settings.BULK_HASH_WORKERS)
+
+
+def detail_fields(schema) -> list:
+    """returns the role specific columns of an import schema"""
+    skip = set(ImportUser.__fields__) | set(SOS_FIELDS)
+    return [name for name in schema.__fields__ if name not in skip]
+
+
+def read_records(stream, fmt: str):
+    """
+    Parse a text stream into records.
+
+    Parameters:
+        stream (TextIO): The CSV or NDJSON input.
+        fmt (str): "csv" or "ndjson".
+
+    Returns:
+        Iterator[dict | ValueError]: One item per input row; unparsable
+        NDJSON lines are yielded as the ValueError so they can be reported
+        against their row number.
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"invalid JSON: {e}")
+
+
+def _fail(report: dict, row: int, msg: str):
+    report["failed"] += 1
+    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+        report["errors"].append({"row": row, "msg": msg})
+
+
+def _error_message(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in error.errors()
+        )
+    return str(error)
+
+
+def _insert_batch(role: str, valid: list, report: dict):
+    """
+    Insert one batch of validated (row, record, password_hash) tuples.
+    """
+    model, schema = ROLES[role]
+    fields = detail_fields(schema)
+    now = datetime.now()
+    rows = {}
+    users, details, contacts = [], [], []
+    for row, record, password_hash in valid:
+        id = str(uuid.uuid4())
+        rows[id] = row
+        users.append({
+            "id": id,
+            "created_at": now,
+            "updated_at": now,
+            "first_name": record.first_name,
+            "last_name": record.last_name,
+            "email": record.email.lower(),
+            "phone": record.phone,
+            "password_hash": password_hash,
+            "role": role,
+        })
+        details.append({"id": id, **{name: getattr(record, name) for name in fields}})
+        if role == "patient" and record.SOS_fullname and record.SOS_phone:
+            contacts.append({
+                "id": str(uuid.uuid4()),
+                "created_at": now,
+                "updated_at": now,
+                "full_name": record.SOS_fullname,
+                "phone": record.SOS_phone,
+                "patient_id": id,
+            })
+
+    users_table = User.__table__
+    with DBStorage.engine.begin() as conn:
+        stmt = (
+            insert(users_table)
+            .values(users)
+            .on_conflict_do_nothing()
+            .returning(users_table.c.id)
+        )
+        inserted = {id for (id,) in conn.execute(stmt)}
+        if inserted:
+            conn.execute(
+                insert(model.__table__), [d for d in details if d["id"] in inserted]
+            )
+            contacts = [c for c in contacts if c["patient_id"] in inserted]
+            if contacts:
+                conn.execute(insert(EmergencyContact.__table__), contacts)
+
+    report["inserted"] += len(inserted)
+    for id, row in rows.items():
+        if id not in inserted:
+            _fail(report, row, "user with this phone or email exists")
+
+
+def import_records(records, role: str, batch_size: int | None = None,
+                   workers: int | None = None, pool: ProcessPoolExecutor | None = None) -> dict:
+    """
+    Validate, hash and insert records as users of the given role.
+
+    Parameters:
+        records (Iterable[dict]): The rows, as produced by read_records.
+        role (str): "doctor" or "patient".
+        batch_size (int, optional): Rows per INSERT; defaults to BULK_BATCH_SIZE.
+        workers (int, optional): bcrypt processes; defaults to BULK_HASH_WORKERS.
+        pool (ProcessPoolExecutor, optional): Hash on this pool (e.g.
+            bulk_hash_pool.get()) instead of starting one for this import.
+
+    Returns:
+        dict: {"inserted": int, "failed": int, "errors": [{"row": int, "msg": str}]}
+    """
+    if pool is None:
+        with ProcessPoolExecutor(max_workers=workers or settings.BULK_HASH_WORKERS) as own:
+            return import_records(records, role, batch_size, pool=own)
+
+    _, schema = ROLES[role]
+    batch_size = batch_size or settings.BULK_BATCH_SIZE
+    report = {"inserted": 0, "failed": 0, "errors": []}
+    DBStorage.init_engine()
+
+    numbered = enumerate(records, start=1)
+    while True:
+        batch = list(islice(numbered, batch_size))
+        if not batch:
+            break
+        valid = []
+        for row, record in batch:
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                valid.append((row, schema.parse_obj(record)))
+            except ValueError as e:
+                _fail(report, row, _error_message(e))
+
+        # hash every plain password of the batch in parallel
+        plain = [r.password.get_secret_value() for _, r in valid if not r.password_hash]
+        hashes = iter(pool.map(bcrypt_hash, plain, chunksize=16))
+        hashed = [
+            (row, r, r.password_hash or next(hashes)) for row, r in valid
+        ]
+        if hashed:
+            _insert_batch(role, hashed, report)
+    return report
+
+
+def _plain(value):
+    """converts a column value to something csv and json can write"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def export_records(role: str, fmt: str, include_hashes: bool = False):
+    """
+    Stream every user of a role in the format import_records reads.
+
+    Parameters:
+        role (str): "doctor" or "patient".
+        fmt (str): "csv" or "ndjson".
+        include_hashes (bool): Also export password_hash so the file can be re-imported.
+
+    Returns:
+        Iterator[str]: The output one line at a time, CSV starting with its header.
+    """
+    model, schema = ROLES[role]
+    users_table = User.__table__
+    table = model.__table__
+    columns = [users_table.c[name] for name in USER_FIELDS]
+    columns += [table.c[name] for name in detail_fields(schema)]
+    if include_hashes:
+        columns.append(users_table.c.password_hash)
+    joined = users_table.join(table, table.c.id == users_table.c.id)
+    if role == "patient":
+        # the file holds one SOS contact per patient, as import reads it:
+        # the first one added, so a patient with several is exported once
+        contacts = EmergencyContact.__table__
+        first_contact = (
+            select(contacts.c.patient_id, contacts.c.full_name, contacts.c.phone)
+            .distinct(contacts.c.patient_id)
+            .order_by(contacts.c.patient_id, contacts.c.created_at)
+            .subquery()
+        )
+        columns += [
+            first_contact.c.full_name.label("SOS_fullname"),
+            first_contact.c.phone.label("SOS_phone"),
+        ]
+        joined = joined.outerjoin(first_contact, first_contact.c.patient_id == table.c.id)
+    stmt = (
+        select(*columns)
+        .select_from(joined)
+        .order_by(users_table.c.created_at, users_table.c.id)
+    )
+
+    DBStorage.init_engine()
+    with DBStorage.engine.connect() as conn:
+        result = conn.execution_options(stream_results=True).execute(stmt)
+        names = list(result.keys())
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(names)
+            yield buffer.getvalue()
+            for row in result:
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerow(["" if v is None else _plain(v) for v in row])
+                yield buffer.getvalue()
+        else:
+            for row in result:
+                yield json.dumps({k: _plain(v) for k, v in zip(names, row)}) + "\n"
@@ -3,8 +3,16 @@
 Class for sqlAlchemy that handles __session connections
 
 contains:
+    - class methods:
+        - init_engine: build the process-wide engine and connection pool
+        - dispose_engine: close every pooled connection
+        - check_replicas: health-check the read replicas
     - instance:
         - all: query objects from db
+        - execute: run a select() or other statement
+        - attach: bind a copy of a detached object without reloading it
+        - transaction: unit of work committed once for a whole block
+        - stage: add an object to the current unit of work
         - new: add objects to db
         - commit: commit __session
         - delete: remove __session from db
@@ -13,13 +21,23 @@ contains:
 
     - attributes:
         - engine
+        - session_factory
+        - replicas
         - __session
         - dic
 """
+import logging
+import threading
+from contextlib import contextmanager
+
 from app.config.config import settings
-from app.models.base_model import Base
-from sqlalchemy import create_engine, exc
-from sqlalchemy.orm import sessionmaker, scoped_session
+from app.engine.replicas import Replica, ReplicaSet, replica_hosts
+from app.engine.schema import check_schema
+from app.utils.metrics import TimedQueuePool, instrument_engine
+from sqlalchemy import create_engine, exc, inspect
+from sqlalchemy.orm import sessionmaker
+
+logger = logging.getLogger(__name__)
 
 
 def db_credentials_are_set():
@@ -27,40 +45,127 @@ def db_credentials_are_set():
     return all(getattr(settings, key) for key in required_keys)
 
 
-if not db_credentials_are_set():
-    """checks if DB credentials are set in the .env file"""
-    print("DB credentials are not set")
+def get_db_url(driver: str = "psycopg2", host: str | None = None, port: str | None = None) -> str:
+    """
+    Builds the database URL from the environment variables.
+
+    Parameters:
+        driver (str): The DBAPI driver name appended to the postgresql dialect.
+        host (str, optional): Another server, such as a read replica; defaults to DB_HOST.
+        port (str, optional): Its port; defaults to DB_PORT.
+
+    Returns:
+        str: The SQLAlchemy database URL.
+    """
+    DB_USER = settings.DB_USER
+    DB_PASSOWRD = settings.DB_PASSWORD
+    DB_HOST = host or settings.DB_HOST
+    DB_NAME = settings.DB_NAME
+    DB_PORT = port or settings.DB_PORT
+    return f"postgresql+{driver}://{DB_USER}:{DB_PASSOWRD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+
+def pool_options() -> dict:
+    """
+    Returns the connection pool keyword arguments shared by every engine.
+    """
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
 
 
 class DBStorage:
     """
     Handles database operations including connection setup and session management,
     utilizing environment variables for database credentials.
+
+    The engine and its connection pool are shared by the whole process and are
+    built once (normally from the application startup hook); each instance only
+    checks a session out of that pool. Read-only sessions are checked out of
+    a healthy read replica's pool instead, when DB_REPLICA_HOSTS names any.
     """
 
     engine = None
+    session_factory = None
+    replicas = ReplicaSet()
+    # whether this session reads from a replica, which may lag the primary
+    from_replica = False
+    __lock = threading.Lock()
     __session = None
 
     def __init__(self):
-        """Initializes a database engine connection using environment variables"""
-        DB_USER = settings.DB_USER
-        DB_PASSOWRD = settings.DB_PASSWORD
-        DB_HOST = settings.DB_HOST
-        DB_NAME = settings.DB_NAME
-        DB_PORT = settings.DB_PORT
-        DB_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASSOWRD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+        """Binds to the process-wide engine, creating it on first use"""
+        if DBStorage.engine is None:
+            DBStorage.init_engine()
+        self.__session = None
 
-        try:
-            self.engine = create_engine(DB_URL, pool_pre_ping=True)
-            # Attempt to connect to the database to verify that the engine is working.
-            with self.engine.connect() as conn:
-                pass
-        except exc.SQLAlchemyError as e:
-            print(f"Failed to connect to the database: {e}")
-            # manage the error appropriately
-            raise
+    @classmethod
+    def init_engine(cls):
+        """
+        Desc:
+            creates the process-wide engine and connection pool, verifies
+            connectivity and that the schema is at the migrations' head
+            revision. Safe to call repeatedly.
+        """
+        with cls.__lock:
+            if cls.engine is not None:
+                return
+            # checked here rather than at import, so importing the app
+            # (gunicorn --preload, the CLI, alembic) stays side-effect free
+            if not db_credentials_are_set():
+                logger.warning("DB credentials are not set")
+            try:
+                engine = create_engine(
+                    get_db_url(), poolclass=TimedQueuePool, **pool_options()
+                )
+                instrument_engine(engine, "sync")
+                # Attempt to connect to the database to verify that the engine is working.
+                with engine.connect() as conn:
+                    if settings.DB_SCHEMA_CHECK:
+                        check_schema(conn)
+            except exc.SQLAlchemyError as e:
+                logger.error("Failed to connect to the database: %s", e)
+                # manage the error appropriately
+                raise
+            cls.session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+            cls.engine = engine
+
+            for i, (host, port) in enumerate(replica_hosts()):
+                replica = create_engine(
+                    get_db_url(host=host, port=port), poolclass=TimedQueuePool, **pool_options()
+                )
+                instrument_engine(replica, f"sync-replica-{i}")
+                cls.replicas.add(Replica(
+                    f"{host}:{port}", replica, sessionmaker(bind=replica, expire_on_commit=False)
+                ))
+        cls.check_replicas()
+
+    @classmethod
+    def check_replicas(cls):
+        """
+        Desc:
+            puts the replicas that answer and keep up in rotation and takes
+            the others out
+        """
+        cls.replicas.check()
 
-        self.__session = None
+    @classmethod
+    def dispose_engine(cls):
+        """
+        Desc:
+            closes every pooled connection and forgets the engine
+        """
+        with cls.__lock:
+            if cls.engine is not None:
+                cls.engine.dispose()
+            for replica in cls.replicas.clear():
+                replica.engine.dispose()
+            cls.engine = None
+            cls.session_factory = None
 
     def all(self, cls=None):
         """
@@ -100,6 +205,18 @@ class DBStorage:
         """
         return self.__session.query(cls)
 
+    def execute(self, stmt):
+        """
+        Executes a statement in the current session.
+
+        Parameters:
+            stmt (Executable): A SQLAlchemy Core or ORM statement.
+
+        Returns:
+            Result: The SQLAlchemy result of the statement.
+        """
+        return self.__session.execute(stmt)
+
     def add(self, obj):
         """
         Adds a new object to the session and commits it to the database.
@@ -115,7 +232,7 @@ class DBStorage:
             self.__session.commit()
         except exc.SQLAlchemyError as e:
             self.__session.rollback()
-            print(f"Failed to add object to database: {e}")
+            logger.error("Failed to add object to database: %s", e)
             raise
 
     def delete(self, obj):
@@ -133,7 +250,7 @@ class DBStorage:
             self.__session.commit()
         except exc.SQLAlchemyError as e:
             self.__session.rollback()
-            print(f"Failed to delete object from database: {e}")
+            logger.error("Failed to delete object from database: %s", e)
             raise
 
     def update(self, obj):
@@ -151,8 +268,72 @@ class DBStorage:
             self.__session.commit()
         except exc.SQLAlchemyError as e:
             self.__session.rollback()
-            print(f"Failed to update object in database: {e}")
+            logger.error("Failed to update object in database: %s", e)
+            raise
+
+    def attach(self, obj):
+        """
+        Attaches a copy of a detached object (e.g. a cached principal) to the session
+        without reloading it, so it can be modified and saved.
+
+        Parameters:
+            obj (Base): A clean, detached instance.
+
+        Returns:
+            instance of obj's class: The session-bound copy; obj itself is left untouched.
+        """
+        return self.__session.merge(obj, load=False)
+
+    def detach(self, obj):
+        """
+        Removes a loaded object, and the related objects loaded with it, from
+        the session, so it can outlive the session (e.g. in a cache) and a
+        later attach() merges into a fresh copy instead of handing it back.
+
+        Parameters:
+            obj (Base): A persistent instance of this session.
+        """
+        state = inspect(obj)
+        for relationship in state.mapper.relationships:
+            if relationship.key in state.unloaded:
+                continue
+            value = state.attrs[relationship.key].loaded_value
+            for related in value if relationship.uselist else [value]:
+                if related is not None and related in self.__session:
+                    self.__session.expunge(related)
+        self.__session.expunge(obj)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Unit of work for one request: objects staged or modified inside the
+        block are flushed together and committed once on exit. Only the
+        attributes that actually changed are written, so each row gets a
+        partial UPDATE. Any error rolls the whole block back.
+
+        Raises:
+            SQLAlchemyError: If the commit fails.
+        """
+        try:
+            yield self
+            self.__session.commit()
+        except exc.SQLAlchemyError as e:
+            self.__session.rollback()
+            logger.error("Failed to commit transaction: %s", e)
             raise
+        except BaseException:
+            self.__session.rollback()
+            raise
+
+    def stage(self, obj):
+        """
+        Adds an object to the session without committing; it is written by
+        the enclosing transaction().
+
+        Parameters:
+            obj (Base): An instance of a SQLAlchemy model.
+        """
+        self.__session.add(obj)
 
     def find_by_id(self, cls, id):
         """
@@ -167,15 +348,17 @@ class DBStorage:
         """
         return self.__session.query(cls).get(id)
 
-    def setup_db(self):
+    def setup_db(self, read_only: bool = False):
         """
         Desc:
-             init/load connection
+             checks a session out of the shared connection pool, or out of
+             a healthy replica's for read_only sessions (the primary's if
+             none is healthy)
         """
-        Base.metadata.create_all(self.engine)
-        sec = sessionmaker(bind=self.engine, expire_on_commit=False)
-        Session = scoped_session(sec)
-        self.__session = Session()
+        replica = self.replicas.pick() if read_only else None
+        factory = replica.session_factory if replica is not None else self.session_factory
+        self.__session = factory()
+        self.from_replica = replica is not None
 
     def commit(self):
         """
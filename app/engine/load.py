@@ -1,11 +1,16 @@
 #!/usr/bin/env python
 
+from app.utils.consistency import reads_from_replica
+from fastapi import Request
+
+from .async_storage import AsyncDBStorage
 from .db_storage import DBStorage
 
 
 def load():
     """
-    Context manager to initialize and safely close the database connection.
+    Context manager to check a session out of the shared pool and
+    safely return it once the request is done.
     """
     db = DBStorage()
     db.setup_db()
@@ -13,3 +18,41 @@ def load():
         yield db
     finally:
         db.close()
+
+
+async def load_async():
+    """
+    Async context manager to check an AsyncSession out of the shared
+    async pool and safely return it once the request is done.
+    """
+    db = AsyncDBStorage()
+    db.setup_db()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+def load_read(request: Request):
+    """
+    Like load, for routes that only read: the session comes from a healthy
+    read replica unless the client wrote within DB_READ_YOUR_WRITES_SECONDS.
+    """
+    db = DBStorage()
+    db.setup_db(read_only=reads_from_replica(request))
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def load_read_async(request: Request):
+    """
+    Async variant of load_read.
+    """
+    db = AsyncDBStorage()
+    db.setup_db(read_only=reads_from_replica(request))
+    try:
+        yield db
+    finally:
+        await db.close()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+"""
+Read replicas that read-only sessions are routed to
+
+contains:
+    - replica_hosts: the (host, port) of every configured replica
+    - Replica: one replica's engine, session factory and health
+    - ReplicaSet: round-robin choice among the healthy replicas and their health checks
+"""
+import itertools
+import logging
+
+from app.config.config import settings
+from sqlalchemy import event, text
+
+logger = logging.getLogger(__name__)
+
+# a promoted replica (not in recovery) is always current; otherwise it is
+# current once it replayed everything it received while still streaming from
+# the primary, or when its last replayed transaction is close enough to now.
+# A standby cut off from the primary has both LSNs frozen and equal, so
+# caught_up alone proves nothing. pg_stat_wal_receiver hides status from
+# roles without pg_read_all_stats, which then fall back to the lag check
+HEALTH_STATEMENT = text(
+    "SELECT pg_is_in_recovery() AS in_recovery, "
+    "pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() AS caught_up, "
+    "EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') AS streaming, "
+    "EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) AS lag"
+)
+
+
+def replica_hosts() -> list:
+    """
+    Parses DB_REPLICA_HOSTS ("host[:port],...") into (host, port) pairs;
+    replicas share the primary's credentials, database and default port.
+    """
+    hosts = []
+    for entry in settings.DB_REPLICA_HOSTS.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        host, _, port = entry.partition(":")
+        hosts.append((host, port or settings.DB_PORT))
+    return hosts
+
+
+def is_current(row) -> bool:
+    """whether a HEALTH_STATEMENT row shows a replica fit to serve reads"""
+    if not row.in_recovery or (row.caught_up and row.streaming):
+        return True
+    return row.lag is not None and row.lag <= settings.DB_REPLICA_MAX_LAG_SECONDS
+
+
+class Replica:
+    """
+    One replica. It starts unhealthy and serves reads only once a health
+    check passed; a dropped connection takes it out until the next one does.
+    """
+
+    def __init__(self, name: str, engine, session_factory, sync_engine=None):
+        self.name = name
+        self.engine = engine
+        self.session_factory = session_factory
+        self.healthy = False
+        event.listen(sync_engine or engine, "handle_error", self._on_error)
+
+    def _on_error(self, context):
+        if context.is_disconnect and self.healthy:
+            logger.warning("Read replica %s disconnected, reading from the primary", self.name)
+            self.healthy = False
+
+
+class ReplicaSet:
+    """
+    The replicas of one engine flavour (sync or async).
+
+    pick() hands out the healthy replicas in turn and returns None when
+    there are none, in which case callers read from the primary.
+    """
+
+    def __init__(self):
+        self.replicas = []
+        self.__turn = itertools.count()
+
+    def __len__(self):
+        return len(self.replicas)
+
+    def add(self, replica: Replica):
+        self.replicas.append(replica)
+
+    def pick(self) -> Replica | None:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self.__turn) % len(healthy)]
+
+    def _mark(self, replica: Replica, healthy: bool, reason: str = ""):
+        if healthy != replica.healthy:
+            if healthy:
+                logger.info("Read replica %s is serving reads", replica.name)
+            else:
+                logger.warning("Read replica %s taken out of rotation: %s", replica.name, reason)
+        replica.healthy = healthy
+
+    def check(self):
+        """
+        Desc:
+            runs the health statement on every replica of a sync engine
+        """
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as conn:
+                    row = conn.execute(HEALTH_STATEMENT).one()
+            except Exception as e:
+                # asyncpg raises OSErrors such as ConnectionRefusedError
+                # unwrapped; one dead replica must not stop the others
+                self._mark(replica, False, str(e))
+                continue
+            self._mark(replica, is_current(row), "replication lag")
+
+    async def check_async(self):
+        """
+        Desc:
+            runs the health statement on every replica of an async engine
+        """
+        for replica in self.replicas:
+            try:
+                async with replica.engine.connect() as conn:
+                    row = (await conn.execute(HEALTH_STATEMENT)).one()
+            except Exception as e:
+                self._mark(replica, False, str(e))
+                continue
+            self._mark(replica, is_current(row), "replication lag")
+
+    def clear(self) -> list:
+        """forgets every replica, returning them so their engines can be disposed"""
+        replicas, self.replicas = self.replicas, []
+        return replicas
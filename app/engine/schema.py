@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""
+Versioned schema management on top of alembic
+
+contains:
+    - upgrade: apply every pending migration (run once per deploy)
+    - check_schema: fail fast when the database is not at the code's revision
+"""
+import os
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+
+ALEMBIC_INI = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "alembic.ini",
+)
+
+
+class SchemaDriftError(RuntimeError):
+    """the database schema is not at the revision this code was written for"""
+
+
+def alembic_config() -> Config:
+    """returns the alembic configuration of the project"""
+    config = Config(ALEMBIC_INI)
+    config.set_main_option(
+        "script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "migrations")
+    )
+    return config
+
+
+def head_revision() -> str:
+    """returns the newest migration shipped with the code"""
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def current_revision(connection) -> str | None:
+    """returns the migration the database was last upgraded to"""
+    return MigrationContext.configure(connection).get_current_revision()
+
+
+def check_schema(connection):
+    """
+    Desc:
+        compares the database revision with the code's head revision
+    Raises:
+        SchemaDriftError: if they differ
+    """
+    current, head = current_revision(connection), head_revision()
+    if current != head:
+        raise SchemaDriftError(
+            f"database schema is at revision {current}, code expects {head}; "
+            "run `python -m app.cli migrate` (alembic upgrade head)"
+        )
+
+
+def upgrade(revision: str = "head"):
+    """
+    Desc:
+        applies every migration up to revision
+    """
+    command.upgrade(alembic_config(), revision)
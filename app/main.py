@@ -1,25 +1,256 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import patient
-from app.routers import doctor
-from app.routers import auth
+from app.config.config import settings
+from app.engine.async_storage import AsyncDBStorage
+from app.engine.bulk import bulk_hash_pool
+from app.engine.db_storage import DBStorage
+from app.models.doctor import Doctor
+from app.routers import admin, appointment, health, media, metrics, vitals
+from app.utils.hasher import password_hasher
+from app.utils.jobs import job_queue
+from app.utils.metrics import MetricsMiddleware
+from app.utils.query_audit import OFF, QueryAuditMiddleware
+from app.utils.auth import token_versions_statement
+from app.utils.consistency import ReadYourWritesMiddleware
+from app.utils.search import changed_doctors_statement, doctor_index
+from app.utils.token_versions import token_versions
+from app.utils.warmup import warm_up, warm_up_async
+from sqlalchemy import exc
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+SEARCH_INDEX_TICK_SECONDS = 1
+
+
+async def open_db_pool():
+    """
+    Desc:
+        builds the process-wide engines and connection pools once. The
+        media, admin, appointment and vitals routers only have sync routes,
+        so the sync pool is opened under DB_ASYNC too rather than lazily by
+        their first request
+    """
+    await run_in_threadpool(DBStorage.init_engine)
+    if settings.DB_ASYNC:
+        await AsyncDBStorage.init_engine()
+
+
+async def close_db_pool():
+    """releases every pooled database connection"""
+    if settings.DB_ASYNC:
+        await AsyncDBStorage.dispose_engine()
+    DBStorage.dispose_engine()
+
+
+async def build_search_index():
+    """indexes every doctor so searches never scan the doctors table"""
+    if settings.DB_ASYNC:
+        db = AsyncDBStorage()
+        db.setup_db()
+        try:
+            doctor_index.build(await db.find_all(Doctor))
+        finally:
+            await db.close()
+    else:
+        db = DBStorage()
+        db.setup_db()
+        try:
+            doctor_index.build(db.query_eng(Doctor).all())
+        finally:
+            db.close()
+
+
+def _fetch_changed_doctors(stmt):
+    db = DBStorage()
+    db.setup_db()
+    try:
+        return db.execute(stmt).scalars().all()
+    finally:
+        db.close()
+
+
+async def refresh_search_index():
+    """indexes the doctors written since the index's watermark"""
+    stmt = changed_doctors_statement(doctor_index.watermark)
+    if settings.DB_ASYNC:
+        db = AsyncDBStorage()
+        db.setup_db()
+        try:
+            doctors = (await db.execute(stmt)).scalars().all()
+        finally:
+            await db.close()
+    else:
+        doctors = await run_in_threadpool(_fetch_changed_doctors, stmt)
+    doctor_index.refresh(doctors)
+
+
+async def poll_search_index():
+    """keeps searches off the database: the index is refreshed here, never by a request"""
+    while True:
+        # a short tick, so a mark_stale() is picked up promptly; the query
+        # only runs once the index is due or stale
+        await asyncio.sleep(SEARCH_INDEX_TICK_SECONDS)
+        if not doctor_index.needs_refresh():
+            continue
+        try:
+            await refresh_search_index()
+        except Exception as e:
+            # a missed refresh only delays other processes' doctor edits
+            logger.warning("Failed to refresh the search index: %s", e)
+
+
+def _fetch_token_versions(stmt):
+    db = DBStorage()
+    db.setup_db()
+    try:
+        return db.execute(stmt).all()
+    finally:
+        db.close()
+
+
+async def refresh_token_versions():
+    """applies the token revocations made since the last refresh"""
+    stmt = token_versions_statement(token_versions.watermark)
+    if settings.DB_ASYNC:
+        db = AsyncDBStorage()
+        db.setup_db()
+        try:
+            rows = (await db.execute(stmt)).all()
+        finally:
+            await db.close()
+    else:
+        rows = await run_in_threadpool(_fetch_token_versions, stmt)
+    token_versions.refresh(rows)
+
+
+async def poll_token_versions():
+    while True:
+        await asyncio.sleep(token_versions.refresh_seconds)
+        try:
+            await refresh_token_versions()
+        except Exception as e:
+            # a missed refresh only delays revocations; keep polling
+            logger.warning("Failed to refresh token versions: %s", e)
+
+
+async def poll_replicas():
+    """takes lagging or unreachable read replicas out of rotation and back in"""
+    while True:
+        await asyncio.sleep(settings.DB_REPLICA_CHECK_SECONDS)
+        try:
+            if settings.DB_ASYNC:
+                await AsyncDBStorage.check_replicas()
+            # the sync routers read from the sync replicas in either mode
+            await run_in_threadpool(DBStorage.check_replicas)
+        except Exception as e:
+            # the replicas keep their last health; keep polling
+            logger.warning("Failed to check read replicas: %s", e)
+
+
+async def warm_caches():
+    """primes the pool, the statement caches and the hot caches"""
+    try:
+        if settings.DB_ASYNC:
+            await warm_up_async()
+        else:
+            await run_in_threadpool(warm_up)
+    except exc.SQLAlchemyError as e:
+        # a cold worker is slower, not wrong
+        logger.warning("Warm-up failed, serving cold: %s", e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Desc:
+        runs in every worker after it is forked, so no connection, thread or
+        task is ever shared across a fork (gunicorn --preload is safe):
+        opens the pool, loads the search index and token revocations, warms
+        the caches, starts the job workers, then reports ready; tears
+        everything down on shutdown
+    """
+    await open_db_pool()
+    pollers = []
+    try:
+        if settings.DB_REPLICA_HOSTS:
+            pollers.append(asyncio.create_task(poll_replicas()))
+        await build_search_index()
+        pollers.append(asyncio.create_task(poll_search_index()))
+        # loads every token revocation, then follows the ones other processes make
+        await refresh_token_versions()
+        pollers.append(asyncio.create_task(poll_token_versions()))
+        await warm_caches()
+        if settings.JOBS_ENABLED:
+            await job_queue.start()
+        app.state.ready = True
+        yield
+    finally:
+        app.state.ready = False
+        # stop the job workers and pollers before the pool goes away
+        await job_queue.stop()
+        for poller in pollers:
+            poller.cancel()
+        await close_db_pool()
+        password_hasher.shutdown()
+        bulk_hash_pool.shutdown()
+
+
+def create_app() -> FastAPI:
+    """
+    Desc:
+        builds the application; importing this module opens nothing, all
+        resources belong to the lifespan of the app that is served
+    Usage:
+        uvicorn app.main:app
+        gunicorn -k uvicorn.workers.UvicornWorker --preload "app.main:create_app()"
+    """
+    if settings.DB_ASYNC:
+        from app.routers.aio import patient, doctor, auth
+    else:
+        from app.routers import patient, doctor, auth
+
+    app = FastAPI(default_response_class=ORJSONResponse)
+    # FastAPI 0.89 takes no lifespan argument; its router runs this instead
+    # of the startup and shutdown hooks
+    app.router.lifespan_context = lifespan
+    app.state.ready = False
 
-app = FastAPI()
-origins = ["*"]
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["https://pasebukky.github.io", "http://localhost:5500", "https://health.astrafort.tech"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["https://pasebukky.github.io", "http://localhost:5500", "https://health.astrafort.tech"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    if settings.DB_REPLICA_HOSTS:
+        app.add_middleware(ReadYourWritesMiddleware)
+    if settings.QUERY_AUDIT != OFF:
+        app.add_middleware(QueryAuditMiddleware)
+    # added last so it wraps the audit and shares its per-request SQL stats
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
 
+    @app.get("/")
+    def root():
+        return {"message": "Hello, World!"}
 
-@app.get("/")
-def root():
-    return {"message": "Hello, World!"}
+    app.include_router(health.router)
+    app.include_router(patient.router)
+    app.include_router(doctor.router)
+    app.include_router(auth.router)
+    app.include_router(media.router)
+    app.include_router(admin.router)
+    app.include_router(appointment.router)
+    app.include_router(vitals.router)
+    if settings.METRICS_ENABLED:
+        app.include_router(metrics.router)
+    return app
 
 
-app.include_router(patient.router)
-app.include_router(doctor.router)
-app.include_router(auth.router)
+app = create_app()
@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+"""this module defines the availability window and appointment models"""
+
+# standard library import
+
+# Third-party imports
+from sqlalchemy import DDL, Column, DateTime, ForeignKey, Index, Integer, String, event, func
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
+
+# local imports
+from app.models.base_model import BaseModel, Base
+
+
+class AvailabilityWindow(BaseModel, Base):
+    """
+    a span of time a doctor accepts bookings in, cut into slot_minutes slots;
+    times are naive UTC
+    """
+
+    __tablename__ = "availability_windows"
+    doctor_id = Column(
+        String, ForeignKey("doctors.id", ondelete="CASCADE"), nullable=False
+    )
+    starts_at = Column(DateTime, nullable=False)
+    ends_at = Column(DateTime, nullable=False)
+    slot_minutes = Column(Integer, nullable=False, default=30)
+
+    __table_args__ = (
+        # a doctor's windows never overlap; the GiST index behind this
+        # constraint also serves every "windows overlapping a range" lookup
+        ExcludeConstraint(
+            (doctor_id, "="),
+            (func.tsrange(starts_at, ends_at), "&&"),
+            name="ex_availability_windows_overlap",
+            using="gist",
+        ),
+    )
+
+
+class Appointment(BaseModel, Base):
+    """a booked (or cancelled) slot between a patient and a doctor"""
+
+    __tablename__ = "appointments"
+    doctor_id = Column(
+        String, ForeignKey("doctors.id", ondelete="CASCADE"), nullable=False
+    )
+    patient_id = Column(
+        String, ForeignKey("patients.id", ondelete="CASCADE"), nullable=False
+    )
+    starts_at = Column(DateTime, nullable=False)
+    ends_at = Column(DateTime, nullable=False)
+    status = Column(String(20), nullable=False, default="booked")
+
+    __table_args__ = (
+        # two concurrent bookings of the same slot cannot both commit
+        ExcludeConstraint(
+            (doctor_id, "="),
+            (func.tsrange(starts_at, ends_at), "&&"),
+            name="ex_appointments_overlap",
+            using="gist",
+            where=(status == "booked"),
+        ),
+        Index("ix_appointments_patient_id_starts_at", patient_id, starts_at),
+    )
+
+
+# the exclusion constraints compare a varchar with "=" inside a GiST index
+for table in (AvailabilityWindow.__table__, Appointment.__table__):
+    event.listen(
+        table,
+        "before_create",
+        DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql"),
+    )
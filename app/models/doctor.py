@@ -2,9 +2,10 @@
 """this module defines the doctors model"""
 
 import enum
-from sqlalchemy import Column, Date, Enum, Float, ForeignKey, LargeBinary, String
+from sqlalchemy import Column, Date, Enum, Float, ForeignKey, Index, String, func
 
 
+from app.engine.blob_store import media_url
 from app.models.user import User
 
 
@@ -18,8 +19,12 @@ class Doctor(User):
 
     __tablename__ = "doctors"
     id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
-    image = Column(LargeBinary, nullable=True)
-    image_header = Column(String, nullable=True)
+    __mapper_args__ = {"polymorphic_identity": "doctor"}
+    image_hash = Column(String(64), nullable=True)
+    image_mime = Column(String(100), nullable=True)
+    # resized copies of the image, written in the background after an upload
+    avatar_hash = Column(String(64), nullable=True)
+    thumbnail_hash = Column(String(64), nullable=True)
     dob = Column(Date, nullable=True)
     gender = Column(Enum(GenderEnum, name="gender_enum"))
     height = Column(Float, nullable=True)
@@ -29,3 +34,22 @@ class Doctor(User):
     hospitalAffiliation = Column(String(270), nullable=True)
     professionalBio = Column(String(220), nullable=True)
     calendarLink = Column(String(270), nullable=True)
+
+    __table_args__ = (
+        Index("ix_doctors_hospital_affiliation_lower", func.lower(hospitalAffiliation)),
+    )
+
+    @property
+    def image(self):
+        """URL of the profile image in the blob store"""
+        return media_url(self.image_hash)
+
+    @property
+    def avatar(self):
+        """URL of the profile-sized image; the original until it is resized"""
+        return media_url(self.avatar_hash or self.image_hash)
+
+    @property
+    def thumbnail(self):
+        """URL of the list-sized image; the original until it is resized"""
+        return media_url(self.thumbnail_hash or self.image_hash)
@@ -0,0 +1,38 @@
+#!/usr/bin/python3
+"""this module defines the background job (outbox) model"""
+
+# standard library import
+
+# Third-party imports
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, String, Text, text
+
+# local imports
+from app.models.base_model import BaseModel, Base
+
+
+class Job(BaseModel, Base):
+    """
+    a unit of side work queued by a request. The row is written in the
+    request's own transaction, so a job exists exactly when the change that
+    asked for it was committed; workers claim, run and delete it
+    """
+
+    __tablename__ = "jobs"
+    name = Column(String(100), nullable=False)
+    payload = Column(JSON, nullable=False)
+    # pending -> running -> deleted on success, or back to pending with a
+    # later run_at; failed once max_attempts is used up
+    status = Column(String(20), nullable=False, default="pending", server_default=text("'pending'"))
+    attempts = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    max_attempts = Column(Integer, nullable=False)
+    run_at = Column(DateTime, nullable=False)
+    locked_until = Column(DateTime, nullable=True)
+    # set by each claim; only the worker holding it may record the outcome
+    lease = Column(String(36), nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    __table_args__ = (
+        # workers only ever look for claimable jobs, a small slice of the table
+        Index("ix_jobs_claimable", "run_at", postgresql_where=text("status = 'pending'")),
+        Index("ix_jobs_leased", "locked_until", postgresql_where=text("status = 'running'")),
+    )
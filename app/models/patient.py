@@ -3,9 +3,10 @@
 
 import enum
 
-from sqlalchemy import Column, ForeignKey, String, Date, Enum, Float, LargeBinary
+from sqlalchemy import Column, ForeignKey, String, Date, Enum, Float
 from sqlalchemy.orm import relationship
 
+from app.engine.blob_store import media_url
 from app.models.user import User
 
 
@@ -19,13 +20,31 @@ class Patient(User):
 
     __tablename__ = "patients"
     id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
-    image = Column(LargeBinary, nullable=True)
+    __mapper_args__ = {"polymorphic_identity": "patient"}
     dob = Column(Date, nullable=True)
     gender = Column(Enum(GenderEnum, name="gender_enum"))
     height = Column(Float, nullable=True)
     weight = Column(Float, nullable=True)
     medical_history = Column(String(270), nullable=True)
-    image = Column(LargeBinary, nullable=True)
-    image_header = Column(String, nullable=True)
+    image_hash = Column(String(64), nullable=True)
+    image_mime = Column(String(100), nullable=True)
+    # resized copies of the image, written in the background after an upload
+    avatar_hash = Column(String(64), nullable=True)
+    thumbnail_hash = Column(String(64), nullable=True)
 
     emergency_contacts = relationship("EmergencyContact", back_populates="patient")
+
+    @property
+    def image(self):
+        """URL of the profile image in the blob store"""
+        return media_url(self.image_hash)
+
+    @property
+    def avatar(self):
+        """URL of the profile-sized image; the original until it is resized"""
+        return media_url(self.avatar_hash or self.image_hash)
+
+    @property
+    def thumbnail(self):
+        """URL of the list-sized image; the original until it is resized"""
+        return media_url(self.thumbnail_hash or self.image_hash)
@@ -0,0 +1,27 @@
+#!/usr/bin/python3
+"""this module defines the refresh token model"""
+
+# standard library import
+
+# Third-party imports
+from sqlalchemy import Column, DateTime, ForeignKey, String
+
+# local imports
+from app.models.base_model import BaseModel, Base
+
+
+class RefreshToken(BaseModel, Base):
+    """
+    server side record of an issued refresh token; id is the token's jti.
+    Every rotation of a login session issues a new row in the same family
+    and marks the presented one used
+    """
+
+    __tablename__ = "refresh_tokens"
+    user_id = Column(
+        String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    family_id = Column(String(200), nullable=False, index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    used_at = Column(DateTime, nullable=True)
+    revoked_at = Column(DateTime, nullable=True)
@@ -4,7 +4,7 @@
 # standard library import
 
 # Third-party imports
-from sqlalchemy import Column, String
+from sqlalchemy import Column, DateTime, Index, Integer, String, func, text
 
 # local imports
 from app.models.base_model import BaseModel, Base
@@ -21,3 +21,35 @@ class User(BaseModel, Base):
     email = Column(String(128), unique=True, nullable=False)
     password_hash = Column(String(128), nullable=False)
     role = Column(String(50), nullable=False)
+    # bumped to revoke every access token issued before; see utils.token_versions
+    token_version = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    # when token_version was last bumped, on the database clock
+    tokens_revoked_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # emails are compared case-insensitively, so uniqueness must be too
+        Index("ix_users_email_lower", func.lower(email), unique=True),
+        # keyset pagination of the doctor catalog walks this in order
+        Index(
+            "ix_users_doctor_catalog", "created_at", "id",
+            postgresql_where=text("role = 'doctor'"),
+        ),
+        # every process polls the doctors changed since its search index watermark
+        Index(
+            "ix_users_doctor_updated", "updated_at",
+            postgresql_where=text("role = 'doctor'"),
+        ),
+        # every process polls the users that revoked tokens since its watermark
+        Index(
+            "ix_users_token_revoked", "tokens_revoked_at",
+            postgresql_where=text("token_version > 0"),
+        ),
+    )
+    # rows load as Patient/Doctor/Admin according to their role
+    __mapper_args__ = {"polymorphic_on": role, "polymorphic_identity": "user"}
+
+
+class Admin(User):
+    """administrators have no extra columns and live in the users table"""
+
+    __mapper_args__ = {"polymorphic_identity": "admin"}
@@ -0,0 +1,50 @@
+#!/usr/bin/python3
+"""this module defines the vital sign measurement model"""
+
+# standard library import
+import enum
+
+# Third-party imports
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, String
+
+# local imports
+from app.models.base_model import BaseModel, Base
+
+
+class VitalKind(str, enum.Enum):
+    """what a measurement measures, with its unit"""
+
+    weight = "weight"  # kg
+    height = "height"  # cm
+    systolic = "systolic"  # mmHg
+    diastolic = "diastolic"  # mmHg
+    heart_rate = "heart_rate"  # beats per minute
+    temperature = "temperature"  # degrees Celsius
+    spo2 = "spo2"  # percent
+    glucose = "glucose"  # mmol/L
+
+
+class Vital(BaseModel, Base):
+    """
+    one measurement of one vital sign of a patient. Rows are only ever
+    appended, so the full history is kept; measured_at is naive UTC
+    """
+
+    __tablename__ = "vitals"
+    patient_id = Column(
+        String, ForeignKey("patients.id", ondelete="CASCADE"), nullable=False
+    )
+    # a plain string rather than a database enum, so kinds can be added
+    # without a migration
+    kind = Column(String(20), nullable=False)
+    value = Column(Float, nullable=False)
+    measured_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        # every read is one patient's series of one kind over a time range;
+        # including value lets Postgres answer them from the index alone
+        Index(
+            "ix_vitals_series", "patient_id", "kind", "measured_at",
+            postgresql_include=["value"],
+        ),
+    )
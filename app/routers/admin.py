@@ -0,0 +1,65 @@
+#!/usr/bin/python3
+"""This module contians the administrative endpoints"""
+import codecs
+
+from app.engine.bulk import bulk_hash_pool, export_records, import_records, read_records
+from app.models.user import User
+from app.schema.bulk import BulkFormat, BulkRole, ImportReport
+from app.utils import auth
+from app.utils.response_cache import catalog_cache
+from app.utils.search import doctor_index
+from fastapi import APIRouter, Depends, File, UploadFile, status
+from fastapi.responses import StreamingResponse
+
+router = APIRouter(prefix="/v1/admin", tags=["admin"])
+
+MEDIA_TYPES = {
+    BulkFormat.csv: "text/csv",
+    BulkFormat.ndjson: "application/x-ndjson",
+}
+
+
+@router.post(
+    "/import/{role}", response_model=ImportReport, status_code=status.HTTP_200_OK
+)
+def import_users(
+    role: BulkRole,
+    format: BulkFormat = BulkFormat.csv,
+    file: UploadFile = File(...),
+    user: User = Depends(auth.get_current_admin),
+):
+    """
+    Bulk create doctors or patients from an uploaded CSV or NDJSON file.
+
+    Parameters:
+    - role (BulkRole): Whether the rows are doctors or patients.
+    - format (BulkFormat): The format of the uploaded file.
+    - file (UploadFile): The file, streamed from its spooled upload.
+
+    Returns:
+    - ImportReport: The number of inserted and failed rows, with per-row errors.
+    """
+    stream = codecs.getreader("utf-8")(file.file)
+    report = import_records(
+        read_records(stream, format.value), role.value, pool=bulk_hash_pool.get()
+    )
+    if role == BulkRole.doctor:
+        doctor_index.mark_stale()
+        catalog_cache.bump()
+    return report
+
+
+@router.get("/export/{role}", status_code=status.HTTP_200_OK)
+def export_users(
+    role: BulkRole,
+    format: BulkFormat = BulkFormat.csv,
+    user: User = Depends(auth.get_current_admin),
+):
+    """
+    Stream every doctor or patient as CSV or NDJSON.
+    """
+    return StreamingResponse(
+        export_records(role.value, format.value),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{role.value}s.{format.value}"'},
+    )
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+from datetime import timedelta
+from app.engine.async_storage import AsyncDBStorage
+from app.engine.load import load_async
+from app.config.config import settings
+from app.schema.auth import Token
+from app.schema.user import ShowUser
+from app.utils.query_audit import query_budget
+from app.utils.refresh_tokens import (
+    delete_refresh_cookie,
+    issue_refresh_token_async,
+    refresh_user_id,
+    rotate_refresh_token_async,
+    set_refresh_cookie,
+)
+from app.utils.serializer import serializer_for
+from app.utils.auth import (
+    authenticate_user_async,
+    create_access_token,
+    get_current_user_read_async,
+    optional_oauth2_scheme,
+    revoke_tokens_async,
+    set_access_cookies,
+    delete_access_cookies,
+    token_claims,
+    token_user_id,
+)
+from fastapi import APIRouter, Cookie, Depends, HTTPException, Response, status
+from fastapi.security import OAuth2PasswordRequestForm
+
+
+router = APIRouter(prefix="/v1/auth", tags=["Authentication"])
+
+
+@router.post("/token", dependencies=[Depends(query_budget(2))])
+async def login(
+    response: Response,
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncDBStorage = Depends(load_async),
+) -> Token:
+    """
+    Login endpoint served on the asyncio engine.
+
+    See app.routers.auth.login for the full description.
+    """
+    user = await authenticate_user_async(form_data.username.lower(), form_data.password, db)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data=token_claims(user), expires_delta=access_token_expires
+    )
+    set_access_cookies(access_token, response)
+    # lets the client renew the session without sending the password again
+    set_refresh_cookie(await issue_refresh_token_async(db, user), response)
+    return Token(access_token=access_token, token_type="bearer", role=user.role)
+
+
+# 2 statements when rotating; 4 when a replayed token revokes its session
+@router.post("/refresh", dependencies=[Depends(query_budget(4))])
+async def refresh(
+    response: Response,
+    refresh_token: str | None = Cookie(None),
+    db: AsyncDBStorage = Depends(load_async),
+) -> Token:
+    """
+    Refresh endpoint served on the asyncio engine.
+
+    See app.routers.auth.refresh for the full description.
+    """
+    access_token, new_refresh_token, role = await rotate_refresh_token_async(db, refresh_token)
+    set_access_cookies(access_token, response)
+    set_refresh_cookie(new_refresh_token, response)
+    return Token(access_token=access_token, token_type="bearer", role=role)
+
+
+@router.post("/logout")
+async def logout(
+    response: Response,
+    token: str | None = Depends(optional_oauth2_scheme),
+    refresh_token: str | None = Cookie(None),
+    db: AsyncDBStorage = Depends(load_async),
+):
+    """
+    Logout endpoint.
+
+    This endpoint revokes every access and refresh token of the caller, clears
+    the auth cookies and returns a success message.
+    """
+    # bump the token version so copies of this (or any older) token stop working
+    user_id = token_user_id(token) or refresh_user_id(refresh_token)
+    if user_id is not None:
+        await revoke_tokens_async(db, user_id)
+    delete_access_cookies(response)
+    delete_refresh_cookie(response)
+    return {"detail": "Logged out successfully"}
+
+
+@router.get("/me/", response_model=ShowUser, dependencies=[Depends(query_budget(1))])
+async def me(user: ShowUser = Depends(get_current_user_read_async)):
+    return serializer_for(ShowUser).response(user)
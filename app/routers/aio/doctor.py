@@ -0,0 +1,164 @@
+#!/usr/bin/python3
+"""This module contians the async doctor-related endpoints"""
+from app.engine.async_storage import AsyncDBStorage
+from app.engine.load import load_async, load_read_async
+from app.models.doctor import Doctor, GenderEnum
+from app.schema.doctor import UpdateDoctorProfile, ShowDoctorProfile, ShowDoctorSchedule, ShowDoctorCard, DoctorCatalogPage
+from app.schema.auth import TokenClaims
+from app.schema.user import ShowUser, CreateUser
+from app.utils import auth
+from app.utils.catalog import CATALOG_PAGE_SIZE, catalog_page, catalog_statement
+from app.utils.images import set_image, store_image
+from app.utils.jobs import job_queue
+from app.utils.query_audit import query_budget
+from app.utils.response_cache import catalog_cache
+from app.utils.serializer import serializer_for
+from app.utils.search import doctor_index
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+
+router = APIRouter(prefix="/v1/doctor", tags=["doctor management"])
+
+
+@router.get("/")
+async def root():
+    return {"message": "Hello, World!"}
+
+
+@router.post(
+    "/register", response_model=ShowUser, status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(query_budget(2))],
+)
+async def register(request: CreateUser, db: AsyncDBStorage = Depends(load_async)):
+    phone = request.phone
+    email = request.email.lower()
+
+    password_hash = await auth.get_password_hash_async(
+        request.password1.get_secret_value()
+    )
+    new_doctor = Doctor(
+        first_name=request.first_name,
+        last_name=request.last_name,
+        phone=phone,
+        email=email,
+        password_hash=password_hash,
+        role="doctor",
+    )
+    # a single insert; the unique constraints on phone and lower(email) reject duplicates
+    try:
+        await db.add(new_doctor)
+    except IntegrityError as e:
+        raise auth.registration_conflict(e, phone, email)
+    doctor_index.add(new_doctor)
+    catalog_cache.bump()
+    return serializer_for(ShowUser).response(new_doctor, status_code=status.HTTP_201_CREATED)
+
+
+@router.patch(
+    "/update_profile", status_code=status.HTTP_200_OK,
+    dependencies=[Depends(query_budget(4))],
+)
+async def update_profile(
+    request: UpdateDoctorProfile,
+    db: AsyncDBStorage = Depends(load_async),
+    user: Doctor = Depends(
+        auth.require_role("doctor", principal=auth.get_current_user_async)
+    ),
+):
+    # the principal is already a fully loaded Doctor; work on a session copy
+    doctor = await db.attach(user)
+    for field, value in request.dict(exclude_unset=True).items():
+        if value not in (None, ""):
+            if field == "image":
+                # keep only the content hash and mime type in the row;
+                # the resized variants are made by a job committed with it
+                key, mime = await run_in_threadpool(store_image, value)
+                set_image(db, doctor, key, mime)
+                continue
+            if field == "calendarLink":
+                if value.startswith('https://'):
+                    protocol, value = value.split('https://cal.com/')
+
+            setattr(doctor, field, value)
+
+    doctor.save()
+    await db.add(doctor)
+    doctor_index.add(doctor)
+    catalog_cache.bump()
+    auth.invalidate_principal(user.email)
+    if request.image:
+        job_queue.wake()
+    return {"message": "Profile updated successfully!"}
+
+
+@router.get(
+    "/profile", response_model=ShowDoctorProfile, status_code=status.HTTP_200_OK,
+    dependencies=[Depends(query_budget(1))],
+)
+async def profile(
+    user: Doctor = Depends(
+        auth.require_role("doctor", principal=auth.get_current_user_read_async)
+    ),
+):
+    return serializer_for(ShowDoctorProfile).response(user)
+
+
+@router.get(
+    "/search", response_model=List[ShowDoctorCard], status_code=status.HTTP_200_OK,
+    dependencies=[Depends(query_budget(0))],
+)
+async def search(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+):
+    # answered from memory; the lifespan poller keeps the index current
+    return serializer_for(ShowDoctorCard).response_many(doctor_index.search(q, limit))
+
+
+@router.get(
+    "/all", response_model=DoctorCatalogPage, status_code=status.HTTP_200_OK,
+    dependencies=[Depends(query_budget(1))],
+)
+async def all(
+    request: Request,
+    db: AsyncDBStorage = Depends(load_read_async),
+    limit: int = Query(CATALOG_PAGE_SIZE, ge=1, le=100),
+    cursor: Optional[str] = None,
+    hospitalAffiliation: Optional[str] = None,
+    gender: Optional[GenderEnum] = None,
+):
+    # repeat visits are answered from the cache without touching the database
+    key = catalog_cache.key(request)
+    cached = catalog_cache.get(key)
+    if cached is not None:
+        return catalog_cache.respond(request, cached)
+
+    stmt = catalog_statement(limit, cursor, hospitalAffiliation, gender)
+    doctors = (await db.execute(stmt)).scalars().all()
+    body = catalog_page(doctors, limit)
+    # a replica may not have the write that bumped the cache yet; only
+    # pages read from the primary are kept
+    cached = catalog_cache.entry(body) if db.from_replica else catalog_cache.set(key, body)
+    return catalog_cache.respond(request, cached)
+
+
+@router.get(
+    "/{doctor_id}", response_model=ShowDoctorSchedule, status_code=status.HTTP_200_OK,
+    dependencies=[Depends(query_budget(1))],
+)
+async def schedule(
+    doctor_id,
+    db: AsyncDBStorage = Depends(load_read_async),
+    user: TokenClaims = Depends(auth.get_current_claims),
+):
+    # any signed-in user may look a doctor up; the token alone proves that
+    doctor = await db.find_one(Doctor, Doctor.id == doctor_id)
+    if doctor is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=[{"msg": f"doctor with id: {doctor_id} not found"}],
+        )
+    # the Doctor row already carries the inherited user columns
+    return serializer_for(ShowDoctorSchedule).response(doctor)
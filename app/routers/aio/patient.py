@@ -0,0 +1,131 @@
+#!/usr/bin/python3
+"""This module contians the async patient-related endpoints"""
+from app.engine.async_storage import AsyncDBStorage
+from app.engine.load import load_async
+from app.models.patient import Patient
+from app.models.emergency_contact import EmergencyContact
+from app.schema.patient import UpdatePatientProfile, ShowPatientProfile
+from app.schema.user import ShowUser, CreateUser
+from app.utils import auth
+from app.utils.images import set_image, store_image
+from app.utils.jobs import job_queue
+from app.utils.query_audit import query_budget
+from app.utils.serializer import serializer_for
+from app.utils.vitals import PROFILE_KINDS, invalidate_summary, record_vitals
+from fastapi import APIRouter, Depends, status
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+
+router = APIRouter(prefix="/v1/patient", tags=["patient management"])
+
+
+@router.get("/")
+async def root():
+    return {"message": "Hello, World!"}
+
+
+@router.post(
+    "/register", response_model=ShowUser, status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(query_budget(2))],
+)
+async def register(request: CreateUser, db: AsyncDBStorage = Depends(load_async)):
+    phone = request.phone
+    email = request.email.lower()
+
+    password_hash = await auth.get_password_hash_async(
+        request.password1.get_secret_value()
+    )
+    new_patient = Patient(
+        first_name=request.first_name,
+        last_name=request.last_name,
+        phone=phone,
+        email=email,
+        password_hash=password_hash,
+        role="patient",
+    )
+    # a single insert; the unique constraints on phone and lower(email) reject duplicates
+    try:
+        await db.add(new_patient)
+    except IntegrityError as e:
+        raise auth.registration_conflict(e, phone, email)
+    return serializer_for(ShowUser).response(new_patient, status_code=status.HTTP_201_CREATED)
+
+
+@router.patch(
+    "/update_profile", status_code=status.HTTP_200_OK,
+    dependencies=[Depends(query_budget(5))],
+)
+async def update_profile(
+    request: UpdatePatientProfile,
+    db: AsyncDBStorage = Depends(load_async),
+    user: Patient = Depends(
+        auth.require_role("patient", principal=auth.get_current_user_async)
+    ),
+):
+    # the principal is already a fully loaded Patient; work on a session copy.
+    # every change below is flushed as one transaction, touching only the
+    # columns that were set
+    patient = await db.attach(user)
+    try:
+        async with db.transaction():
+            for field, value in request.dict(exclude_unset=True).items():
+                if value not in (None, ""):
+                    if field == "image":
+                        # keep only the content hash and mime type in the row;
+                        # the resized variants are made by a job committed with it
+                        key, mime = await run_in_threadpool(store_image, value)
+                        set_image(db, patient, key, mime)
+                        continue
+
+                    setattr(patient, field, value)
+
+            # a changed height or weight is also the latest point of its series
+            readings = {
+                kind: value
+                for kind, value in request.dict(include=set(PROFILE_KINDS)).items()
+                if value is not None
+            }
+            if readings:
+                record_vitals(db, user.id, readings)
+
+            sos_contact = patient.emergency_contacts[0] if patient.emergency_contacts else None
+            if sos_contact:
+                if request.SOS_fullname:
+                    sos_contact.full_name = request.SOS_fullname
+                if request.SOS_phone:
+                    sos_contact.phone = request.SOS_phone
+            else:
+                if request.SOS_fullname and request.SOS_phone:
+                    db.stage(EmergencyContact(
+                        full_name=request.SOS_fullname,
+                        phone=request.SOS_phone,
+                        patient_id=user.id,
+                        role="SOS_contact",
+                    ))
+    finally:
+        # also after a rejected update (a bad image is a 400 or 413), so
+        # the next request reloads the principal rather than trusting it
+        auth.invalidate_principal(user.email)
+    if readings:
+        invalidate_summary(user.id)
+    if request.image:
+        job_queue.wake()
+    return {"message": "Profile updated successfully!"}
+
+
+@router.get(
+    "/profile", response_model=ShowPatientProfile, status_code=status.HTTP_200_OK,
+    dependencies=[Depends(query_budget(1))],
+)
+async def profile(
+    user: Patient = Depends(
+        auth.require_role("patient", principal=auth.get_current_user_read_async)
+    ),
+):
+    # emergency contacts were eager-loaded with the principal
+    sos_contact = user.emergency_contacts[0] if user.emergency_contacts else None
+    return serializer_for(ShowPatientProfile).response(
+        user,
+        SOS_fullname=sos_contact.full_name if sos_contact else None,
+        SOS_phone=sos_contact.phone if sos_contact else None,
+    )
@@ -0,0 +1,167 @@
+#!/usr/bin/python3
+"""This module contians the appointment scheduling endpoints"""
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from app.engine.load import load
+from app.models.appointment import Appointment, AvailabilityWindow
+from app.schema.appointment import (
+    BookAppointment,
+    CreateAvailability,
+    ShowAppointment,
+    ShowAvailability,
+    ShowSlot,
+    to_naive_utc,
+)
+from app.schema.auth import TokenClaims
+from app.utils import auth
+from app.utils.scheduling import free_slots, next_free_slots, slot_of, window_containing
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+router = APIRouter(prefix="/v1/appointments", tags=["appointments"])
+
+MAX_SLOT_RANGE = timedelta(days=31)
+
+
+@router.post(
+    "/availability", response_model=ShowAvailability, status_code=status.HTTP_201_CREATED
+)
+def add_availability(
+    request: CreateAvailability,
+    db: Session = Depends(load),
+    user: TokenClaims = Depends(
+        auth.require_role("doctor", principal=auth.get_current_claims)
+    ),
+):
+    window = AvailabilityWindow(
+        doctor_id=user.id,
+        starts_at=request.starts_at,
+        ends_at=request.ends_at,
+        slot_minutes=request.slot_minutes,
+    )
+    try:
+        db.add(window)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=[{"msg": "window overlaps an existing availability window"}],
+        )
+    return window
+
+
+@router.get("/slots", response_model=List[ShowSlot], status_code=status.HTTP_200_OK)
+def slots(
+    doctor_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Session = Depends(load),
+    user: TokenClaims = Depends(auth.get_current_claims),
+):
+    """
+    Free slots of one doctor between start (default now) and end (default a week later).
+    """
+    start = to_naive_utc(start) if start else datetime.utcnow()
+    end = to_naive_utc(end) if end else start + timedelta(days=7)
+    if end <= start or end - start > MAX_SLOT_RANGE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=[{"msg": "end must be after start and at most 31 days later"}],
+        )
+    return free_slots(db, start, end, doctor_id=doctor_id)
+
+
+@router.get("/next_free", response_model=List[ShowSlot], status_code=status.HTTP_200_OK)
+def next_free(
+    after: Optional[datetime] = None,
+    limit: int = Query(1, ge=1, le=50),
+    horizon_days: int = Query(14, ge=1, le=90),
+    db: Session = Depends(load),
+    user: TokenClaims = Depends(auth.get_current_claims),
+):
+    """
+    The earliest free slots across every doctor.
+    """
+    now = datetime.utcnow()
+    after = max(to_naive_utc(after), now) if after else now
+    return next_free_slots(db, after, limit, timedelta(days=horizon_days))
+
+
+@router.post("/", response_model=ShowAppointment, status_code=status.HTTP_201_CREATED)
+def book(
+    request: BookAppointment,
+    db: Session = Depends(load),
+    user: TokenClaims = Depends(
+        auth.require_role("patient", principal=auth.get_current_claims)
+    ),
+):
+    if request.starts_at < datetime.utcnow():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=[{"msg": "cannot book a slot in the past"}],
+        )
+    window = window_containing(db, request.doctor_id, request.starts_at)
+    slot = slot_of(window, request.starts_at) if window else None
+    if slot is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=[{"msg": "the doctor has no slot starting at that time"}],
+        )
+    appointment = Appointment(
+        doctor_id=request.doctor_id,
+        patient_id=user.id,
+        starts_at=slot[0],
+        ends_at=slot[1],
+        status="booked",
+    )
+    # the exclusion constraint settles concurrent bookings of the same slot
+    try:
+        db.add(appointment)
+    except IntegrityError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=[{"msg": "slot is already booked"}],
+        )
+    return appointment
+
+
+@router.get("/", response_model=List[ShowAppointment], status_code=status.HTTP_200_OK)
+def upcoming(db: Session = Depends(load), user: TokenClaims = Depends(auth.get_current_claims)):
+    """
+    Upcoming appointments of the current patient or doctor.
+    """
+    party = Appointment.doctor_id if user.role == "doctor" else Appointment.patient_id
+    stmt = (
+        select(Appointment)
+        .where(party == user.id, Appointment.ends_at > datetime.utcnow())
+        .order_by(Appointment.starts_at)
+        .limit(100)
+    )
+    return db.execute(stmt).scalars().all()
+
+
+@router.delete(
+    "/{appointment_id}", response_model=ShowAppointment, status_code=status.HTTP_200_OK
+)
+def cancel(
+    appointment_id: str,
+    db: Session = Depends(load),
+    user: TokenClaims = Depends(auth.get_current_claims),
+):
+    stmt = select(Appointment).where(
+        Appointment.id == appointment_id,
+        or_(Appointment.patient_id == user.id, Appointment.doctor_id == user.id),
+    )
+    appointment = db.execute(stmt).scalars().first()
+    if appointment is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=[{"msg": "appointment not found"}],
+        )
+    # cancelled rows fall outside the exclusion constraint, freeing the slot
+    appointment.status = "cancelled"
+    appointment.save()
+    db.add(appointment)
+    return appointment
@@ -1,16 +1,23 @@
 #!/usr/bin/python3
 """This module contians the doctor-related endpoints"""
-import base64
-import binascii
-from app.engine.load import load
-from app.models.doctor import Doctor
-from app.models.user import User
-from app.schema.doctor import UpdateDoctorProfile, ShowDoctorProfile, ShowDoctorSchedule, ShowDoctorCard
+from app.engine.load import load, load_read
+from app.models.doctor import Doctor, GenderEnum
+from app.schema.doctor import UpdateDoctorProfile, ShowDoctorProfile, ShowDoctorSchedule, ShowDoctorCard, DoctorCatalogPage
+from app.schema.auth import TokenClaims
 from app.schema.user import ShowUser, CreateUser
 from app.utils import auth
-from fastapi import APIRouter, Depends, HTTPException, status
+from app.utils.catalog import CATALOG_PAGE_SIZE, catalog_page, catalog_statement
+from app.utils.images import set_image, store_image
+from app.utils.jobs import job_queue
+from app.utils.query_audit import query_budget
+from app.utils.response_cache import catalog_cache
+from app.utils.serializer import serializer_for
+from app.utils.search import doctor_index
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
 
 router = APIRouter(prefix="/v1/doctor", tags=["doctor management"])
 
@@ -20,59 +27,53 @@ def root():
     return {"message": "Hello, World!"}
 
 
-@router.post("/register", response_model=ShowUser, status_code=status.HTTP_201_CREATED)
-def register(request: CreateUser, db: Session = Depends(load)):
+@router.post(
+    "/register", response_model=ShowUser, status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(query_budget(2))],
+)
+async def register(request: CreateUser, db: Session = Depends(load)):
     phone = request.phone
     email = request.email.lower()
 
-    check_phone = db.query_eng(User).filter(User.phone == phone).first()
-    check_email = db.query_eng(User).filter(User.email == email).first()
-
-    if check_phone:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=[{"msg": f"user with phone: {phone} exists"}],
-        )
-    if check_email:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=[{"msg": f"user with email: {email} exists"}],
-        )
-    password_hash = auth.get_password_hash(request.password1.get_secret_value())
+    # awaited on the hasher's process pool; no thread or connection is held meanwhile
+    password_hash = await auth.get_password_hash_async(request.password1.get_secret_value())
     new_doctor = Doctor(
         first_name=request.first_name,
         last_name=request.last_name,
-        phone=request.phone,
-        email=request.email,
+        phone=phone,
+        email=email,
         password_hash=password_hash,
         role="doctor",
     )
-    db.add(new_doctor)
-    return new_doctor
+    # a single insert; the unique constraints on phone and lower(email) reject duplicates
+    try:
+        await run_in_threadpool(db.add, new_doctor)
+    except IntegrityError as e:
+        raise auth.registration_conflict(e, phone, email)
+    doctor_index.add(new_doctor)
+    catalog_cache.bump()
+    return serializer_for(ShowUser).response(new_doctor, status_code=status.HTTP_201_CREATED)
 
 
 @router.patch(
-    "/update_profile", status_code=status.HTTP_200_OK
+    "/update_profile", status_code=status.HTTP_200_OK,
+    dependencies=[Depends(query_budget(4))],
 )
 def update_profile(
     request: UpdateDoctorProfile,
     db: Session = Depends(load),
-    user: Doctor = Depends(auth.get_current_user),
+    user: Doctor = Depends(auth.require_role("doctor")),
 ):
-    doctor = db.query_eng(Doctor).filter(Doctor.id == user.id).first()
+    # the principal is already a fully loaded Doctor; work on a session copy
+    doctor = db.attach(user)
     for field, value in request.dict(exclude_unset=True).items():
         if value not in (None, ""):
             if field == "image":
-                if value.startswith('data:image') and ';base64,' in value:
-                    header, value = value.split(';base64,')
-                # convert base64 image to binary
-                try:
-                    value = base64.b64decode(value)
-                    setattr(doctor, "image_header", header)
-                except binascii.Error:
-                    raise HTTPException(
-                        status_code=400, detail=[{"msg": "Invalid base64-encoded string for image"}]
-                    )
+                # keep only the content hash and mime type in the row;
+                # the resized variants are made by a job committed with it
+                key, mime = store_image(value)
+                set_image(db, doctor, key, mime)
+                continue
             if field == "calendarLink":
                 print('yes')
                 if value.startswith('https://'):
@@ -80,48 +81,78 @@ def update_profile(
 
             setattr(doctor, field, value)
 
+    doctor.save()
     db.add(doctor)
+    doctor_index.add(doctor)
+    catalog_cache.bump()
+    auth.invalidate_principal(user.email)
+    if request.image:
+        job_queue.wake()
     return {"message": "Profile updated successfully!"}
 
 
 @router.get(
-    "/profile", response_model=ShowDoctorProfile, status_code=status.HTTP_200_OK
+    "/profile", response_model=ShowDoctorProfile, status_code=status.HTTP_200_OK,
+    dependencies=[Depends(query_budget(1))],
 )
-def profile(db: Session = Depends(load), user: User = Depends(auth.get_current_user)):
-    doctor = db.query_eng(Doctor).filter(Doctor.id == user.id).first()
-    image_base64 = base64.b64encode(doctor.image).decode('utf-8') if doctor.image else None
-    if image_base64:
-        image_base64 = f"{doctor.image_header};base64,{image_base64}"
-    doctor_dict = {key: value for key, value in doctor.__dict__.items() if key != 'image'}
-
-    return {
-        **user.__dict__,
-        **doctor_dict,
-        "image": image_base64,
-    }
-
-@router.get("/all", response_model=List[ShowDoctorCard], status_code=status.HTTP_200_OK)
-def all(db: Session = Depends(load)):
-    doctors = db.query_eng(Doctor).all()
-    for doctor in doctors:
-        doctor.image = base64.b64encode(doctor.image).decode('utf-8') if doctor.image else None
-        if doctor.image:
-            doctor.image = f"{doctor.image_header};base64,{doctor.image}"
-    return doctors
+def profile(
+    user: Doctor = Depends(
+        auth.require_role("doctor", principal=auth.get_current_user_read)
+    ),
+):
+    return serializer_for(ShowDoctorProfile).response(user)
 
 @router.get(
-    "/{doctor_id}", response_model=ShowDoctorSchedule, status_code=status.HTTP_200_OK
+    "/search", response_model=List[ShowDoctorCard], status_code=status.HTTP_200_OK,
+    dependencies=[Depends(query_budget(0))],
 )
-def schedule(doctor_id, db: Session = Depends(load), user: User = Depends(auth.get_current_user)):
+def search(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+):
+    # answered from memory; the lifespan poller keeps the index current
+    return serializer_for(ShowDoctorCard).response_many(doctor_index.search(q, limit))
+
+
+@router.get(
+    "/all", response_model=DoctorCatalogPage, status_code=status.HTTP_200_OK,
+    dependencies=[Depends(query_budget(1))],
+)
+def all(
+    request: Request,
+    db: Session = Depends(load_read),
+    limit: int = Query(CATALOG_PAGE_SIZE, ge=1, le=100),
+    cursor: Optional[str] = None,
+    hospitalAffiliation: Optional[str] = None,
+    gender: Optional[GenderEnum] = None,
+):
+    # repeat visits are answered from the cache without touching the database
+    key = catalog_cache.key(request)
+    cached = catalog_cache.get(key)
+    if cached is not None:
+        return catalog_cache.respond(request, cached)
+
+    stmt = catalog_statement(limit, cursor, hospitalAffiliation, gender)
+    doctors = db.execute(stmt).scalars().all()
+    body = catalog_page(doctors, limit)
+    # a replica may not have the write that bumped the cache yet; only
+    # pages read from the primary are kept
+    cached = catalog_cache.entry(body) if db.from_replica else catalog_cache.set(key, body)
+    return catalog_cache.respond(request, cached)
+
+@router.get(
+    "/{doctor_id}", response_model=ShowDoctorSchedule, status_code=status.HTTP_200_OK,
+    dependencies=[Depends(query_budget(1))],
+)
+def schedule(
+    doctor_id, db: Session = Depends(load_read), user: TokenClaims = Depends(auth.get_current_claims)
+):
+    # any signed-in user may look a doctor up; the token alone proves that
     doctor = db.query_eng(Doctor).filter(Doctor.id == doctor_id).first()
-    doctor_details = db.query_eng(User).filter(User.email == doctor.email).first()
-    image_base64 = base64.b64encode(doctor.image).decode('utf-8') if doctor.image else None
-    if image_base64:
-        image_base64 = f"{doctor.image_header};base64,{image_base64}"
-    doctor_dict = {key: value for key, value in doctor.__dict__.items() if key != 'image'}
-
-    return {
-        **doctor_details.__dict__,
-        **doctor_dict,
-        "image": image_base64,
-    }
\ No newline at end of file
+    if doctor is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=[{"msg": f"doctor with id: {doctor_id} not found"}],
+        )
+    # the Doctor row already carries the inherited user columns
+    return serializer_for(ShowDoctorSchedule).response(doctor)
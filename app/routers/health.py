@@ -0,0 +1,28 @@
+#!/usr/bin/python3
+"""This module contians the liveness and readiness probes"""
+from fastapi import APIRouter, Request, status
+from fastapi.responses import ORJSONResponse
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+@router.get("/live", include_in_schema=False)
+async def live():
+    """
+    Answers as soon as the process serves requests at all.
+    """
+    return {"status": "live"}
+
+
+@router.get("/ready", include_in_schema=False)
+async def ready(request: Request):
+    """
+    Answers 503 until the worker's pool is open and its caches are warm, so
+    a load balancer only routes traffic to warm workers.
+    """
+    if not getattr(request.app.state, "ready", False):
+        return ORJSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "starting"},
+        )
+    return {"status": "ready"}
@@ -0,0 +1,110 @@
+#!/usr/bin/python3
+"""This module contians the media (blob store) endpoints"""
+from app.config.config import settings
+from app.engine.blob_store import MEDIA_PREFIX, get_blob_store, media_url
+from app.schema.auth import TokenClaims
+from app.utils import auth
+from app.utils.images import (
+    receive_image,
+    save_profile_image,
+    save_profile_image_async,
+    sniff_image_type,
+)
+from app.utils.jobs import job_queue
+from app.utils.query_audit import query_budget
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Path,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+router = APIRouter(prefix=MEDIA_PREFIX, tags=["media"])
+
+# blobs are content addressed, so a key's bytes can never change
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@router.put(
+    "/profile-image", status_code=status.HTTP_200_OK,
+    dependencies=[Depends(query_budget(3))],
+)
+async def upload_profile_image(
+    request: Request,
+    user: TokenClaims = Depends(
+        auth.require_role("patient", "doctor", principal=auth.get_current_claims)
+    ),
+):
+    """
+    Replaces the caller's profile image with a multipart/form-data upload.
+
+    Parameters:
+    - file (multipart field): A PNG, JPEG, GIF or WebP image of at most IMAGE_UPLOAD_MAX_BYTES.
+
+    Returns:
+    - dict: The URL of the stored original. The avatar and thumbnail are
+      resized by a background job; until then they point at the original.
+
+    Raises:
+    - HTTPException: 413 if the image is too large, 415 if it is not a
+      supported image, 400 if the form has no file.
+    """
+    # the body is only read here, after the token was checked
+    upload, mime = await receive_image(request)
+    try:
+        key = await run_in_threadpool(get_blob_store().put_file, upload.file)
+    finally:
+        await upload.close()
+
+    # the row update and the resize job are committed together
+    if settings.DB_ASYNC:
+        await save_profile_image_async(user.role, user.id, user.email, key, mime)
+    else:
+        await run_in_threadpool(save_profile_image, user.role, user.id, user.email, key, mime)
+    job_queue.wake()
+    return {"message": "Profile image updated successfully!", "image": media_url(key)}
+
+
+@router.get("/{key}", status_code=status.HTTP_200_OK)
+def get_media(
+    key: str = Path(..., regex="^[0-9a-f]{64}$"),
+    if_none_match: str | None = Header(None),
+):
+    """
+    Streams a stored blob with long-lived caching headers.
+
+    Parameters:
+    - key (str): The sha256 content hash of the blob.
+    - if_none_match (str, optional): The ETag the client already holds.
+
+    Returns:
+    - FileResponse: The blob, or a 304 if the client copy is current.
+
+    Raises:
+    - HTTPException: If no blob is stored under key.
+    """
+    etag = f'"{key}"'
+    headers = {"Cache-Control": CACHE_CONTROL, "ETag": etag}
+    if if_none_match and etag in if_none_match:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    store = get_blob_store()
+    if not store.exists(key):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=[{"msg": "media not found"}]
+        )
+    with store.open(key) as f:
+        media_type = sniff_image_type(f.read(12)) or "application/octet-stream"
+
+    path = store.path(key)
+    if path is not None:
+        # starlette reads the file in chunks in the threadpool, so it is
+        # never held in memory whole
+        return FileResponse(path, media_type=media_type, headers=headers)
+    return StreamingResponse(store.open(key), media_type=media_type, headers=headers)
@@ -0,0 +1,16 @@
+#!/usr/bin/python3
+"""This module contians the Prometheus metrics endpoint"""
+from app.utils.metrics import exposition
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Exposes request latency, SQL and connection pool metrics for Prometheus to scrape.
+    """
+    body, content_type = exposition()
+    return Response(content=body, media_type=content_type)
@@ -1,16 +1,20 @@
 #!/usr/bin/python3
 """This module contians the patient-related endpoints"""
-import base64
-import binascii
 from app.engine.load import load
 from app.models.patient import Patient
 from app.models.emergency_contact import EmergencyContact
-from app.models.user import User
 from app.schema.patient import UpdatePatientProfile, ShowPatientProfile
 from app.schema.user import ShowUser, CreateUser
 from app.utils import auth
-from fastapi import APIRouter, Depends, HTTPException, status
+from app.utils.images import set_image, store_image
+from app.utils.jobs import job_queue
+from app.utils.query_audit import query_budget
+from app.utils.serializer import serializer_for
+from app.utils.vitals import PROFILE_KINDS, invalidate_summary, record_vitals
+from fastapi import APIRouter, Depends, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 router = APIRouter(prefix="/v1/patient", tags=["patient management"])
 
@@ -20,103 +24,104 @@ def root():
     return {"message": "Hello, World!"}
 
 
-@router.post("/register", response_model=ShowUser, status_code=status.HTTP_201_CREATED)
-def register(request: CreateUser, db: Session = Depends(load)):
+@router.post(
+    "/register", response_model=ShowUser, status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(query_budget(2))],
+)
+async def register(request: CreateUser, db: Session = Depends(load)):
     phone = request.phone
     email = request.email.lower()
 
-    check_phone = db.query_eng(User).filter(User.phone == phone).first()
-    check_email = db.query_eng(User).filter(User.email == email).first()
-
-    if check_phone:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=[{"msg": f"user with phone: {phone} exists"}],
-        )
-    if check_email:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=[{"msg": f"user with email: {email} exists"}],
-        )
-    password_hash = auth.get_password_hash(request.password1.get_secret_value())
+    # awaited on the hasher's process pool; no thread or connection is held meanwhile
+    password_hash = await auth.get_password_hash_async(request.password1.get_secret_value())
     new_patient = Patient(
         first_name=request.first_name,
         last_name=request.last_name,
-        phone=request.phone,
-        email=request.email,
+        phone=phone,
+        email=email,
         password_hash=password_hash,
         role="patient",
     )
-    db.add(new_patient)
-    return new_patient
+    # a single insert; the unique constraints on phone and lower(email) reject duplicates
+    try:
+        await run_in_threadpool(db.add, new_patient)
+    except IntegrityError as e:
+        raise auth.registration_conflict(e, phone, email)
+    return serializer_for(ShowUser).response(new_patient, status_code=status.HTTP_201_CREATED)
 
 
 @router.patch(
-    "/update_profile", status_code=status.HTTP_200_OK
+    "/update_profile", status_code=status.HTTP_200_OK,
+    dependencies=[Depends(query_budget(5))],
 )
 def update_profile(
     request: UpdatePatientProfile,
     db: Session = Depends(load),
-    user: Patient = Depends(auth.get_current_user),
+    user: Patient = Depends(auth.require_role("patient")),
 ):
-    patient = db.query_eng(Patient).filter(Patient.id == user.id).first()
-    for field, value in request.dict(exclude_unset=True).items():
-        if value not in (None, ""):
-            if field == "image":
-                if value.startswith('data:image') and ';base64,' in value:
-                    header, value = value.split(';base64,')
-                # convert base64 image to binary
-                try:
-                    value = base64.b64decode(value)
-                    setattr(patient, "image_header", header)
-                except binascii.Error:
-                    raise HTTPException(
-                        status_code=400, detail=[{"msg": "Invalid base64-encoded string for image"}]
-                    )   
-
-            setattr(patient, field, value)
+    # the principal is already a fully loaded Patient; work on a session copy.
+    # every change below is flushed as one transaction, touching only the
+    # columns that were set
+    patient = db.attach(user)
+    try:
+        with db.transaction():
+            for field, value in request.dict(exclude_unset=True).items():
+                if value not in (None, ""):
+                    if field == "image":
+                        # keep only the content hash and mime type in the row;
+                        # the resized variants are made by a job committed with it
+                        key, mime = store_image(value)
+                        set_image(db, patient, key, mime)
+                        continue
 
+                    setattr(patient, field, value)
 
-    sos_contact =  db.query_eng(EmergencyContact).filter(EmergencyContact.patient_id == user.id).first()
-    if sos_contact:
-        if request.SOS_fullname:
-            sos_contact.full_name = request.SOS_fullname
-        if request.SOS_phone:
-            sos_contact.phone = request.SOS_phone
-            db.add(sos_contact)
-    else:    
-        if request.SOS_fullname and request.SOS_phone:
-            sos_contact = EmergencyContact(
-                full_name=request.SOS_fullname,
-                phone=request.SOS_phone,
-                patient_id=user.id,
-                role="SOS_contact",
-            )
-            db.add(sos_contact)
-            
+            # a changed height or weight is also the latest point of its series
+            readings = {
+                kind: value
+                for kind, value in request.dict(include=set(PROFILE_KINDS)).items()
+                if value is not None
+            }
+            if readings:
+                record_vitals(db, user.id, readings)
 
-    db.add(patient)
+            sos_contact = patient.emergency_contacts[0] if patient.emergency_contacts else None
+            if sos_contact:
+                if request.SOS_fullname:
+                    sos_contact.full_name = request.SOS_fullname
+                if request.SOS_phone:
+                    sos_contact.phone = request.SOS_phone
+            else:
+                if request.SOS_fullname and request.SOS_phone:
+                    db.stage(EmergencyContact(
+                        full_name=request.SOS_fullname,
+                        phone=request.SOS_phone,
+                        patient_id=user.id,
+                        role="SOS_contact",
+                    ))
+    finally:
+        # also after a rejected update (a bad image is a 400 or 413), so
+        # the next request reloads the principal rather than trusting it
+        auth.invalidate_principal(user.email)
+    if readings:
+        invalidate_summary(user.id)
+    if request.image:
+        job_queue.wake()
     return {"message": "Profile updated successfully!"}
 
 @router.get(
-    "/profile", response_model=ShowPatientProfile, status_code=status.HTTP_200_OK
+    "/profile", response_model=ShowPatientProfile, status_code=status.HTTP_200_OK,
+    dependencies=[Depends(query_budget(1))],
 )
-def profile(db: Session = Depends(load), user: User = Depends(auth.get_current_user)):
-    patient = db.query_eng(Patient).filter(Patient.id == user.id).first()
-    sos_contact = (
-        db.query_eng(EmergencyContact)
-        .filter(EmergencyContact.patient_id == user.id)
-        .first()
+def profile(
+    user: Patient = Depends(
+        auth.require_role("patient", principal=auth.get_current_user_read)
+    ),
+):
+    # emergency contacts were eager-loaded with the principal
+    sos_contact = user.emergency_contacts[0] if user.emergency_contacts else None
+    return serializer_for(ShowPatientProfile).response(
+        user,
+        SOS_fullname=sos_contact.full_name if sos_contact else None,
+        SOS_phone=sos_contact.phone if sos_contact else None,
     )
-    image_base64 = base64.b64encode(patient.image).decode('utf-8') if patient.image else None
-    if image_base64:
-        image_base64 = f"{patient.image_header};base64,{image_base64}"
-    patient_dict = {key: value for key, value in patient.__dict__.items() if key != 'image'}
-
-    return {
-        **user.__dict__,
-        **patient_dict,
-        "image": image_base64,
-        "SOS_fullname": sos_contact.full_name if sos_contact else None,
-        "SOS_phone": sos_contact.phone if sos_contact else None,
-    }
@@ -0,0 +1,109 @@
+#!/usr/bin/python3
+"""This module contians the vital sign endpoints"""
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app.config.config import settings
+from app.engine.load import load, load_read
+from app.models.patient import Patient
+from app.models.vital import VitalKind
+from app.schema.appointment import to_naive_utc
+from app.schema.auth import TokenClaims
+from app.schema.vital import RecordVitals, VitalSeries, VitalSummary
+from app.utils import auth
+from app.utils.query_audit import query_budget
+from app.utils.serializer import serializer_for
+from app.utils.vitals import (
+    PROFILE_KINDS,
+    bucket_seconds,
+    build_series,
+    invalidate_summary,
+    record_vitals,
+    series_statement,
+    vital_summary,
+)
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+router = APIRouter(prefix="/v1/vitals", tags=["vitals"])
+
+
+@router.post(
+    "/", status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(query_budget(2))],
+)
+def record(
+    request: RecordVitals,
+    db: Session = Depends(load),
+    user: TokenClaims = Depends(
+        auth.require_role("patient", principal=auth.get_current_claims)
+    ),
+):
+    """
+    Record readings taken together; all rows go in with one statement.
+    """
+    readings = request.readings()
+    profile = {kind: readings[kind] for kind in PROFILE_KINDS if kind in readings}
+    with db.transaction():
+        rows = record_vitals(db, user.id, readings, request.measured_at)
+        # a backfilled reading is history, not the current value
+        if profile and request.measured_at is None:
+            db.execute(
+                update(Patient.__table__)
+                .where(Patient.__table__.c.id == user.id)
+                .values(**profile)
+            )
+
+    invalidate_summary(user.id)
+    if profile and request.measured_at is None:
+        auth.invalidate_principal(user.email)
+    return {"message": "Vitals recorded successfully!", "recorded": len(rows)}
+
+
+@router.get(
+    "/series", response_model=VitalSeries, status_code=status.HTTP_200_OK,
+    dependencies=[Depends(query_budget(1))],
+)
+def series(
+    kind: VitalKind,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    points: int = Query(
+        settings.VITALS_SERIES_POINTS, ge=1, le=settings.VITALS_SERIES_MAX_POINTS
+    ),
+    db: Session = Depends(load_read),
+    user: TokenClaims = Depends(
+        auth.require_role("patient", principal=auth.get_current_claims)
+    ),
+):
+    """
+    One vital between start (default a year ago) and end (default now),
+    downsampled to at most points min/max/mean buckets.
+    """
+    end = to_naive_utc(end) if end else datetime.utcnow()
+    start = to_naive_utc(start) if start else end - timedelta(days=365)
+    if end <= start:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=[{"msg": "end must be after start"}],
+        )
+    width = bucket_seconds(start, end, points)
+    rows = db.execute(series_statement(user.id, kind.value, start, end, width)).all()
+    return serializer_for(VitalSeries).response(build_series(kind, start, end, width, rows))
+
+
+@router.get(
+    "/summary", response_model=VitalSummary, status_code=status.HTTP_200_OK,
+    dependencies=[Depends(query_budget(2))],
+)
+def summary(
+    db: Session = Depends(load_read),
+    user: TokenClaims = Depends(
+        auth.require_role("patient", principal=auth.get_current_claims)
+    ),
+):
+    """
+    The profile card: latest reading and 90-day trend of every vital, and the BMI.
+    """
+    return Response(vital_summary(db, user.id), media_type="application/json")
@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+"""
+this module defines the schema for making requests
+and returning responses to the appointment endpoints
+"""
+
+from datetime import datetime, timedelta, timezone
+from pydantic import BaseModel, conint, validator
+
+MAX_WINDOW = timedelta(hours=24)
+MAX_SLOT_MINUTES = 240
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    """appointments are stored as naive UTC"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class CreateAvailability(BaseModel):
+    starts_at: datetime
+    ends_at: datetime
+    slot_minutes: conint(ge=5, le=MAX_SLOT_MINUTES) = 30  # type: ignore
+
+    _naive = validator('starts_at', 'ends_at', allow_reuse=True)(to_naive_utc)
+
+    @validator('ends_at')
+    def validate_span(cls, value, values):
+        starts_at = values.get('starts_at')
+        if starts_at is not None:
+            if value <= starts_at:
+                raise ValueError("ends_at must be after starts_at")
+            if value - starts_at > MAX_WINDOW:
+                raise ValueError("an availability window cannot exceed 24 hours")
+        return value
+
+
+class ShowAvailability(BaseModel):
+    id: str
+    doctor_id: str
+    starts_at: datetime
+    ends_at: datetime
+    slot_minutes: int
+
+    class Config:
+        orm_mode = True
+
+
+class BookAppointment(BaseModel):
+    doctor_id: str
+    starts_at: datetime
+
+    _naive = validator('starts_at', allow_reuse=True)(to_naive_utc)
+
+
+class ShowAppointment(BaseModel):
+    id: str
+    doctor_id: str
+    patient_id: str
+    starts_at: datetime
+    ends_at: datetime
+    status: str
+
+    class Config:
+        orm_mode = True
+
+
+class ShowSlot(BaseModel):
+    doctor_id: str
+    starts_at: datetime
+    ends_at: datetime
@@ -9,3 +9,11 @@ class Token(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class TokenClaims(BaseModel):
+    """the principal of claims-only routes, built from the token without a lookup"""
+    id: str
+    email: str
+    role: str
+    version: int = 0
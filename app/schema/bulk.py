@@ -0,0 +1,82 @@
+#!/usr/bin/python3
+"""
+this module defines the schema of the records accepted
+and produced by the bulk onboarding import and export
+"""
+
+from datetime import date
+from enum import Enum
+from typing import Optional
+
+from pydantic import BaseModel, EmailStr, SecretStr, constr, root_validator, validator
+
+from app.models.doctor import GenderEnum
+
+
+class BulkRole(str, Enum):
+    doctor = "doctor"
+    patient = "patient"
+
+
+class BulkFormat(str, Enum):
+    csv = "csv"
+    ndjson = "ndjson"
+
+
+class ImportUser(BaseModel):
+    first_name: str
+    last_name: str
+    email: EmailStr
+    phone: constr(min_length=11, max_length=14)  # type: ignore
+    password: Optional[SecretStr] = None
+    password_hash: Optional[str] = None
+
+    @validator('*', pre=True)
+    def empty_str_to_none(cls, v):
+        """CSV cells are never missing, only empty"""
+        return None if v == "" else v
+
+    @validator('gender', pre=True, check_fields=False)
+    def validate_gender(cls, value):
+        if isinstance(value, str):
+            value = value.capitalize()
+        return value
+
+    @root_validator()
+    def verify_password_given(cls, values):
+        if not values.get("password") and not values.get("password_hash"):
+            raise ValueError("Either password or password_hash must be provided.")
+        return values
+
+
+class ImportDoctor(ImportUser):
+    dob: Optional[date] = None
+    gender: Optional[GenderEnum] = None
+    height: Optional[float] = None
+    weight: Optional[float] = None
+    medicalLicense: Optional[str] = None
+    hospitalAffiliation: Optional[str] = None
+    resumeLink: Optional[str] = None
+    professionalBio: Optional[str] = None
+    calendarLink: Optional[str] = None
+
+
+class ImportPatient(ImportUser):
+    dob: Optional[date] = None
+    gender: Optional[GenderEnum] = None
+    height: Optional[float] = None
+    weight: Optional[float] = None
+    medical_history: Optional[str] = None
+    SOS_fullname: Optional[str] = None
+    SOS_phone: Optional[constr(min_length=11, max_length=14)] = None  # type: ignore
+
+
+class ImportRowError(BaseModel):
+    row: int
+    msg: str
+
+
+class ImportReport(BaseModel):
+    inserted: int
+    failed: int
+    errors: list[ImportRowError]
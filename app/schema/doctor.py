@@ -5,7 +5,7 @@ and returning responses to the patient endpoints
 """
 
 from datetime import date
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, validator
 
@@ -49,6 +49,7 @@ class ShowDoctorProfile(BaseModel):
     resumeLink: Optional[str] = None
     professionalBio: Optional[str] = None
     image: Optional[str] = None
+    avatar: Optional[str] = None
     calendarLink: Optional[str] = None
 
     class Config:
@@ -60,6 +61,7 @@ class ShowDoctorSchedule(BaseModel):
     id: str
     calendarLink: Optional[str] = None
     image: Optional[str] = None
+    thumbnail: Optional[str] = None
 
     class Config:
         orm_mode = True
@@ -69,9 +71,15 @@ class ShowDoctorCard(BaseModel):
     last_name: str
     id: str
     image: Optional[str] = None
+    thumbnail: Optional[str] = None
     calendarLink: Optional[str] = None
     professionalBio: Optional[str] = None
 
 
     class Config:
         orm_mode = True
+
+
+class DoctorCatalogPage(BaseModel):
+    items: List[ShowDoctorCard]
+    next_cursor: Optional[str] = None
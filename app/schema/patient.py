@@ -60,6 +60,7 @@ class ShowPatientProfile(BaseModel):
     weight: Optional[float] = None
     medical_history: Optional[str] = None
     image: Optional[str] = None
+    avatar: Optional[str] = None
     SOS_fullname: Optional[str] = None
     SOS_phone: Optional[str] = None
 
@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+"""
+this module defines the schema for making requests
+and returning responses to the vitals endpoints
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, confloat, root_validator, validator
+
+from app.models.vital import VitalKind
+from app.schema.appointment import to_naive_utc
+
+# readings from a device whose clock runs slightly ahead are still accepted
+CLOCK_SKEW = timedelta(minutes=5)
+
+
+class RecordVitals(BaseModel):
+    """readings taken together; measured_at defaults to now"""
+
+    measured_at: Optional[datetime] = None
+    weight: Optional[confloat(gt=0, le=700)] = None  # type: ignore
+    height: Optional[confloat(gt=0, le=300)] = None  # type: ignore
+    systolic: Optional[confloat(ge=40, le=300)] = None  # type: ignore
+    diastolic: Optional[confloat(ge=20, le=200)] = None  # type: ignore
+    heart_rate: Optional[confloat(ge=20, le=300)] = None  # type: ignore
+    temperature: Optional[confloat(ge=25, le=45)] = None  # type: ignore
+    spo2: Optional[confloat(ge=50, le=100)] = None  # type: ignore
+    glucose: Optional[confloat(gt=0, le=50)] = None  # type: ignore
+
+    _naive = validator('measured_at', allow_reuse=True)(to_naive_utc)
+
+    @validator('measured_at')
+    def validate_measured_at(cls, value):
+        if value is not None and value > datetime.utcnow() + CLOCK_SKEW:
+            raise ValueError("measured_at cannot be in the future")
+        return value
+
+    @root_validator(skip_on_failure=True)
+    def validate_readings(cls, values):
+        if all(values.get(kind.value) is None for kind in VitalKind):
+            raise ValueError("at least one reading is required")
+        return values
+
+    def readings(self) -> Dict[str, float]:
+        """the readings that were given, by kind"""
+        return {
+            kind.value: getattr(self, kind.value)
+            for kind in VitalKind
+            if getattr(self, kind.value) is not None
+        }
+
+
+class VitalBucket(BaseModel):
+    start: datetime
+    min: float
+    max: float
+    mean: float
+    count: int
+
+
+class VitalSeries(BaseModel):
+    kind: VitalKind
+    start: datetime
+    end: datetime
+    bucket_seconds: int
+    buckets: List[VitalBucket]
+
+
+class LatestVital(BaseModel):
+    value: float
+    measured_at: datetime
+    # least-squares change per day over the trend window; None with too few readings
+    trend_per_day: Optional[float] = None
+
+
+class VitalSummary(BaseModel):
+    vitals: Dict[str, LatestVital]
+    bmi: Optional[float] = None
@@ -1,20 +1,72 @@
 #!/usr/bin/env python3
 
+from .cache import TTLCache
 from .cookie import OAuth2PasswordBearerWithCookie
+from .hasher import password_hasher
+from .token_versions import token_versions
 from app.config.config import settings
-from app.engine.load import load
+from app.engine.async_storage import AsyncDBStorage
+from app.engine.load import load, load_async, load_read, load_read_async
+from app.models.doctor import Doctor
+from app.models.patient import Patient
+from app.models.refresh_token import RefreshToken
 from app.models.user import User
+from app.schema.auth import TokenClaims
 from datetime import datetime, timedelta, timezone
 from fastapi import Depends, HTTPException, Request, Response, status
 from jose import JWTError, jwt  # type: ignore
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload, with_polymorphic
+from starlette.concurrency import run_in_threadpool
 
-from passlib.context import CryptContext  # type: ignore
 
+oauth2_scheme = OAuth2PasswordBearerWithCookie(tokenUrl="/v1/auth/token")
+# for routes such as logout that also serve callers without a token
+optional_oauth2_scheme = OAuth2PasswordBearerWithCookie(
+    tokenUrl="/v1/auth/token", auto_error=False
+)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# detached User rows keyed by token subject, so authenticated requests
+# skip the users lookup until the entry expires or is invalidated
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL
+)
 
-oauth2_scheme = OAuth2PasswordBearerWithCookie(tokenUrl="/v1/auth/token")
+
+def invalidate_principal(username: str):
+    """
+    Drop the cached principal of a user.
+
+    Parameters:
+    username (str): The token subject (the user's email).
+
+    Note:
+    Must be called by every path that changes or deletes a user so the next
+    request reloads the row instead of serving the stale cached one.
+    """
+    principal_cache.invalidate(username)
+
+
+def cache_principal(db, username: str, user: User):
+    """
+    Cache a principal just loaded by a request.
+
+    Parameters:
+    db (DBStorage | AsyncDBStorage): The request's storage the user was loaded with.
+    username (str): The token subject (the user's email).
+    user (User): The loaded principal.
+
+    Note:
+    The row is detached first, so attach() in the route merges into a new
+    copy; edits and rollbacks of the request never reach the cached object.
+    Rows read from a replica are not cached: the replica may not have the
+    write that invalidated the entry yet.
+    """
+    if db.from_replica:
+        return
+    db.detach(user)
+    principal_cache.set(username, user)
 
 
 def get_password_hash(password: str) -> str:
@@ -28,13 +80,13 @@ def get_password_hash(password: str) -> str:
     str: The hashed password.
 
     Raises:
-    None
+    HTTPException: 429 if the hashing pool is saturated.
 
     Note:
-    This function uses the CryptContext class from the passlib library to hash the password.
-    The hashed password is returned as a string.
+    The bcrypt work runs in the dedicated password_hasher process pool;
+    the calling thread only waits for the result.
     """
-    hash: str = pwd_context.hash(password)
+    hash: str = password_hasher.hash(password)
     return hash
 
 
@@ -50,16 +102,59 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     bool: True if the plain text password matches the hashed password, False otherwise.
 
     Raises:
-    None
+    HTTPException: 429 if the hashing pool is saturated.
 
     Note:
-    This function uses the CryptContext class from the passlib library to verify the password.
-    The pwd_context object is assumed to be globally defined and initialized with the bcrypt scheme.
+    The bcrypt work runs in the dedicated password_hasher process pool;
+    the calling thread only waits for the result.
     """
-    verified: bool = pwd_context.verify(plain_password, hashed_password)
+    verified: bool = password_hasher.verify(plain_password, hashed_password)
     return verified
 
 
+async def get_password_hash_async(password: str) -> str:
+    """
+    Async variant of get_password_hash that does not block the event loop.
+    """
+    return await password_hasher.hash_async(password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Async variant of verify_password that does not block the event loop.
+    """
+    return await password_hasher.verify_async(plain_password, hashed_password)
+
+
+def registration_conflict(error: IntegrityError, phone: str, email: str) -> HTTPException:
+    """
+    Map a unique-constraint violation raised while inserting a user to the 409 error payloads.
+
+    Parameters:
+    error (IntegrityError): The error raised by the insert.
+    phone (str): The phone number being registered.
+    email (str): The (lowercased) email being registered.
+
+    Returns:
+    HTTPException: A 409 naming the conflicting field.
+
+    Raises:
+    IntegrityError: If the violation is not on the phone or email constraints.
+    """
+    message = str(error.orig)
+    if "users_phone_key" in message:
+        return HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=[{"msg": f"user with phone: {phone} exists"}],
+        )
+    if "ix_users_email_lower" in message or "users_email_key" in message:
+        return HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=[{"msg": f"user with email: {email} exists"}],
+        )
+    raise error
+
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     """
     Generate an access token for a user using JWT.
@@ -88,6 +183,247 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     return encoded_jwt
 
 
+def credentials_exception() -> HTTPException:
+    """
+    Build the 401 error raised whenever a token cannot be validated.
+    """
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def token_claims(user: User) -> dict:
+    """
+    Build the claims of an access token for a user.
+
+    Parameters:
+    user (User): The authenticated user.
+
+    Returns:
+    dict: sub (email), role, uid (user id) and ver (the user's token version),
+    enough for claims-only routes to authorize the request without a lookup.
+    """
+    return {"sub": user.email, "role": user.role, "uid": user.id, "ver": user.token_version}
+
+
+def decode_token(token: str) -> dict:
+    """
+    Decode and validate an access token.
+
+    Parameters:
+    token (str): The encoded JWT.
+
+    Returns:
+    dict: The token payload.
+
+    Raises:
+    HTTPException: If the token is invalid, expired, has no subject or was revoked.
+
+    Note:
+    Revocation is checked against the in-memory token_versions, so it costs
+    no query. Tokens issued before versioning carry no uid and stay valid
+    until they expire.
+    """
+    try:
+        payload = jwt.decode(
+            token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM]
+        )
+    except JWTError:
+        raise credentials_exception()
+    if payload.get("sub") is None:
+        raise credentials_exception()
+    user_id = payload.get("uid")
+    if user_id is not None and not token_versions.is_current(user_id, payload.get("ver", 0)):
+        raise credentials_exception()
+    return payload
+
+
+def get_token_subject(token: str) -> str:
+    """
+    Decode an access token and return its subject (the user's email).
+
+    Parameters:
+    token (str): The encoded JWT.
+
+    Returns:
+    str: The value of the "sub" claim.
+
+    Raises:
+    HTTPException: If the token is invalid, expired, has no subject or was revoked.
+    """
+    return decode_token(token)["sub"]
+
+
+async def get_current_claims(token: str = Depends(oauth2_scheme)) -> TokenClaims:
+    """
+    Resolve the principal from the access token alone, without touching the database.
+
+    Parameters:
+    token (str): The access token provided by the OAuth2PasswordBearerWithCookie.
+
+    Returns:
+    TokenClaims: The user id, email, role and token version the token was issued with.
+
+    Raises:
+    HTTPException: If the token is invalid, revoked or predates claims-only tokens.
+
+    Note:
+    For routes that only need to know who is calling and in what role; use
+    get_current_user when the row itself is needed. Use as
+    require_role(..., principal=get_current_claims) to gate a route by role.
+    """
+    payload = decode_token(token)
+    if payload.get("uid") is None:
+        raise credentials_exception()
+    return TokenClaims(
+        id=payload["uid"],
+        email=payload["sub"],
+        role=payload.get("role"),
+        version=payload.get("ver", 0),
+    )
+
+
+def token_user_id(token: str | None) -> str | None:
+    """
+    Return the user id of a valid, unrevoked token, or None for anything else.
+    """
+    if not token:
+        return None
+    try:
+        return decode_token(token).get("uid")
+    except HTTPException:
+        return None
+
+
+def revoke_statement(user_id: str):
+    """
+    Build the statement bumping a user's token version.
+
+    Parameters:
+    user_id (str): The id of the user whose tokens are revoked.
+
+    Returns:
+    Update: Increments token_version and stamps tokens_revoked_at on the
+    database clock (so other processes pick the bump up whatever their own
+    clocks say), returning the new version and the email.
+    """
+    return (
+        update(User.__table__)
+        .where(User.__table__.c.id == user_id)
+        .values(
+            token_version=User.__table__.c.token_version + 1,
+            tokens_revoked_at=func.now(),
+            updated_at=datetime.now(),
+        )
+        .returning(User.__table__.c.token_version, User.__table__.c.email)
+    )
+
+
+def revoke_tokens(db: Session, user_id: str):
+    """
+    Revoke every access token issued to a user so far.
+
+    Parameters:
+    db (Session): The database session.
+    user_id (str): The id of the user.
+
+    Note:
+    Called by logout (and any future password change). Takes effect at once in
+    this process and within TOKEN_VERSION_REFRESH_SECONDS in the others.
+    """
+    row = db.execute(revoke_statement(user_id)).first()
+    db.commit()
+    if row is not None:
+        token_versions.bump(user_id, row.token_version)
+        invalidate_principal(row.email)
+
+
+async def revoke_tokens_async(db: AsyncDBStorage, user_id: str):
+    """
+    Async variant of revoke_tokens.
+    """
+    row = (await db.execute(revoke_statement(user_id))).first()
+    await db.commit()
+    if row is not None:
+        token_versions.bump(user_id, row.token_version)
+        invalidate_principal(row.email)
+
+
+def token_versions_statement(watermark=None):
+    """
+    Build the query for the token versions token_versions should apply.
+
+    Parameters:
+    watermark (datetime, optional): The latest revocation already applied.
+
+    Returns:
+    Select: (id, token_version, tokens_revoked_at) of every user that revoked
+    tokens, served by the partial index ix_users_token_revoked.
+
+    Note:
+    Revocations stamped up to TOKEN_VERSION_OVERLAP_SECONDS before the
+    watermark are read again, so one whose transaction committed after a
+    later-stamped one was read is never skipped; applying a row twice is
+    harmless.
+    """
+    stmt = select(User.id, User.token_version, User.tokens_revoked_at).where(
+        User.token_version > 0
+    )
+    if watermark is not None:
+        overlap = timedelta(seconds=settings.TOKEN_VERSION_OVERLAP_SECONDS)
+        stmt = stmt.where(User.tokens_revoked_at >= watermark - overlap)
+    return stmt
+
+
+def principal_statement(username: str):
+    """
+    Build the query loading the user behind a token subject.
+
+    Parameters:
+    username (str): The token subject (the user's email).
+
+    Returns:
+    Select: A single statement that outer-joins the patient and doctor tables,
+    so the row loads as the right subclass with every column present, and
+    eager-loads a patient's emergency contacts in the same round trip.
+    """
+    principal = with_polymorphic(User, [Patient, Doctor])
+    return (
+        select(principal)
+        .options(joinedload(principal.Patient.emergency_contacts))
+        .where(principal.email == username)
+    )
+
+
+def recent_principals_statement(limit: int):
+    """
+    Build the query loading the users most likely to send the next requests.
+
+    Parameters:
+    limit (int): The most users to load.
+
+    Returns:
+    Select: The principals, loaded exactly as principal_statement loads them,
+    of the users holding a live refresh token, most recently signed in first.
+    """
+    tokens = RefreshToken.__table__
+    active = (
+        select(tokens.c.user_id, func.max(tokens.c.created_at).label("signed_in_at"))
+        .where(tokens.c.revoked_at.is_(None), tokens.c.expires_at > datetime.utcnow())
+        .group_by(tokens.c.user_id)
+        .order_by(func.max(tokens.c.created_at).desc())
+        .limit(limit)
+        .subquery()
+    )
+    principal = with_polymorphic(User, [Patient, Doctor])
+    return (
+        select(principal)
+        .join(active, active.c.user_id == principal.id)
+        .options(joinedload(principal.Patient.emergency_contacts))
+    )
+
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(load)):
     """
     Retrieve the current user based on the provided access token.
@@ -97,56 +433,103 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     db (Session, optional): The database session object to be used for querying the user. If not provided, the function will use the session object provided by the load function.
 
     Returns:
-    User: The User object representing the current user.
+    User: The current user, loaded as its Patient, Doctor or Admin subclass.
 
     Raises:
     HTTPException: If the access token is not valid or the user does not exist in the database.
 
     Note:
-    This function decodes the access token using the JWT library, retrieves the username from the payload, and queries the database to find the corresponding user.
+    This function decodes the access token using the JWT library, retrieves the username from the payload, and queries the database to find the corresponding user
+    unless it is already held in principal_cache.
     If the access token is not valid or the user does not exist, an HTTPException is raised with appropriate error details.
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(
-            token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM]
-        )
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    user = db.query_eng(User).filter(User.email == username).first()
+    username = get_token_subject(token)
+    user = principal_cache.get(username)
     if user is None:
-        raise credentials_exception
+        user = db.execute(principal_statement(username)).unique().scalars().first()
+        if user is None:
+            raise credentials_exception()
+        cache_principal(db, username, user)
+    return user
+
+
+def get_current_user_read(
+    token: str = Depends(oauth2_scheme), db: Session = Depends(load_read)
+) -> User:
+    """
+    get_current_user for read-only routes: a principal missing from the
+    cache is loaded from a read replica.
+    """
+    return get_current_user(token, db)
+
+
+def require_role(*roles: str, principal=None):
+    """
+    Build a dependency that returns the current user if their role is one of roles.
+
+    Parameters:
+    roles (str): The roles allowed through.
+    principal (Callable, optional): The dependency resolving the user; defaults to get_current_user.
+
+    Returns:
+    Callable: A FastAPI dependency resolving to the authenticated User.
+
+    Raises:
+    HTTPException: 403 from the dependency if the user has another role.
+    """
+    def dependency(user: User = Depends(principal or get_current_user)) -> User:
+        if user.role not in roles:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=[{"msg": f"{' or '.join(roles)} privileges required"}],
+            )
+        return user
+
+    return dependency
+
+
+get_current_admin = require_role("admin")
+
+
+def find_login_user(username: str, db: Session) -> User | None:
+    """
+    Look up the user signing in by email, then end the transaction so the
+    pooled connection goes back before the password is checked.
+
+    Parameters:
+    username (str): The lowercased email of the user.
+    db (Session): The database session object used for the lookup.
+
+    Returns:
+    User | None: The user, still loaded (sessions do not expire on commit), or None.
+    """
+    user = db.query_eng(User).filter(func.lower(User.email) == username).first()
+    db.commit()
     return user
 
 
-def authenticate_user(username: str, password: str, db: Session = Depends(load)) -> User | bool:
+async def authenticate_user(username: str, password: str, db: Session) -> User | bool:
     """
     Authenticate a user based on their username and password.
 
     Parameters:
     username (str): The username of the user to be authenticated.
     password (str): The password of the user to be authenticated.
-    db (Session, optional): The database session object to be used for querying the user. If not provided, the function will use the session object provided by the load function.
+    db (Session): The database session object to be used for querying the user.
 
     Returns:
     Union[User, bool]: If the user is authenticated and exists in the database, the User object is returned. If the user does not exist or the password is incorrect, False is returned.
 
     Note:
-    This function queries the database to find the user with the provided username.
-    It then verifies the password using the verify_password function.
-    If the user is authenticated, the User object is returned. Otherwise, False is returned.
+    The lookup runs in the threadpool and releases its connection; the
+    bcrypt verification is then awaited on the password_hasher process
+    pool, so a burst of logins holds neither request threads nor pooled
+    connections while it waits.
     """
-    user = db.query_eng(User).filter(User.email == username).first()
+    user = await run_in_threadpool(find_login_user, username, db)
     if not user:
         return False
-    if not verify_password(password, user.password_hash):
+    if not await verify_password_async(password, user.password_hash):
         return False
     return user
 
@@ -219,7 +602,7 @@ def get_current_user_from_cookie(request: Request, db: Session = Depends(load))
     db (Session, optional): The database session object to be used for querying the user. If not provided, the function will use the session object provided by the load function.
 
     Returns:
-    User: The User object representing the current user.
+    User: The current user, loaded as its Patient, Doctor or Admin subclass.
 
     Raises:
     HTTPException: If the access token is not valid or the user does not exist in the database.
@@ -230,21 +613,75 @@ def get_current_user_from_cookie(request: Request, db: Session = Depends(load))
     If the access token is not valid or the user does not exist, an HTTPException is raised with appropriate error details.
     """
     token = request.cookies.get("access_token")
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(
-            token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM]
-        )
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    user = db.query_eng(User).filter(User.email == username).first()
+    username = get_token_subject(token)
+    user = principal_cache.get(username)
     if user is None:
-        raise credentials_exception
+        user = db.execute(principal_statement(username)).unique().scalars().first()
+        if user is None:
+            raise credentials_exception()
+        cache_principal(db, username, user)
+    return user
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme), db: AsyncDBStorage = Depends(load_async)
+) -> User:
+    """
+    Async variant of get_current_user for routers served on the asyncio engine.
+
+    Parameters:
+    token (str): The access token provided by the OAuth2PasswordBearerWithCookie.
+    db (AsyncDBStorage): The async database session provided by load_async.
+
+    Returns:
+    User: The current user, loaded as its Patient, Doctor or Admin subclass.
+
+    Raises:
+    HTTPException: If the access token is not valid or the user does not exist in the database.
+    """
+    username = get_token_subject(token)
+    user = principal_cache.get(username)
+    if user is None:
+        result = await db.execute(principal_statement(username))
+        user = result.unique().scalars().first()
+        if user is None:
+            raise credentials_exception()
+        cache_principal(db, username, user)
+    return user
+
+
+async def get_current_user_read_async(
+    token: str = Depends(oauth2_scheme), db: AsyncDBStorage = Depends(load_read_async)
+) -> User:
+    """
+    Async variant of get_current_user_read.
+    """
+    return await get_current_user_async(token, db)
+
+
+async def authenticate_user_async(
+    username: str, password: str, db: AsyncDBStorage
+) -> User | bool:
+    """
+    Async variant of authenticate_user.
+
+    Parameters:
+    username (str): The username of the user to be authenticated.
+    password (str): The password of the user to be authenticated.
+    db (AsyncDBStorage): The async database session used to look the user up.
+
+    Returns:
+    Union[User, bool]: The User object if the credentials are valid, False otherwise.
+
+    Note:
+    The connection is released after the lookup, and the bcrypt verification is awaited on the
+    password_hasher process pool, keeping the event loop free.
+    """
+    user = await db.find_one(User, func.lower(User.email) == username)
+    # return the connection to the pool for the duration of the bcrypt check
+    await db.commit()
+    if not user:
+        return False
+    if not await verify_password_async(password, user.password_hash):
+        return False
     return user
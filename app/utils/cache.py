@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""bounded in-process caches"""
+
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    A thread-safe LRU cache whose entries also expire after ttl seconds.
+
+    Attributes:
+    maxsize (int): The number of entries kept before the least recently used is evicted.
+    ttl (float): The number of seconds an entry stays valid.
+    hits (int): The number of get() calls answered from the cache.
+    misses (int): The number of get() calls that found nothing or an expired entry.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.__data = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Return the value cached under key, or default if absent or expired.
+        """
+        now = time.monotonic()
+        with self.__lock:
+            entry = self.__data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > now:
+                    self.__data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.__data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        """
+        Cache value under key, evicting the least recently used entries if full.
+        """
+        with self.__lock:
+            self.__data[key] = (time.monotonic() + self.ttl, value)
+            self.__data.move_to_end(key)
+            while len(self.__data) > self.maxsize:
+                self.__data.popitem(last=False)
+
+    def invalidate(self, key):
+        """
+        Drop the entry cached under key, if any.
+        """
+        with self.__lock:
+            self.__data.pop(key, None)
+
+    def clear(self):
+        """
+        Drop every entry.
+        """
+        with self.__lock:
+            self.__data.clear()
+
+    def __len__(self):
+        return len(self.__data)
+
+    def stats(self) -> dict:
+        """
+        Return the size and hit/miss counters of the cache.
+        """
+        return {
+            "size": len(self.__data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""the public doctor catalog query, shared by the routers and the startup warm-up"""
+
+from app.models.doctor import Doctor, GenderEnum
+from app.models.user import User
+from app.schema.doctor import DoctorCatalogPage
+from app.utils.pagination import build_page, keyset_page
+from app.utils.serializer import serializer_for
+from sqlalchemy import func, select
+
+CATALOG_PATH = "/v1/doctor/all"
+CATALOG_PAGE_SIZE = 20
+
+
+def catalog_statement(
+    limit: int,
+    cursor: str | None = None,
+    hospitalAffiliation: str | None = None,
+    gender: GenderEnum | None = None,
+):
+    """
+    Build the query for one page of the doctor catalog.
+
+    Parameters:
+    limit (int): The page size.
+    cursor (str, optional): The next_cursor of the previous page.
+    hospitalAffiliation (str, optional): Only doctors of this hospital, case-insensitively.
+    gender (GenderEnum, optional): Only doctors of this gender.
+
+    Returns:
+    Select: A keyset-paginated statement fetching limit + 1 doctors.
+    """
+    # the role predicate lets Postgres walk ix_users_doctor_catalog in order
+    stmt = select(Doctor).where(User.role == "doctor")
+    if hospitalAffiliation:
+        stmt = stmt.where(
+            func.lower(Doctor.hospitalAffiliation) == hospitalAffiliation.lower()
+        )
+    if gender:
+        stmt = stmt.where(Doctor.gender == gender)
+    return keyset_page(stmt, User, cursor, limit)
+
+
+def catalog_page(doctors: list, limit: int) -> bytes:
+    """
+    Encode the doctors fetched by catalog_statement as a catalog page.
+    """
+    return serializer_for(DoctorCatalogPage).dumps(build_page(doctors, limit))
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""read-your-writes for replica reads: clients that just wrote read from the primary"""
+
+import time
+
+from app.config.config import settings
+from fastapi import Request
+from starlette.datastructures import MutableHeaders
+
+# holds the unix time until which the client's reads go to the primary
+STICKY_COOKIE = "db_primary_until"
+SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+
+def reads_from_replica(request: Request) -> bool:
+    """
+    Whether a request may be served from a read replica: it must not write,
+    and the client must not have written within DB_READ_YOUR_WRITES_SECONDS.
+    """
+    if request.method not in SAFE_METHODS:
+        return False
+    until = request.cookies.get(STICKY_COOKIE)
+    if not until:
+        return True
+    try:
+        return float(until) <= time.time()
+    except ValueError:
+        return True
+
+
+def sticky_cookie() -> str:
+    """the Set-Cookie value pinning a client to the primary for the stickiness window"""
+    seconds = settings.DB_READ_YOUR_WRITES_SECONDS
+    return (
+        f"{STICKY_COOKIE}={time.time() + seconds:.0f}; Domain=astrafort.tech; "
+        f"Max-Age={seconds}; Path=/; Secure; HttpOnly; SameSite=none"
+    )
+
+
+class ReadYourWritesMiddleware:
+    """
+    Plain ASGI middleware marking every client that sends a write, so its
+    reads skip the replicas until they have surely replayed that write.
+
+    The mark travels with the client, so it holds whichever worker serves
+    the next read, and costs nothing for clients that only read.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("set-cookie", sticky_cookie())
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
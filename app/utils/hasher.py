@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""runs bcrypt hashing in a dedicated, bounded process pool"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.config.config import settings
+from fastapi import HTTPException, status
+from passlib.context import CryptContext  # type: ignore
+
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def bcrypt_hash(password: str) -> str:
+    """runs inside a pool worker process"""
+    return pwd_context.hash(password)
+
+
+def bcrypt_verify(plain_password: str, hashed_password: str) -> bool:
+    """runs inside a pool worker process"""
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    Submits bcrypt work to its own process pool so a burst of logins or
+    registrations cannot starve the request threadpool.
+
+    At most max_pending jobs may be queued or running; any further request
+    is rejected immediately with a 429 instead of waiting.
+
+    Attributes:
+    workers (int): The number of worker processes.
+    max_pending (int): The bound on queued plus running jobs.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.__executor = None
+        self.__slots = threading.BoundedSemaphore(max_pending)
+        self.__lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def _executor(self) -> ProcessPoolExecutor:
+        # created on first use so each forked server worker gets its own pool
+        if self.__executor is None:
+            with self.__lock:
+                if self.__executor is None:
+                    self.__executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self.__executor
+
+    def _submit(self, fn, *args):
+        if not self.__slots.acquire(blocking=False):
+            with self.__lock:
+                self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=[{"msg": "Too many authentication requests, try again shortly"}],
+                headers={"Retry-After": "1"},
+            )
+        started = time.perf_counter()
+        with self.__lock:
+            self.pending += 1
+        try:
+            future = self._executor().submit(fn, *args)
+        except Exception:
+            self._done(started)
+            raise
+        future.add_done_callback(lambda _: self._done(started))
+        return future
+
+    def _done(self, started: float):
+        elapsed = time.perf_counter() - started
+        with self.__lock:
+            self.pending -= 1
+            self.completed += 1
+            self.latency_total += elapsed
+            self.latency_max = max(self.latency_max, elapsed)
+        self.__slots.release()
+
+    def hash(self, password: str) -> str:
+        """hashes password, blocking the calling thread until done"""
+        return self._submit(bcrypt_hash, password).result()
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """verifies a password, blocking the calling thread until done"""
+        return self._submit(bcrypt_verify, plain_password, hashed_password).result()
+
+    async def hash_async(self, password: str) -> str:
+        """hashes password without blocking the event loop"""
+        return await asyncio.wrap_future(self._submit(bcrypt_hash, password))
+
+    async def verify_async(self, plain_password: str, hashed_password: str) -> bool:
+        """verifies a password without blocking the event loop"""
+        return await asyncio.wrap_future(
+            self._submit(bcrypt_verify, plain_password, hashed_password)
+        )
+
+    def stats(self) -> dict:
+        """
+        Return queue depth, rejection count and hash latency figures.
+        """
+        with self.__lock:
+            return {
+                "queue_depth": self.pending,
+                "max_pending": self.max_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "latency_avg_seconds": (
+                    self.latency_total / self.completed if self.completed else 0.0
+                ),
+                "latency_max_seconds": self.latency_max,
+            }
+
+    def shutdown(self):
+        """stops the worker processes"""
+        with self.__lock:
+            if self.__executor is not None:
+                self.__executor.shutdown(wait=True)
+            self.__executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=settings.HASHER_WORKERS, max_pending=settings.HASHER_MAX_PENDING
+)
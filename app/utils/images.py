@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""helpers for validating, storing and resizing profile images"""
+
+import base64
+import binascii
+import io
+import logging
+from datetime import datetime
+
+from app.config.config import settings
+from app.engine.async_storage import AsyncDBStorage
+from app.engine.blob_store import get_blob_store
+from app.engine.db_storage import DBStorage
+from app.models.doctor import Doctor
+from app.models.patient import Patient
+from app.models.user import User
+from app.utils.auth import invalidate_principal
+from app.utils.jobs import enqueue, job
+from app.utils.response_cache import catalog_cache
+from app.utils.search import doctor_index
+from fastapi import HTTPException, Request, status
+from multipart.multipart import MultipartParser, parse_options_header
+from sqlalchemy import update
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile
+from starlette.formparsers import MultiPartException, MultiPartMessage, MultiPartParser
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # without Pillow no variants are made; the original is served
+    Image = ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+# room for the multipart boundaries and part headers around the file
+MULTIPART_OVERHEAD = 16 * 1024
+UPLOAD_FIELD = "file"
+
+# the models whose rows carry a profile image, by role
+PROFILE_MODELS = {"patient": Patient, "doctor": Doctor}
+
+
+def sniff_image_type(head: bytes) -> str | None:
+    """
+    Detect the mime type of an image from its leading bytes.
+
+    Parameters:
+    head (bytes): At least the first 12 bytes of the file.
+
+    Returns:
+    str | None: The mime type, or None if the bytes are not a supported image.
+    """
+    for signature, mime in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return mime
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def image_too_large() -> HTTPException:
+    """
+    Build the 413 error raised for images over IMAGE_UPLOAD_MAX_BYTES.
+    """
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=[{"msg": f"Image larger than {settings.IMAGE_UPLOAD_MAX_BYTES} bytes"}],
+    )
+
+
+def decode_data_url(value: str) -> tuple[str, bytes]:
+    """
+    Decode a base64 image, optionally wrapped in a data URL.
+
+    Parameters:
+    value (str): "data:image/png;base64,..." or a bare base64 string.
+
+    Returns:
+    tuple[str, bytes]: The detected mime type and the raw image bytes.
+
+    Raises:
+    HTTPException: If the string is not valid base64 or not a supported image,
+    or 413 if it decodes to more than IMAGE_UPLOAD_MAX_BYTES.
+    """
+    if value.startswith("data:") and ";base64," in value:
+        value = value.split(";base64,", 1)[1]
+    # checked before decoding so an oversized image is never copied again
+    if len(value) * 3 // 4 > settings.IMAGE_UPLOAD_MAX_BYTES:
+        raise image_too_large()
+    try:
+        data = base64.b64decode(value)
+    except binascii.Error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=[{"msg": "Invalid base64-encoded string for image"}],
+        )
+    mime = sniff_image_type(data[:12])
+    if mime is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=[{"msg": "Unsupported image type"}],
+        )
+    return mime, data
+
+
+def store_image(value: str) -> tuple[str, str]:
+    """
+    Decode a base64 image and write it to the blob store.
+
+    Parameters:
+    value (str): The base64 image sent by the client.
+
+    Returns:
+    tuple[str, str]: The content hash the image is stored under and its mime type.
+    """
+    mime, data = decode_data_url(value)
+    return get_blob_store().put(data), mime
+
+
+def set_image(db, user, key: str, mime: str):
+    """
+    Point a patient or doctor at a new profile image, drop the variants of
+    the previous one and queue the resizing of the new one in the same
+    unit of work.
+    """
+    user.image_hash, user.image_mime = key, mime
+    user.avatar_hash = user.thumbnail_hash = None
+    enqueue(db, "image_variants", role=user.role, user_id=user.id, email=user.email, key=key)
+
+
+async def capped_stream(request: Request, limit: int):
+    """
+    Yield the request body, raising a 413 as soon as it exceeds limit bytes.
+    """
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > limit:
+            raise image_too_large()
+        yield chunk
+
+
+class ImageFormParser(MultiPartParser):
+    """
+    Desc:
+        A multipart parser that spools only the UPLOAD_FIELD file.
+        Unlike MultiPartParser.parse, the file is closed as soon as the body
+        turns out malformed or too large, not left to the garbage collector.
+    """
+
+    CALLBACKS = (
+        "on_part_begin", "on_part_data", "on_part_end", "on_header_field",
+        "on_header_value", "on_header_end", "on_headers_finished", "on_end",
+    )
+
+    async def parse(self) -> UploadFile | None:
+        """
+        Returns:
+        UploadFile | None: The first complete UPLOAD_FIELD file, rewound, or
+        None if the body has none.
+        """
+        self.upload, self.complete = None, False
+        try:
+            await self.spool()
+        except BaseException:
+            if self.upload is not None:
+                await self.upload.close()
+            raise
+        if self.upload is not None and not self.complete:
+            await self.upload.close()
+            return None
+        return self.upload
+
+    async def spool(self):
+        _, params = parse_options_header(self.headers["Content-Type"])
+        if b"boundary" not in params:
+            raise MultiPartException("Missing boundary in multipart.")
+        parser = MultipartParser(
+            params[b"boundary"], {name: getattr(self, name) for name in self.CALLBACKS}
+        )
+        field = value = disposition = b""
+        writing = False
+        async for chunk in self.stream:
+            parser.write(chunk)
+            messages, self.messages = self.messages, []
+            for message, data in messages:
+                if message == MultiPartMessage.PART_BEGIN:
+                    disposition, writing = b"", False
+                elif message == MultiPartMessage.HEADER_FIELD:
+                    field += data
+                elif message == MultiPartMessage.HEADER_VALUE:
+                    value += data
+                elif message == MultiPartMessage.HEADER_END:
+                    if field.lower() == b"content-disposition":
+                        disposition = value
+                    field = value = b""
+                elif message == MultiPartMessage.HEADERS_FINISHED:
+                    _, options = parse_options_header(disposition)
+                    writing = (
+                        self.upload is None
+                        and options.get(b"name") == UPLOAD_FIELD.encode()
+                        and b"filename" in options
+                    )
+                    if writing:
+                        self.upload = UploadFile(filename=options[b"filename"].decode("latin-1"))
+                elif message == MultiPartMessage.PART_DATA and writing:
+                    await self.upload.write(data)
+                elif message == MultiPartMessage.PART_END and writing:
+                    await self.upload.seek(0)
+                    self.complete, writing = True, False
+        parser.finalize()
+
+
+async def receive_image(request: Request) -> tuple[UploadFile, str]:
+    """
+    Read the image of a multipart/form-data upload.
+
+    The body is parsed as it arrives and only the image is spooled to a
+    temporary file, so an upload is never held in memory whole; a body over
+    the size cap is refused without reading the rest of it, and the partial
+    file is closed.
+
+    Parameters:
+    request (Request): A request with the image in its "file" field.
+
+    Returns:
+    tuple[UploadFile, str]: The spooled upload, rewound, and its detected mime type.
+
+    Raises:
+    HTTPException: 413 if the image is over IMAGE_UPLOAD_MAX_BYTES, 415 if
+    it is not multipart or not a supported image, 400 if the file is missing.
+    """
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=[{"msg": "Upload the image as multipart/form-data"}],
+        )
+    limit = settings.IMAGE_UPLOAD_MAX_BYTES + MULTIPART_OVERHEAD
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > limit:
+        raise image_too_large()
+
+    try:
+        upload = await ImageFormParser(request.headers, capped_stream(request, limit)).parse()
+    except MultiPartException as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=[{"msg": str(e)}]
+        )
+    if upload is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=[{"msg": f"No image in the {UPLOAD_FIELD!r} field"}],
+        )
+
+    size = upload.file.seek(0, io.SEEK_END)
+    upload.file.seek(0)
+    if size > settings.IMAGE_UPLOAD_MAX_BYTES:
+        await upload.close()
+        raise image_too_large()
+    mime = sniff_image_type(upload.file.read(12))
+    upload.file.seek(0)
+    if mime is None:
+        await upload.close()
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=[{"msg": "Unsupported image type"}],
+        )
+    return upload, mime
+
+
+def profile_image_statement(role: str, user_id: str, key: str, mime: str):
+    """
+    Build the statement pointing a user's row at a new profile image.
+    """
+    model = PROFILE_MODELS[role]
+    return (
+        update(model.__table__)
+        .where(model.__table__.c.id == user_id)
+        .values(image_hash=key, image_mime=mime, avatar_hash=None, thumbnail_hash=None)
+    )
+
+
+def variants_statement(role: str, user_id: str, key: str, avatar_key: str,
+                       thumbnail_key: str):
+    """
+    Build the statement recording the variants of an image.
+
+    Note:
+    Only applies while the row still points at key, so variants of an image
+    that was replaced in the meantime are never attached to its successor.
+    """
+    table = PROFILE_MODELS[role].__table__
+    return (
+        update(table)
+        .where(table.c.id == user_id, table.c.image_hash == key)
+        .values(avatar_hash=avatar_key, thumbnail_hash=thumbnail_key)
+    )
+
+
+def touch_statement(user_id: str):
+    """
+    Build the statement bumping a user's updated_at, so the search index of
+    every process picks the change up.
+
+    Note:
+    Stamped on the same local clock as every other users.updated_at writer
+    (BaseModel.save), since the index watermark compares them.
+    """
+    users = User.__table__
+    return update(users).where(users.c.id == user_id).values(updated_at=datetime.now())
+
+
+def image_changed(role: str, email: str):
+    """
+    Drop the cached copies showing a user's previous image; a doctor's
+    search card is re-read from the touched row on the next search.
+    """
+    invalidate_principal(email)
+    if role == "doctor":
+        catalog_cache.bump()
+        doctor_index.mark_stale()
+
+
+def save_profile_image(role: str, user_id: str, email: str, key: str, mime: str):
+    """
+    Desc:
+        points a patient or doctor at an uploaded image in one transaction
+    """
+    db = DBStorage()
+    db.setup_db()
+    try:
+        with db.transaction():
+            db.execute(profile_image_statement(role, user_id, key, mime))
+            db.execute(touch_statement(user_id))
+            enqueue(db, "image_variants", role=role, user_id=user_id, email=email, key=key)
+    finally:
+        db.close()
+    image_changed(role, email)
+
+
+async def save_profile_image_async(role: str, user_id: str, email: str, key: str,
+                                   mime: str):
+    """
+    Async variant of save_profile_image.
+    """
+    db = AsyncDBStorage()
+    db.setup_db()
+    try:
+        async with db.transaction():
+            await db.execute(profile_image_statement(role, user_id, key, mime))
+            await db.execute(touch_statement(user_id))
+            enqueue(db, "image_variants", role=role, user_id=user_id, email=email, key=key)
+    finally:
+        await db.close()
+    image_changed(role, email)
+
+
+def encode_variant(image, size: int) -> bytes:
+    """
+    Crop an image to a centered square of size pixels and encode it as WebP.
+    """
+    variant = ImageOps.fit(image, (size, size), Image.LANCZOS)
+    buffer = io.BytesIO()
+    variant.save(buffer, "WEBP", quality=settings.IMAGE_VARIANT_QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def render_variants(f) -> tuple[bytes, bytes]:
+    """
+    Decode an image once and render its avatar and thumbnail.
+
+    Parameters:
+    f: A binary file object reading the original image.
+
+    Returns:
+    tuple[bytes, bytes]: The WebP avatar and thumbnail.
+    """
+    image = Image.open(f)
+    # lets the JPEG decoder scale down while decoding, far cheaper than a full decode
+    image.draft("RGB", (settings.IMAGE_AVATAR_SIZE, settings.IMAGE_AVATAR_SIZE))
+    # applies the camera's orientation tag, which the variants would lose
+    image = ImageOps.exif_transpose(image)
+    transparent = "A" in image.getbands() or "transparency" in image.info
+    image = image.convert("RGBA" if transparent else "RGB")
+    avatar = encode_variant(image, settings.IMAGE_AVATAR_SIZE)
+    thumbnail = encode_variant(image, settings.IMAGE_THUMBNAIL_SIZE)
+    return avatar, thumbnail
+
+
+def store_variants(key: str) -> tuple[str, str] | None:
+    """
+    Resize the image stored under key and store its variants.
+
+    Returns:
+    tuple[str, str] | None: The avatar and thumbnail keys, or None if Pillow
+    is not installed or the image cannot be decoded.
+    """
+    if Image is None:
+        return None
+    store = get_blob_store()
+    try:
+        with store.open(key) as f:
+            avatar, thumbnail = render_variants(f)
+    except Exception:
+        # a corrupt upload can fail anywhere in Pillow's decoders; the
+        # original is served and the job is not retried
+        logger.exception("Could not resize image %s", key)
+        return None
+    return store.put(avatar), store.put(thumbnail)
+
+
+def build_image_variants(role: str, user_id: str, email: str, key: str):
+    """
+    Resize a freshly stored profile image and attach the variants to the
+    user's row.
+
+    Parameters:
+    role (str): "patient" or "doctor".
+    user_id (str): The owner of the image.
+    email (str): The owner's token subject, to drop their cached principal.
+    key (str): The blob store key of the original image.
+    """
+    variants = store_variants(key)
+    if variants is None:
+        return
+    db = DBStorage()
+    db.setup_db()
+    try:
+        with db.transaction():
+            result = db.execute(variants_statement(role, user_id, key, *variants))
+            if result.rowcount:
+                db.execute(touch_statement(user_id))
+    finally:
+        db.close()
+    if result.rowcount:
+        image_changed(role, email)
+
+
+async def build_image_variants_async(role: str, user_id: str, email: str, key: str):
+    """
+    Async variant of build_image_variants; the resizing runs in the threadpool.
+    """
+    variants = await run_in_threadpool(store_variants, key)
+    if variants is None:
+        return
+    db = AsyncDBStorage()
+    db.setup_db()
+    try:
+        async with db.transaction():
+            result = await db.execute(variants_statement(role, user_id, key, *variants))
+            if result.rowcount:
+                await db.execute(touch_statement(user_id))
+    finally:
+        await db.close()
+    if result.rowcount:
+        image_changed(role, email)
+
+
+@job("image_variants")
+async def image_variants(role: str, user_id: str, email: str, key: str):
+    """
+    Job handler: builds the variants on the configured engine. Running it
+    twice only rewrites the same content-addressed blobs.
+    """
+    if settings.DB_ASYNC:
+        await build_image_variants_async(role, user_id, email, key)
+    else:
+        await run_in_threadpool(build_image_variants, role, user_id, email, key)
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+durable background jobs without a broker
+
+A job is a jobs row staged in the same transaction as the change that
+asked for it (a transactional outbox), so it is committed exactly when that
+change is. Every API process runs a few worker tasks that claim due rows
+with FOR UPDATE SKIP LOCKED, run the registered handler and delete the row,
+or schedule a retry with exponential backoff. A worker that dies mid-job
+loses its lease after JOB_LEASE_SECONDS and the job runs again, so handlers
+must be idempotent. Each claim carries a lease token, and a worker that
+outlived its lease can no longer record an outcome for the job.
+
+usage:
+    @job("image_variants")
+    def image_variants(role, user_id, email, key): ...
+
+    with db.transaction():
+        ...
+        enqueue(db, "image_variants", role=role, user_id=user_id, email=email, key=key)
+    job_queue.wake()
+"""
+
+import asyncio
+import importlib
+import inspect
+import logging
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from app.config.config import settings
+from app.engine.async_storage import AsyncDBStorage
+from app.engine.db_storage import DBStorage
+from app.models.job import Job
+from app.utils.metrics import JOB_DURATION
+from sqlalchemy import and_, or_, select, update
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+PENDING, RUNNING, FAILED = "pending", "running", "failed"
+
+# modules whose handlers register themselves on import
+HANDLER_MODULES = ("app.utils.images",)
+
+HANDLERS = {}
+
+
+def job(name: str):
+    """
+    Register a function as the handler of the jobs called name.
+
+    Handlers receive the job's payload as keyword arguments. Plain functions
+    run in the threadpool, coroutine functions on the event loop.
+    """
+
+    def register(handler):
+        HANDLERS[name] = handler
+        return handler
+
+    return register
+
+
+def load_handlers():
+    """imports every module listed in HANDLER_MODULES so their handlers are registered"""
+    for module in HANDLER_MODULES:
+        importlib.import_module(module)
+
+
+def new_job(name: str, payload: dict, delay: float = 0, max_attempts: int | None = None) -> Job:
+    """
+    Build an unsaved job row.
+
+    Parameters:
+    name (str): The name a handler was registered under.
+    payload (dict): JSON-serializable keyword arguments of the handler.
+    delay (float, optional): Seconds to wait before the first attempt.
+    max_attempts (int, optional): Defaults to JOB_MAX_ATTEMPTS.
+
+    Returns:
+    Job: The row to stage in the caller's transaction.
+    """
+    return Job(
+        name=name,
+        payload=payload,
+        status=PENDING,
+        attempts=0,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        run_at=datetime.utcnow() + timedelta(seconds=delay),
+    )
+
+
+def enqueue(db, name: str, delay: float = 0, **payload) -> Job:
+    """
+    Stage a job in the caller's unit of work; it is committed, and becomes
+    visible to the workers, together with everything else in it.
+
+    Parameters:
+    db (DBStorage | AsyncDBStorage): The request's storage.
+    name (str): The name a handler was registered under.
+    delay (float, optional): Seconds to wait before the first attempt.
+    payload: JSON-serializable keyword arguments of the handler.
+
+    Returns:
+    Job: The staged row.
+    """
+    row = new_job(name, payload, delay)
+    db.stage(row)
+    return row
+
+
+def backoff(attempts: int) -> float:
+    """
+    Seconds to wait before retrying a job that failed attempts times:
+    exponential, capped at JOB_BACKOFF_MAX_SECONDS, with jitter so jobs that
+    failed together do not retry together.
+    """
+    delay = min(
+        settings.JOB_BACKOFF_MAX_SECONDS, settings.JOB_BACKOFF_SECONDS * 2 ** (attempts - 1)
+    )
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def claim_statement(limit: int):
+    """
+    Build the statement claiming up to limit due jobs for this worker.
+
+    Returns:
+    Update: Marks the claimed rows running under a fresh lease, returning
+    their id, lease, name, payload, attempts and max_attempts. Rows locked
+    by another worker's claim are skipped, never waited on.
+    """
+    jobs = Job.__table__
+    now = datetime.utcnow()
+    due = (
+        select(jobs.c.id)
+        .where(
+            or_(
+                and_(jobs.c.status == PENDING, jobs.c.run_at <= now),
+                # the worker running it is gone
+                and_(jobs.c.status == RUNNING, jobs.c.locked_until < now),
+            )
+        )
+        .order_by(jobs.c.run_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return (
+        update(jobs)
+        .where(jobs.c.id.in_(due.scalar_subquery()))
+        .values(
+            status=RUNNING,
+            attempts=jobs.c.attempts + 1,
+            locked_until=now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+            lease=str(uuid.uuid4()),
+            updated_at=now,
+        )
+        .returning(
+            jobs.c.id, jobs.c.lease, jobs.c.name, jobs.c.payload,
+            jobs.c.attempts, jobs.c.max_attempts,
+        )
+    )
+
+
+def held(job_id: str, lease: str):
+    """
+    The condition matching a job only while the claim holding lease still runs it.
+    """
+    jobs = Job.__table__
+    return and_(jobs.c.id == job_id, jobs.c.status == RUNNING, jobs.c.lease == lease)
+
+
+def done_statement(job_id: str, lease: str):
+    """
+    Build the statement removing a job that ran successfully.
+
+    Returns:
+    Delete: Returns the id if the lease was still held.
+    """
+    jobs = Job.__table__
+    return jobs.delete().where(held(job_id, lease)).returning(jobs.c.id)
+
+
+def retry_statement(job_id: str, lease: str, attempts: int, error: str):
+    """
+    Build the statement putting a failed job back in the queue after its backoff.
+
+    Returns:
+    Update: Returns the id if the lease was still held.
+    """
+    jobs = Job.__table__
+    now = datetime.utcnow()
+    return (
+        update(jobs)
+        .where(held(job_id, lease))
+        .values(
+            status=PENDING,
+            run_at=now + timedelta(seconds=backoff(attempts)),
+            locked_until=None,
+            lease=None,
+            last_error=error,
+            updated_at=now,
+        )
+        .returning(jobs.c.id)
+    )
+
+
+def fail_statement(job_id: str, lease: str, error: str):
+    """
+    Build the statement parking a job that used up its attempts.
+
+    Returns:
+    Update: Returns the id if the lease was still held.
+    """
+    jobs = Job.__table__
+    return (
+        update(jobs)
+        .where(held(job_id, lease))
+        .values(
+            status=FAILED, locked_until=None, lease=None, last_error=error,
+            updated_at=datetime.utcnow(),
+        )
+        .returning(jobs.c.id)
+    )
+
+
+def retry_failed_statement(name: str | None = None):
+    """
+    Build the statement giving every failed job (of one name) a fresh set of attempts.
+    """
+    jobs = Job.__table__
+    now = datetime.utcnow()
+    stmt = update(jobs).where(jobs.c.status == FAILED)
+    if name:
+        stmt = stmt.where(jobs.c.name == name)
+    return stmt.values(status=PENDING, attempts=0, run_at=now, updated_at=now)
+
+
+def _execute(stmt) -> list:
+    db = DBStorage()
+    db.setup_db()
+    try:
+        with db.transaction():
+            result = db.execute(stmt)
+            return result.all() if result.returns_rows else []
+    finally:
+        db.close()
+
+
+async def _execute_async(stmt) -> list:
+    db = AsyncDBStorage()
+    db.setup_db()
+    try:
+        async with db.transaction():
+            result = await db.execute(stmt)
+            return result.all() if result.returns_rows else []
+    finally:
+        await db.close()
+
+
+async def execute(stmt) -> list:
+    """runs a statement in its own transaction on the configured engine"""
+    if settings.DB_ASYNC:
+        return await _execute_async(stmt)
+    return await run_in_threadpool(_execute, stmt)
+
+
+class JobQueue:
+    """
+    The worker tasks of one process. Each claims and runs one job at a time,
+    so workers bounds how many jobs this process runs at once.
+
+    Workers poll every poll_seconds; wake() makes them look right away, so
+    a job enqueued by this process starts as soon as it is committed.
+    """
+
+    def __init__(self, workers: int, poll_seconds: float):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+        self.__loop = None
+        self.__wakeup = None
+        self.__tasks = []
+
+    async def start(self):
+        """starts the worker tasks on the running event loop"""
+        load_handlers()
+        self.__loop = asyncio.get_running_loop()
+        self.__wakeup = asyncio.Event()
+        self.__tasks = [asyncio.create_task(self.__work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """cancels the worker tasks; a job cut short is retried once its lease expires"""
+        for task in self.__tasks:
+            task.cancel()
+        await asyncio.gather(*self.__tasks, return_exceptions=True)
+        self.__tasks = []
+        self.__loop = self.__wakeup = None
+
+    def wake(self):
+        """
+        Desc:
+            tells the workers to look for jobs now; safe to call from any
+            thread, and a no-op while the queue is not running
+        """
+        loop, wakeup = self.__loop, self.__wakeup
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(wakeup.set)
+
+    async def __work(self):
+        while True:
+            self.__wakeup.clear()
+            try:
+                claimed = await self.run_due(1)
+            except Exception as e:
+                # the database is unreachable; try again on the next poll
+                logger.warning("Failed to claim jobs: %s", e)
+                claimed = 0
+            if claimed:
+                continue
+            try:
+                await asyncio.wait_for(self.__wakeup.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run_due(self, limit: int) -> int:
+        """
+        Claim and run up to limit due jobs.
+
+        Returns:
+        int: The number of jobs claimed.
+        """
+        rows = await execute(claim_statement(limit))
+        for row in rows:
+            await self.run(row)
+        return len(rows)
+
+    async def run(self, row):
+        """runs one claimed job and records its outcome"""
+        handler = HANDLERS.get(row.name)
+        start = time.perf_counter()
+        try:
+            if handler is None:
+                raise LookupError(f"no handler registered for job {row.name!r}")
+            if inspect.iscoroutinefunction(handler):
+                await handler(**row.payload)
+            else:
+                await run_in_threadpool(handler, **row.payload)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if handler is None or row.attempts >= row.max_attempts:
+                logger.error("Job %s %s failed for good: %s", row.name, row.id, error)
+                recorded = await execute(fail_statement(row.id, row.lease, error))
+                self.failed += 1
+                outcome = "failed"
+            else:
+                logger.warning("Job %s %s failed, will retry: %s", row.name, row.id, error)
+                recorded = await execute(retry_statement(row.id, row.lease, row.attempts, error))
+                self.retried += 1
+                outcome = "retried"
+        else:
+            recorded = await execute(done_statement(row.id, row.lease))
+            self.completed += 1
+            outcome = "done"
+        if not recorded:
+            # the lease expired mid-run and the job was claimed again; the
+            # new holder records its outcome
+            logger.warning("Job %s %s outlived its lease; outcome %s dropped", row.name, row.id, outcome)
+        JOB_DURATION.labels(row.name, outcome).observe(time.perf_counter() - start)
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self.__tasks),
+            "completed": self.completed,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+
+job_queue = JobQueue(workers=settings.JOB_WORKERS, poll_seconds=settings.JOB_POLL_SECONDS)
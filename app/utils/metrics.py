@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""request, SQL and connection pool metrics in Prometheus format"""
+
+import os
+import time
+from contextvars import ContextVar
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.config.config import settings
+
+# requests that matched no route share one label so a scan cannot blow up
+# the number of series
+UNMATCHED = "unmatched"
+# any other request method is recorded as OTHER_METHOD, so clients cannot mint series
+HTTP_METHODS = frozenset(
+    ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "CONNECT", "TRACE")
+)
+OTHER_METHOD = "other"
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0
+)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time spent serving a request, by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_DB_STATEMENTS = Histogram(
+    "http_request_db_statements",
+    "SQL statements executed while serving a request",
+    ["route"],
+    buckets=STATEMENT_BUCKETS,
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds",
+    "Time spent in SQL statements while serving a request",
+    ["route"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_STATEMENT_SECONDS = Histogram(
+    "db_statement_duration_seconds",
+    "Time spent executing a single SQL statement",
+    buckets=LATENCY_BUCKETS,
+)
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool",
+    ["engine"],
+    buckets=LATENCY_BUCKETS,
+)
+JOB_DURATION = Histogram(
+    "job_duration_seconds",
+    "Time spent running a background job, by job name and outcome",
+    ["job", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+class RequestStats:
+    """
+    SQL work attributed to the request being served.
+
+    log holds (statement, parameters) of every statement only while a
+    QueryAuditMiddleware is auditing the request; budget is the limit a
+    route declared through query_audit.query_budget.
+    """
+
+    __slots__ = ("statements", "seconds", "log", "budget")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+        self.log = None
+        self.budget = None
+
+
+# set by MetricsMiddleware; threadpool workers run in a copy of the request's
+# context, so they add to the same RequestStats
+_request_stats: ContextVar = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> RequestStats | None:
+    """returns the SQL stats of the request being served, if any"""
+    return _request_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    DB_STATEMENT_SECONDS.observe(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.seconds += elapsed
+        if stats.log is not None:
+            stats.log.append((statement, parameters))
+
+
+def _handle_error(exception_context):
+    # a failed statement never reaches after_cursor_execute
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_started"):
+        conn.info["query_started"].pop()
+
+
+_pools = {}
+
+
+def instrument_engine(engine, name: str):
+    """
+    Desc:
+        times every statement run on a (sync) engine and exposes its pool
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    _pools[name] = engine.pool
+
+
+def _timed(pool_class, name: str):
+    """returns a subclass of pool_class that records checkout wait time"""
+    wait = POOL_CHECKOUT_WAIT.labels(name)
+
+    class TimedPool(pool_class):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                wait.observe(time.perf_counter() - start)
+
+    TimedPool.__name__ = f"Timed{pool_class.__name__}"
+    return TimedPool
+
+
+TimedQueuePool = _timed(QueuePool, "sync")
+TimedAsyncAdaptedQueuePool = _timed(AsyncAdaptedQueuePool, "async")
+
+
+class PoolCollector:
+    """reads pool utilization at scrape time, so the hot path pays nothing"""
+
+    def collect(self):
+        size = GaugeMetricFamily(
+            "db_pool_size", "Connections the pool keeps open", labels=["engine"]
+        )
+        checked_out = GaugeMetricFamily(
+            "db_pool_checked_out", "Connections currently in use", labels=["engine"]
+        )
+        overflow = GaugeMetricFamily(
+            "db_pool_overflow", "Connections opened beyond pool_size", labels=["engine"]
+        )
+        utilization = GaugeMetricFamily(
+            "db_pool_utilization",
+            "Connections in use over pool_size + max_overflow",
+            labels=["engine"],
+        )
+        capacity = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+        for name, pool in list(_pools.items()):
+            in_use = pool.checkedout()
+            size.add_metric([name], pool.size())
+            checked_out.add_metric([name], in_use)
+            overflow.add_metric([name], max(pool.overflow(), 0))
+            utilization.add_metric([name], in_use / capacity if capacity else 0.0)
+        yield from (size, checked_out, overflow, utilization)
+
+
+REGISTRY.register(PoolCollector())
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware timing each request under its route template
+    (/v1/doctor/{doctor_id}, not the concrete path) together with the SQL
+    statements it ran.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_stats.reset(token)
+            # the router stores the matched route in the scope
+            route = getattr(scope.get("route"), "path", UNMATCHED)
+            method = scope["method"] if scope["method"] in HTTP_METHODS else OTHER_METHOD
+            REQUEST_LATENCY.labels(method, route, str(status_code)).observe(elapsed)
+            REQUEST_DB_STATEMENTS.labels(route).observe(stats.statements)
+            REQUEST_DB_SECONDS.labels(route).observe(stats.seconds)
+
+
+def exposition() -> tuple:
+    """
+    Render every metric in the Prometheus text format.
+
+    Under gunicorn each worker keeps its own metrics; when
+    PROMETHEUS_MULTIPROC_DIR is set they are merged from the shared directory.
+
+    Returns:
+    tuple[bytes, str]: The body and its content type.
+    """
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(PoolCollector())
+    return generate_latest(registry), CONTENT_TYPE_LATEST
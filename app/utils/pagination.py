@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""keyset (cursor) pagination helpers ordered on (created_at, id)"""
+
+import base64
+import binascii
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+
+
+def encode_cursor(obj) -> str:
+    """
+    Encode the (created_at, id) position of obj as an opaque cursor.
+
+    Parameters:
+    obj (BaseModel): The last object of the current page.
+
+    Returns:
+    str: A url-safe cursor string.
+    """
+    raw = f"{obj.created_at.isoformat()}|{obj.id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Parameters:
+    cursor (str): The cursor sent by the client.
+
+    Returns:
+    tuple[datetime, str]: The created_at and id the next page starts after.
+
+    Raises:
+    HTTPException: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), id
+    except (binascii.Error, UnicodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=[{"msg": "Invalid cursor"}],
+        )
+
+
+def keyset_page(stmt, model, cursor: str | None, limit: int):
+    """
+    Restrict a select() to the page that follows cursor.
+
+    Parameters:
+    stmt (Select): The filtered select statement.
+    model (Base): The model whose created_at and id columns order the page; for
+        joined-inheritance models pass the base class so the users columns are used.
+    cursor (str, optional): The cursor of the previous page, None for the first page.
+    limit (int): The page size.
+
+    Returns:
+    Select: The statement ordered on (created_at, id), fetching one extra row
+    so build_page can tell whether another page exists.
+    """
+    if cursor:
+        created_at, id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(model.created_at, model.id) > tuple_(created_at, id))
+    return stmt.order_by(model.created_at, model.id).limit(limit + 1)
+
+
+def build_page(rows: list, limit: int) -> dict:
+    """
+    Split the rows fetched by keyset_page into a page and its next cursor.
+
+    Returns:
+    dict: {"items": [...], "next_cursor": str | None}
+    """
+    items = rows[:limit]
+    next_cursor = encode_cursor(items[-1]) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
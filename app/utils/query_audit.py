@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""per-request SQL auditing: query budgets, repeated statements and N+1 patterns"""
+
+import logging
+from collections import Counter
+
+from app.config.config import settings
+from app.utils.metrics import RequestStats, _request_stats, current_request_stats
+
+logger = logging.getLogger(__name__)
+
+OFF, WARN, RAISE = "off", "warn", "raise"
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+    Raised in QUERY_AUDIT=raise mode when a request breaks its query budget,
+    repeats a statement or shows an N+1 pattern. It is an AssertionError so
+    a test driving the app through TestClient fails on it.
+    """
+
+    def __init__(self, route: str, problems: list):
+        self.route = route
+        self.problems = problems
+        super().__init__(f"{route}: " + "; ".join(problems))
+
+
+def query_budget(max_statements: int):
+    """
+    Declare the most SQL statements a route may run, principal lookup included.
+
+    Usage:
+        @router.get("/profile", dependencies=[Depends(query_budget(1))])
+
+    Parameters:
+    max_statements (int): The budget; only enforced when QUERY_AUDIT is on.
+
+    Returns:
+    Callable: A dependency recording the budget on the current request.
+    """
+
+    # async so it runs on the event loop instead of taking a threadpool slot
+    async def declare_budget():
+        stats = current_request_stats()
+        if stats is not None:
+            stats.budget = max_statements
+
+    return declare_budget
+
+
+def audit(stats: RequestStats) -> list:
+    """
+    Return what is wrong with the SQL a request ran.
+
+    Parameters:
+    stats (RequestStats): The statements recorded while serving the request.
+
+    Returns:
+    list[str]: One message per problem; empty if the request is clean.
+    """
+    problems = []
+    if stats.budget is not None and stats.statements > stats.budget:
+        problems.append(
+            f"ran {stats.statements} SQL statements, budget is {stats.budget}"
+        )
+
+    exact = Counter((statement, repr(parameters)) for statement, parameters in stats.log)
+    for (statement, _), count in exact.items():
+        if count > 1:
+            problems.append(f"repeated {count}x: {statement}")
+    # an N+1 is one statement issued again and again with different parameters
+    variants = Counter(statement for statement, _ in exact)
+    for statement, distinct in variants.items():
+        if distinct >= settings.QUERY_AUDIT_N_PLUS_ONE:
+            problems.append(
+                f"N+1: same statement with {distinct} different parameters: {statement}"
+            )
+    return problems
+
+
+class QueryAuditMiddleware:
+    """
+    Plain ASGI middleware recording every statement of a request and
+    reporting it once the response is sent: logged in "warn" mode, raised
+    as QueryBudgetExceeded in "raise" mode (tests, local debugging).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # share the stats MetricsMiddleware set up, if it runs outside us
+        stats = current_request_stats()
+        token = None
+        if stats is None:
+            stats = RequestStats()
+            token = _request_stats.set(stats)
+        stats.log = []
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if token is not None:
+                _request_stats.reset(token)
+
+        problems = audit(stats)
+        if not problems:
+            return
+        route = getattr(scope.get("route"), "path", scope["path"])
+        if settings.QUERY_AUDIT == RAISE:
+            raise QueryBudgetExceeded(route, problems)
+        for problem in problems:
+            logger.warning("%s %s: %s", scope["method"], route, problem)
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+rotating refresh tokens: renew a session with a signature check and one
+row update instead of a bcrypt password verify
+
+Every refresh token is a signed JWT whose jti is a refresh_tokens row.
+Presenting it consumes the row and issues a successor in the same family.
+Presenting an already consumed token again means it was copied: the whole
+family is revoked and the user's access tokens are versioned out.
+"""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app.config.config import settings
+from app.engine.async_storage import AsyncDBStorage
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+from app.utils.auth import (
+    create_access_token,
+    revoke_tokens,
+    revoke_tokens_async,
+    token_claims,
+)
+from fastapi import HTTPException, Response, status
+from jose import JWTError, jwt  # type: ignore
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+REFRESH_COOKIE = "refresh_token"
+# only the auth endpoints ever see the refresh cookie
+REFRESH_COOKIE_PATH = "/v1/auth"
+TOKEN_TYPE = "refresh"
+
+
+def refresh_exception() -> HTTPException:
+    """
+    Build the 401 error raised whenever a refresh token cannot be used.
+    """
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not refresh the session",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def new_refresh_token(user, family_id: str | None = None) -> tuple:
+    """
+    Build a refresh token for a user and the row recording it.
+
+    Parameters:
+    user: Anything with id and token_version (a User or a returned row).
+    family_id (str, optional): The login session being rotated; a new one if omitted.
+
+    Returns:
+    tuple[str, RefreshToken]: The encoded JWT and its unsaved row.
+    """
+    jti = str(uuid.uuid4())
+    family_id = family_id or jti
+    expire = datetime.now(timezone.utc) + timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES)
+    token = jwt.encode(
+        {
+            "typ": TOKEN_TYPE,
+            "jti": jti,
+            "fam": family_id,
+            "uid": user.id,
+            "ver": user.token_version,
+            "exp": expire,
+        },
+        settings.JWT_SECRET_KEY,
+        algorithm=settings.JWT_ALGORITHM,
+    )
+    row = RefreshToken(
+        id=jti,
+        user_id=user.id,
+        family_id=family_id,
+        # naive UTC like the other timestamp columns compared in SQL
+        expires_at=expire.replace(tzinfo=None),
+    )
+    return token, row
+
+
+def decode_refresh_token(token: str | None) -> dict:
+    """
+    Check the signature, expiry and type of a refresh token.
+
+    Parameters:
+    token (str): The encoded JWT from the refresh cookie.
+
+    Returns:
+    dict: The token payload.
+
+    Raises:
+    HTTPException: 401 if the token is missing, invalid, expired or not a refresh token.
+    """
+    if not token:
+        raise refresh_exception()
+    try:
+        payload = jwt.decode(
+            token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM]
+        )
+    except JWTError:
+        raise refresh_exception()
+    if payload.get("typ") != TOKEN_TYPE or not payload.get("jti"):
+        raise refresh_exception()
+    return payload
+
+
+def refresh_user_id(token: str | None) -> str | None:
+    """
+    Return the user id of a valid refresh token, or None for anything else.
+    """
+    try:
+        return decode_refresh_token(token).get("uid")
+    except HTTPException:
+        return None
+
+
+def consume_statement(payload: dict):
+    """
+    Build the statement consuming a refresh token.
+
+    Parameters:
+    payload (dict): The decoded refresh token.
+
+    Returns:
+    Update: Marks the row used if it is unused, unrevoked, unexpired and the
+    user's token version still matches, returning the user's id, email, role
+    and token version; returns nothing otherwise.
+    """
+    tokens, users = RefreshToken.__table__, User.__table__
+    now = datetime.utcnow()
+    return (
+        update(tokens)
+        .where(
+            tokens.c.id == payload["jti"],
+            tokens.c.used_at.is_(None),
+            tokens.c.revoked_at.is_(None),
+            tokens.c.expires_at > now,
+            users.c.id == tokens.c.user_id,
+            users.c.token_version == payload.get("ver", 0),
+        )
+        .values(used_at=now)
+        .returning(users.c.id, users.c.email, users.c.role, users.c.token_version)
+    )
+
+
+def used_statement(payload: dict):
+    """
+    Build the query telling whether a refused refresh token had been used before.
+    """
+    tokens = RefreshToken.__table__
+    return select(tokens.c.used_at).where(tokens.c.id == payload["jti"])
+
+
+def revoke_family_statement(family_id: str):
+    """
+    Build the statement revoking every live token of a login session.
+    """
+    tokens = RefreshToken.__table__
+    return (
+        update(tokens)
+        .where(tokens.c.family_id == family_id, tokens.c.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+    )
+
+
+def purge_statement():
+    """
+    Build the statement deleting refresh tokens that expired, used or not.
+    """
+    tokens = RefreshToken.__table__
+    return tokens.delete().where(tokens.c.expires_at < datetime.utcnow())
+
+
+def is_reuse(used_at: datetime | None) -> bool:
+    """
+    Whether a refused token was replayed after its rotation.
+
+    Note:
+    A second refresh arriving within REFRESH_TOKEN_REUSE_GRACE_SECONDS of the
+    first is most likely the same client racing itself (two tabs) and is only
+    refused, not treated as theft.
+    """
+    if used_at is None:
+        return False
+    grace = timedelta(seconds=settings.REFRESH_TOKEN_REUSE_GRACE_SECONDS)
+    return datetime.utcnow() - used_at > grace
+
+
+def create_session_access_token(user) -> str:
+    """
+    Issue the access token of a login session.
+    """
+    return create_access_token(
+        data=token_claims(user),
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+    )
+
+
+def issue_refresh_token(db: Session, user) -> str:
+    """
+    Start a new login session for a user.
+
+    Parameters:
+    db (Session): The database session.
+    user (User): The authenticated user.
+
+    Returns:
+    str: The encoded refresh token.
+    """
+    token, row = new_refresh_token(user)
+    db.add(row)
+    return token
+
+
+async def issue_refresh_token_async(db: AsyncDBStorage, user) -> str:
+    """
+    Async variant of issue_refresh_token.
+    """
+    token, row = new_refresh_token(user)
+    await db.add(row)
+    return token
+
+
+def rotate_refresh_token(db: Session, token: str | None) -> tuple:
+    """
+    Exchange a refresh token for a new access token and a new refresh token.
+
+    Parameters:
+    db (Session): The database session.
+    token (str): The presented refresh token.
+
+    Returns:
+    tuple[str, str, str]: The access token, the refresh token and the user's role.
+
+    Raises:
+    HTTPException: 401 if the token cannot be used. A replayed token also
+    revokes its whole family and every access token of the user.
+    """
+    payload = decode_refresh_token(token)
+    user = db.execute(consume_statement(payload)).first()
+    if user is None:
+        used_at = db.execute(used_statement(payload)).scalar()
+        if is_reuse(used_at):
+            db.execute(revoke_family_statement(payload["fam"]))
+            db.commit()
+            revoke_tokens(db, payload["uid"])
+        raise refresh_exception()
+
+    refresh_token, row = new_refresh_token(user, payload["fam"])
+    db.add(row)
+    return create_session_access_token(user), refresh_token, user.role
+
+
+async def rotate_refresh_token_async(db: AsyncDBStorage, token: str | None) -> tuple:
+    """
+    Async variant of rotate_refresh_token.
+    """
+    payload = decode_refresh_token(token)
+    user = (await db.execute(consume_statement(payload))).first()
+    if user is None:
+        used_at = (await db.execute(used_statement(payload))).scalar()
+        if is_reuse(used_at):
+            await db.execute(revoke_family_statement(payload["fam"]))
+            await db.commit()
+            await revoke_tokens_async(db, payload["uid"])
+        raise refresh_exception()
+
+    refresh_token, row = new_refresh_token(user, payload["fam"])
+    await db.add(row)
+    return create_session_access_token(user), refresh_token, user.role
+
+
+def set_refresh_cookie(token: str, response: Response):
+    """
+    Set the refresh token as an httponly cookie only sent to the auth endpoints.
+
+    Parameters:
+    token (str): The refresh token to be stored in the cookie.
+    response (Response): The FastAPI response object to which the cookie will be added.
+    """
+    response.set_cookie(
+        key=REFRESH_COOKIE,
+        value=token,
+        max_age=settings.REFRESH_TOKEN_EXPIRE_MINUTES * 60,
+        expires=datetime.now(timezone.utc)
+        + timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES),
+        path=REFRESH_COOKIE_PATH,
+        domain="astrafort.tech",
+        secure=True,
+        httponly=True,
+        samesite="none",
+    )
+
+
+def delete_refresh_cookie(response: Response):
+    """
+    Delete the refresh token cookie from the response.
+    """
+    response.set_cookie(
+        key=REFRESH_COOKIE,
+        value="",
+        path=REFRESH_COOKIE_PATH,
+        domain="astrafort.tech",
+        secure=True,
+        httponly=True,
+        samesite="none",
+        expires=0,
+    )
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""generation-versioned cache of serialized responses with ETag support"""
+
+import hashlib
+import threading
+from typing import NamedTuple
+
+from app.config.config import settings
+from fastapi import Request, Response, status
+
+from .cache import TTLCache
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+
+
+class ResponseCache:
+    """
+    Caches encoded response bodies keyed by path, query string and generation.
+
+    Writers call bump() after changing the data behind the cached responses.
+    The key of a request is taken before its data is read, so a response built
+    from rows read before a bump is stored under the old generation and can
+    never be served after it. Other processes only see a bump once their own
+    entries expire, which bounds cross-worker staleness by the ttl.
+    """
+
+    CACHE_CONTROL = "public, no-cache"
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.generation = 0
+        self.__entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.__lock = threading.Lock()
+
+    def bump(self):
+        """invalidate every cached response"""
+        with self.__lock:
+            self.generation += 1
+            self.__entries.clear()
+
+    def key(self, request: Request) -> tuple:
+        """the cache key of a request under the current generation"""
+        return self.key_for(request.url.path, request.query_params.multi_items())
+
+    def key_for(self, path: str, query=()) -> tuple:
+        """the cache key of a path and query items, for filling the cache ahead of requests"""
+        return self.generation, path, tuple(sorted(query))
+
+    def get(self, key: tuple) -> CachedResponse | None:
+        return self.__entries.get(key)
+
+    def entry(self, body: bytes) -> CachedResponse:
+        """a body with its etag, answered without being stored"""
+        return CachedResponse(body, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"')
+
+    def set(self, key: tuple, body: bytes) -> CachedResponse:
+        entry = self.entry(body)
+        self.__entries.set(key, entry)
+        return entry
+
+    def respond(self, request: Request, entry: CachedResponse) -> Response:
+        """
+        Answer with the cached body, or 304 if the client already holds it.
+        """
+        headers = {"ETag": entry.etag, "Cache-Control": self.CACHE_CONTROL}
+        if entry.etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    def stats(self) -> dict:
+        return {"generation": self.generation, **self.__entries.stats()}
+
+
+# public doctor catalog pages; bumped by every doctor write
+catalog_cache = ResponseCache(
+    maxsize=settings.CATALOG_CACHE_SIZE, ttl=settings.CATALOG_CACHE_TTL
+)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""free slot computation over availability windows and bookings"""
+
+import bisect
+import heapq
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from app.models.appointment import Appointment, AvailabilityWindow
+from app.schema.appointment import MAX_SLOT_MINUTES
+from sqlalchemy import func, select
+
+# next_free_slots scans forward in steps that double while nothing is found
+FIRST_SCAN_STEP = timedelta(hours=1)
+MAX_SCAN_STEP = timedelta(hours=24)
+MAX_SLOT = timedelta(minutes=MAX_SLOT_MINUTES)
+
+
+def overlaps_range(model, start: datetime, end: datetime):
+    """
+    tsrange(starts_at, ends_at) && tsrange(start, end), the predicate the GiST
+    indexes behind the exclusion constraints can answer
+    """
+    return func.tsrange(model.starts_at, model.ends_at).op("&&")(func.tsrange(start, end))
+
+
+class Bookings:
+    """
+    The booked intervals of one doctor, sorted; they never overlap, so a
+    single bisect finds the only booking that could collide with a slot.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def append(self, starts_at: datetime, ends_at: datetime):
+        self.starts.append(starts_at)
+        self.ends.append(ends_at)
+
+    def collides(self, starts_at: datetime, ends_at: datetime) -> bool:
+        i = bisect.bisect_right(self.ends, starts_at)
+        return i < len(self.starts) and self.starts[i] < ends_at
+
+
+def window_slots(window, start: datetime, end: datetime):
+    """
+    Yield the (starts_at, ends_at) slots of a window that start in [start, end).
+    """
+    step = timedelta(minutes=window.slot_minutes)
+    slot = window.starts_at
+    if start > slot:
+        skipped = -((slot - start) // step)  # ceil division
+        slot += skipped * step
+    while slot < end and slot + step <= window.ends_at:
+        yield slot, slot + step
+        slot += step
+
+
+def window_containing(db, doctor_id: str, instant: datetime):
+    """
+    Return the doctor's availability window covering instant, if any.
+    """
+    stmt = select(AvailabilityWindow).where(
+        AvailabilityWindow.doctor_id == doctor_id,
+        func.tsrange(AvailabilityWindow.starts_at, AvailabilityWindow.ends_at).op("@>")(instant),
+    )
+    return db.execute(stmt.limit(1)).scalars().first()
+
+
+def slot_of(window, starts_at: datetime):
+    """
+    Return (starts_at, ends_at) if starts_at begins a whole slot of window, else None.
+    """
+    step = timedelta(minutes=window.slot_minutes)
+    offset = starts_at - window.starts_at
+    if offset < timedelta(0) or offset % step or starts_at + step > window.ends_at:
+        return None
+    return starts_at, starts_at + step
+
+
+def load_windows(db, start: datetime, end: datetime, doctor_id: str | None = None) -> list:
+    """
+    Return the availability windows overlapping [start, end), earliest first.
+    """
+    stmt = select(AvailabilityWindow).where(overlaps_range(AvailabilityWindow, start, end))
+    if doctor_id is not None:
+        stmt = stmt.where(AvailabilityWindow.doctor_id == doctor_id)
+    return db.execute(stmt.order_by(AvailabilityWindow.starts_at)).scalars().all()
+
+
+def load_bookings(db, start: datetime, end: datetime, doctor_id: str | None = None) -> dict:
+    """
+    Return {doctor_id: Bookings} for every booking overlapping [start, end).
+    """
+    stmt = select(
+        Appointment.doctor_id, Appointment.starts_at, Appointment.ends_at
+    ).where(
+        Appointment.status == "booked",
+        overlaps_range(Appointment, start, end),
+    )
+    if doctor_id is not None:
+        stmt = stmt.where(Appointment.doctor_id == doctor_id)
+    bookings = defaultdict(Bookings)
+    for row in db.execute(stmt.order_by(Appointment.doctor_id, Appointment.starts_at)):
+        bookings[row.doctor_id].append(row.starts_at, row.ends_at)
+    return bookings
+
+
+def free_slots(db, start: datetime, end: datetime, doctor_id: str | None = None,
+               limit: int | None = None) -> list:
+    """
+    Return the free slots starting in [start, end), earliest first.
+
+    Parameters:
+    db (DBStorage): The request's database session.
+    start (datetime): Naive UTC lower bound of the slot start.
+    end (datetime): Naive UTC upper bound (exclusive) of the slot start.
+    doctor_id (str, optional): Restrict to one doctor.
+    limit (int, optional): Return at most this many slots.
+
+    Returns:
+    list[dict]: {"doctor_id", "starts_at", "ends_at"} dicts.
+
+    Note:
+    Costs two indexed range queries whatever the size of the tables: one for
+    the windows and one for the bookings overlapping the range.
+    """
+    windows = load_windows(db, start, end, doctor_id)
+    if not windows:
+        return []
+    # a slot starting just before end can finish up to one slot length later
+    bookings = load_bookings(db, start, end + MAX_SLOT, doctor_id)
+    empty = Bookings()
+    slots = []
+    for window in windows:
+        booked = bookings.get(window.doctor_id, empty)
+        for starts_at, ends_at in window_slots(window, start, end):
+            if not booked.collides(starts_at, ends_at):
+                slots.append((starts_at, window.doctor_id, ends_at))
+    if limit is not None:
+        slots = heapq.nsmallest(limit, slots)
+    else:
+        slots.sort()
+    return [
+        {"doctor_id": doctor_id, "starts_at": starts_at, "ends_at": ends_at}
+        for starts_at, doctor_id, ends_at in slots
+    ]
+
+
+def next_free_slots(db, after: datetime, limit: int, horizon: timedelta) -> list:
+    """
+    Return the earliest free slots across all doctors starting at or after after.
+
+    Parameters:
+    db (DBStorage): The request's database session.
+    after (datetime): Naive UTC instant to search from.
+    limit (int): The number of slots wanted.
+    horizon (timedelta): How far ahead to look before giving up.
+
+    Returns:
+    list[dict]: Up to limit slots, earliest first.
+
+    Note:
+    Time is scanned in consecutive ranges, so only windows near the answer
+    are ever loaded; every slot found in a range precedes every slot of the
+    next one, so the scan stops as soon as limit slots are collected.
+    """
+    found = []
+    start, step, until = after, FIRST_SCAN_STEP, after + horizon
+    while start < until and len(found) < limit:
+        end = min(start + step, until)
+        found += free_slots(db, start, end, limit=limit - len(found))
+        start = end
+        if not found:
+            step = min(step * 2, MAX_SCAN_STEP)
+    return found
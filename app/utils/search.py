@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""in-memory inverted index for searching the doctor catalog"""
+
+import bisect
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from app.config.config import settings
+from app.models.doctor import Doctor
+from app.models.user import User
+from sqlalchemy import select
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# fraction of an exact match's score a prefix or fuzzy match is worth
+PREFIX_FACTOR = 0.7
+FUZZY_FACTOR = 0.5
+MIN_SIMILARITY = 0.4
+MAX_EXPANSIONS = 50
+
+
+def tokenize(text: str | None) -> list:
+    """
+    Split text into lowercase word tokens.
+    """
+    if not text:
+        return []
+    return TOKEN_RE.findall(text.lower())
+
+
+def trigrams(token: str) -> set:
+    """
+    Return the padded character trigrams of a token.
+    """
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class DoctorSearchIndex:
+    """
+    Ranks doctors by how well their names, affiliation and bio match a query.
+
+    Every query term is matched exactly, as a prefix of an indexed token and,
+    for terms of three or more characters, by trigram similarity to catch
+    typos. Doctors matching more terms rank first, then by weighted score.
+
+    The index holds the card fields of every doctor, so a search never touches
+    the database. Writes in this process are applied immediately through add();
+    writes made by other processes are picked up by a background poller that
+    reloads the rows whose updated_at is past the watermark every
+    refresh_seconds, or soon after mark_stale().
+    """
+
+    FIELDS = {
+        "first_name": 3.0,
+        "last_name": 3.0,
+        "hospitalAffiliation": 2.0,
+        "professionalBio": 1.0,
+    }
+    CARD_FIELDS = (
+        "id", "first_name", "last_name", "image", "thumbnail", "calendarLink", "professionalBio",
+    )
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self.watermark = None
+        self.__lock = threading.RLock()
+        self.__refreshed_at = None
+        self.__cards = {}
+        self.__doc_terms = {}
+        self.__postings = defaultdict(dict)
+        self.__vocabulary = []
+        self.__trigrams = defaultdict(set)
+
+    def __len__(self):
+        return len(self.__cards)
+
+    def _terms(self, doctor) -> dict:
+        terms = {}
+        for field, weight in self.FIELDS.items():
+            for token in tokenize(getattr(doctor, field, None)):
+                terms[token] = max(terms.get(token, 0.0), weight)
+        return terms
+
+    def _add_token(self, token: str):
+        bisect.insort(self.__vocabulary, token)
+        for gram in trigrams(token):
+            self.__trigrams[gram].add(token)
+
+    def _drop_token(self, token: str):
+        del self.__postings[token]
+        i = bisect.bisect_left(self.__vocabulary, token)
+        if i < len(self.__vocabulary) and self.__vocabulary[i] == token:
+            del self.__vocabulary[i]
+        for gram in trigrams(token):
+            tokens = self.__trigrams.get(gram)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self.__trigrams[gram]
+
+    def remove(self, id: str):
+        """
+        Drop a doctor from the index.
+        """
+        with self.__lock:
+            self.__cards.pop(id, None)
+            for token in self.__doc_terms.pop(id, {}):
+                postings = self.__postings.get(token)
+                if postings is None:
+                    continue
+                postings.pop(id, None)
+                if not postings:
+                    self._drop_token(token)
+
+    def add(self, doctor):
+        """
+        Index a doctor, replacing any previous entry for the same id.
+        """
+        with self.__lock:
+            self.remove(doctor.id)
+            terms = self._terms(doctor)
+            for token, weight in terms.items():
+                if token not in self.__postings:
+                    self._add_token(token)
+                self.__postings[token][doctor.id] = weight
+            self.__doc_terms[doctor.id] = terms
+            self.__cards[doctor.id] = {f: getattr(doctor, f) for f in self.CARD_FIELDS}
+            updated_at = getattr(doctor, "updated_at", None)
+            if updated_at and (self.watermark is None or updated_at > self.watermark):
+                self.watermark = updated_at
+
+    def refresh(self, doctors):
+        """
+        Index every doctor given and restart the refresh timer.
+        """
+        with self.__lock:
+            for doctor in doctors:
+                self.add(doctor)
+            self.__refreshed_at = time.monotonic()
+
+    def build(self, doctors):
+        """
+        Replace the whole index with the doctors given.
+        """
+        with self.__lock:
+            self.__cards.clear()
+            self.__doc_terms.clear()
+            self.__postings.clear()
+            self.__vocabulary.clear()
+            self.__trigrams.clear()
+            self.watermark = None
+            self.refresh(doctors)
+
+    def mark_stale(self):
+        """
+        Make the poller refresh from the database on its next tick.
+        """
+        self.__refreshed_at = None
+
+    def needs_refresh(self) -> bool:
+        """
+        Whether rows written by other processes should be pulled in now.
+        """
+        refreshed_at = self.__refreshed_at
+        return refreshed_at is None or time.monotonic() - refreshed_at > self.refresh_seconds
+
+    def _expand(self, term: str) -> dict:
+        """maps the indexed tokens a query term matches to their score factor"""
+        matches = {}
+        if term in self.__postings:
+            matches[term] = 1.0
+        i = bisect.bisect_left(self.__vocabulary, term)
+        while i < len(self.__vocabulary) and len(matches) < MAX_EXPANSIONS:
+            token = self.__vocabulary[i]
+            if not token.startswith(term):
+                break
+            matches.setdefault(token, PREFIX_FACTOR)
+            i += 1
+        if len(term) >= 3:
+            grams = trigrams(term)
+            shared = defaultdict(int)
+            for gram in grams:
+                for token in self.__trigrams.get(gram, ()):
+                    shared[token] += 1
+            for token, count in shared.items():
+                if token in matches:
+                    continue
+                similarity = count / (len(grams) + len(trigrams(token)) - count)
+                if similarity >= MIN_SIMILARITY:
+                    matches[token] = FUZZY_FACTOR * similarity
+        return matches
+
+    def search(self, query: str, limit: int = 20) -> list:
+        """
+        Return the cards of the best matching doctors, best first.
+
+        Parameters:
+        query (str): Free text typed by the user.
+        limit (int): The maximum number of results.
+
+        Returns:
+        list[dict]: Card dicts shaped like ShowDoctorCard.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        scores = defaultdict(float)
+        matched = defaultdict(int)
+        with self.__lock:
+            for term in terms:
+                best = {}
+                for token, factor in self._expand(term).items():
+                    for id, weight in self.__postings[token].items():
+                        score = weight * factor
+                        if score > best.get(id, 0.0):
+                            best[id] = score
+                for id, score in best.items():
+                    scores[id] += score
+                    matched[id] += 1
+            ranked = sorted(scores, key=lambda id: (-matched[id], -scores[id], id))
+            return [self.__cards[id] for id in ranked[:limit]]
+
+
+def changed_doctors_statement(watermark=None):
+    """
+    Build the query for the doctors the index should (re)load.
+
+    Parameters:
+    watermark (datetime, optional): The latest update already indexed.
+
+    Returns:
+    Select: The doctors, served by the partial index ix_users_doctor_updated.
+
+    Note:
+    Doctors updated up to SEARCH_INDEX_OVERLAP_SECONDS before the watermark
+    are read again: updated_at is stamped by each app host's clock, and a
+    transaction may commit after a later-stamped row was already read.
+    """
+    # the role predicate lets Postgres use the partial index
+    stmt = select(Doctor).where(User.role == "doctor")
+    if watermark is not None:
+        overlap = timedelta(seconds=settings.SEARCH_INDEX_OVERLAP_SECONDS)
+        stmt = stmt.where(User.updated_at >= watermark - overlap)
+    return stmt
+
+
+doctor_index = DoctorSearchIndex(refresh_seconds=settings.SEARCH_INDEX_REFRESH_SECONDS)
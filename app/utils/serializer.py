@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""precompiled orjson serializers for the response schemas"""
+
+from functools import lru_cache
+
+import orjson
+from fastapi import Response, status
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_LIST
+
+
+class Serializer:
+    """
+    Encodes objects shaped like a pydantic schema straight to JSON bytes.
+
+    The schema's fields are resolved once, so encoding reads only the
+    attributes the schema declares (from an ORM object or a dict) and skips
+    pydantic validation entirely. orjson encodes the dates, datetimes and
+    enums the models hold natively.
+
+    Handlers return the Response built here directly, which FastAPI passes
+    through without re-validating against the route's response_model.
+    """
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.fields = []
+        for name, field in schema.__fields__.items():
+            nested = None
+            if isinstance(field.type_, type) and issubclass(field.type_, BaseModel):
+                nested = serializer_for(field.type_)
+            self.fields.append(
+                (name, field.alias, field.default, field.shape == SHAPE_LIST, nested)
+            )
+
+    def to_dict(self, obj, **extra) -> dict:
+        """
+        Read the schema's fields from obj; keyword arguments override attributes.
+        """
+        is_dict = isinstance(obj, dict)
+        out = {}
+        for name, alias, default, many, nested in self.fields:
+            if name in extra:
+                value = extra[name]
+            elif is_dict:
+                value = obj.get(name, default)
+            else:
+                value = getattr(obj, name, default)
+            if nested is not None and value is not None:
+                value = [nested.to_dict(v) for v in value] if many else nested.to_dict(value)
+            out[alias] = value
+        return out
+
+    def dumps(self, obj, **extra) -> bytes:
+        return orjson.dumps(self.to_dict(obj, **extra))
+
+    def dumps_many(self, objs) -> bytes:
+        return orjson.dumps([self.to_dict(obj) for obj in objs])
+
+    def response(self, obj, status_code: int = status.HTTP_200_OK, **extra) -> Response:
+        return Response(
+            self.dumps(obj, **extra), status_code=status_code, media_type="application/json"
+        )
+
+    def response_many(self, objs, status_code: int = status.HTTP_200_OK) -> Response:
+        return Response(
+            self.dumps_many(objs), status_code=status_code, media_type="application/json"
+        )
+
+
+@lru_cache(maxsize=None)
+def serializer_for(schema) -> Serializer:
+    """
+    Return the (cached) serializer compiled from a pydantic schema.
+    """
+    return Serializer(schema)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""per-user access token versions, so tokens can be revoked without a lookup per request"""
+
+import threading
+import time
+
+from app.config.config import settings
+
+
+class TokenVersions:
+    """
+    The current token version of every user whose tokens were ever revoked.
+
+    A token carries the version its user had when it was issued ("ver"); it
+    is valid while that is still the user's current version. Users who never
+    revoked anything are at version 0 and take no space, so the map stays
+    small enough to hold in every process.
+
+    Bumps made in this process apply immediately. Bumps made by other
+    processes are picked up by refreshing from users rows whose
+    tokens_revoked_at (database clock) is near or past the watermark, every
+    refresh_seconds; a token revoked on another worker stays usable there
+    for at most that long.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self.watermark = None
+        self.__lock = threading.Lock()
+        self.__refreshed_at = None
+        self.__versions = {}
+
+    def __len__(self):
+        return len(self.__versions)
+
+    def is_current(self, user_id: str, version: int) -> bool:
+        """
+        Whether a token issued at version is still valid for user_id.
+        """
+        return version >= self.__versions.get(user_id, 0)
+
+    def bump(self, user_id: str, version: int):
+        """
+        Record that user_id is now at version, revoking older tokens.
+        """
+        with self.__lock:
+            if version > self.__versions.get(user_id, 0):
+                self.__versions[user_id] = version
+
+    def refresh(self, rows):
+        """
+        Apply (id, token_version, tokens_revoked_at) rows and restart the refresh timer.
+        """
+        with self.__lock:
+            for user_id, version, revoked_at in rows:
+                if version > self.__versions.get(user_id, 0):
+                    self.__versions[user_id] = version
+                if revoked_at is not None and (
+                    self.watermark is None or revoked_at > self.watermark
+                ):
+                    self.watermark = revoked_at
+            self.__refreshed_at = time.monotonic()
+
+    def needs_refresh(self) -> bool:
+        """
+        Whether bumps made by other processes should be pulled in now.
+        """
+        refreshed_at = self.__refreshed_at
+        return refreshed_at is None or time.monotonic() - refreshed_at > self.refresh_seconds
+
+
+token_versions = TokenVersions(refresh_seconds=settings.TOKEN_VERSION_REFRESH_SECONDS)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+vital sign time series
+
+Measurements are append-only rows of ix_vitals_series (patient, kind,
+measured_at, value). Range queries are downsampled by Postgres into at most
+a few hundred min/max/mean buckets, so however many years a series spans
+only the buckets leave the database. The profile-card summary (latest
+reading, trend and BMI) is cached per patient, encoded, until the next
+recording in the same process, or for VITALS_SUMMARY_TTL seconds in the
+others.
+"""
+
+import math
+from datetime import datetime, timedelta, timezone
+
+import orjson
+
+from app.config.config import settings
+from app.models.vital import Vital, VitalKind
+from app.utils.cache import TTLCache
+from sqlalchemy import func, literal_column, select, union_all
+
+# the window the summary's trend line is fitted over
+TREND_WINDOW = timedelta(days=90)
+SECONDS_PER_DAY = 86400
+# the profile keeps the current height and weight next to their history
+PROFILE_KINDS = (VitalKind.height.value, VitalKind.weight.value)
+
+summary_cache = TTLCache(settings.VITALS_SUMMARY_CACHE_SIZE, settings.VITALS_SUMMARY_TTL)
+
+
+def _epoch(value: datetime) -> float:
+    """seconds since the epoch of a naive UTC datetime"""
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+def bucket_seconds(start: datetime, end: datetime, points: int) -> int:
+    """
+    The bucket width, in whole seconds, that splits [start, end) into at most points buckets.
+    """
+    return max(1, math.ceil((end - start).total_seconds() / points))
+
+
+def series_statement(patient_id: str, kind: str, start: datetime, end: datetime, width: int):
+    """
+    Build the downsampling query of one series.
+
+    Parameters:
+    patient_id (str): The patient whose series it is.
+    kind (str): A VitalKind value.
+    start (datetime): Inclusive start, naive UTC.
+    end (datetime): Exclusive end, naive UTC.
+    width (int): The bucket width in seconds.
+
+    Returns:
+    Select: One row per non-empty bucket, in order: its index from start and
+    the min, max, mean and count of its readings. Answered from
+    ix_vitals_series alone.
+    """
+    offset = func.extract("epoch", Vital.measured_at) - _epoch(start)
+    bucket = func.floor(offset / width).label("bucket")
+    # grouped by the output name: asyncpg sends each occurrence of the
+    # expression's parameters separately, and Postgres would not match them
+    return (
+        select(
+            bucket,
+            func.min(Vital.value).label("min"),
+            func.max(Vital.value).label("max"),
+            func.avg(Vital.value).label("mean"),
+            func.count().label("count"),
+        )
+        .where(
+            Vital.patient_id == patient_id,
+            Vital.kind == kind,
+            Vital.measured_at >= start,
+            Vital.measured_at < end,
+        )
+        .group_by(literal_column("bucket"))
+        .order_by(literal_column("bucket"))
+    )
+
+
+def build_series(kind: str, start: datetime, end: datetime, width: int, rows) -> dict:
+    """
+    Shape the rows of series_statement as a VitalSeries.
+    """
+    return {
+        "kind": kind,
+        "start": start,
+        "end": end,
+        "bucket_seconds": width,
+        "buckets": [
+            {
+                "start": start + timedelta(seconds=int(row.bucket) * width),
+                "min": row.min,
+                "max": row.max,
+                "mean": float(row.mean),
+                "count": row.count,
+            }
+            for row in rows
+        ],
+    }
+
+
+def latest_statement(patient_id: str):
+    """
+    Build the query for the latest reading of every kind.
+
+    Returns:
+    CompoundSelect: One (kind, value, measured_at) row per kind the patient
+    has readings of; each is a single backward step of ix_vitals_series.
+    """
+    latest = [
+        select(Vital.kind, Vital.value, Vital.measured_at)
+        .where(Vital.patient_id == patient_id, Vital.kind == kind.value)
+        .order_by(Vital.measured_at.desc())
+        .limit(1)
+        .subquery()
+        for kind in VitalKind
+    ]
+    return union_all(*[select(sub) for sub in latest])
+
+
+def trend_statement(patient_id: str, since: datetime):
+    """
+    Build the query for the per-day trend of every kind since a moment.
+
+    Returns:
+    Select: (kind, slope) rows; slope is the least-squares change per day,
+    NULL for kinds with fewer than two readings.
+    """
+    slope = func.regr_slope(Vital.value, func.extract("epoch", Vital.measured_at))
+    return (
+        select(Vital.kind, (slope * SECONDS_PER_DAY).label("slope"))
+        .where(Vital.patient_id == patient_id, Vital.measured_at >= since)
+        .group_by(Vital.kind)
+    )
+
+
+def bmi(weight: float | None, height: float | None) -> float | None:
+    """
+    Body mass index from a weight in kg and a height in cm.
+    """
+    if not weight or not height:
+        return None
+    return round(weight / (height / 100) ** 2, 1)
+
+
+def build_summary(latest_rows, trend_rows) -> dict:
+    """
+    Shape the rows of latest_statement and trend_statement as a VitalSummary.
+    """
+    trends = {row.kind: row.slope for row in trend_rows}
+    vitals = {
+        row.kind: {
+            "value": row.value,
+            "measured_at": row.measured_at,
+            "trend_per_day": trends.get(row.kind),
+        }
+        for row in latest_rows
+    }
+    weight, height = vitals.get(VitalKind.weight.value), vitals.get(VitalKind.height.value)
+    return {
+        "vitals": vitals,
+        "bmi": bmi(weight and weight["value"], height and height["value"]),
+    }
+
+
+def vital_summary(db, patient_id: str) -> bytes:
+    """
+    The profile-card summary of a patient as JSON, from the cache or two queries.
+    """
+    body = summary_cache.get(patient_id)
+    if body is None:
+        latest = db.execute(latest_statement(patient_id)).all()
+        trend = db.execute(trend_statement(patient_id, datetime.utcnow() - TREND_WINDOW)).all()
+        body = orjson.dumps(build_summary(latest, trend))
+        # a replica may not have the reading that invalidated the entry yet
+        if not db.from_replica:
+            summary_cache.set(patient_id, body)
+    return body
+
+
+def record_vitals(db, patient_id: str, readings: dict, measured_at: datetime | None = None) -> list:
+    """
+    Stage one row per reading in the caller's unit of work.
+
+    Parameters:
+    db (DBStorage | AsyncDBStorage): The request's storage.
+    patient_id (str): The patient measured.
+    readings (dict): Values by VitalKind value.
+    measured_at (datetime, optional): When, naive UTC; defaults to now.
+
+    Returns:
+    list: The staged Vital rows.
+    """
+    measured_at = measured_at or datetime.utcnow()
+    rows = [
+        Vital(patient_id=patient_id, kind=kind, value=value, measured_at=measured_at)
+        for kind, value in readings.items()
+    ]
+    for row in rows:
+        db.stage(row)
+    return rows
+
+
+def invalidate_summary(patient_id: str):
+    """
+    Drop the cached summary of a patient; called after every recording.
+    """
+    summary_cache.invalidate(patient_id)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+startup warm-up: open and prime pooled connections and fill the hot caches
+before a worker reports ready, so its first requests are served warm
+
+contains:
+    - hot_statements: the statements nearly every session runs
+    - prewarm_pool / prewarm_pool_async: open connections and compile the hot statements
+    - prime_caches / prime_caches_async: fill the principal and catalog caches
+    - warm_up / warm_up_async: all of the above
+"""
+from contextlib import AsyncExitStack
+
+from app.config.config import settings
+from app.engine.async_storage import AsyncDBStorage
+from app.engine.db_storage import DBStorage
+from app.models.user import User
+from app.utils.auth import principal_cache, principal_statement, recent_principals_statement
+from app.utils.catalog import CATALOG_PAGE_SIZE, CATALOG_PATH, catalog_page, catalog_statement
+from app.utils.response_cache import catalog_cache
+from sqlalchemy import func, select
+
+
+def hot_statements() -> list:
+    """
+    The statements behind sign-in, authentication and the catalog's first page.
+
+    Note:
+    Bound values are not part of SQLAlchemy's compiled cache key nor of
+    asyncpg's prepared statement, so running these once with placeholder
+    values warms them for every real request.
+    """
+    return [
+        select(User).where(func.lower(User.email) == ""),
+        principal_statement(""),
+        catalog_statement(CATALOG_PAGE_SIZE),
+    ]
+
+
+def prewarm_connections() -> int:
+    """the number of connections to open at startup, never more than the pool keeps"""
+    return max(0, min(settings.DB_POOL_PREWARM, settings.DB_POOL_SIZE))
+
+
+def prewarm_pool(connections: int):
+    """
+    Desc:
+        opens that many pooled connections at once and runs the hot
+        statements on each, so no request pays for a connect or a compile
+    """
+    engine = DBStorage.engine
+    opened = []
+    try:
+        # held together, so the pool has to open every one of them
+        for _ in range(connections):
+            opened.append(engine.connect())
+        for conn in opened:
+            session = DBStorage.session_factory(bind=conn)
+            try:
+                for stmt in hot_statements():
+                    session.execute(stmt).unique().all()
+            finally:
+                session.close()
+    finally:
+        for conn in opened:
+            conn.close()
+
+
+async def prewarm_pool_async(connections: int):
+    """
+    Async variant of prewarm_pool; asyncpg prepares statements per
+    connection, so each one runs the hot statements.
+    """
+    async with AsyncExitStack() as stack:
+        opened = [
+            await stack.enter_async_context(AsyncDBStorage.engine.connect())
+            for _ in range(connections)
+        ]
+        for conn in opened:
+            async with AsyncDBStorage.session_factory(bind=conn) as session:
+                for stmt in hot_statements():
+                    (await session.execute(stmt)).unique().all()
+
+
+def _fill_caches(principals: list, doctors: list, catalog_key: tuple):
+    for user in principals:
+        principal_cache.set(user.email, user)
+    catalog_cache.set(catalog_key, catalog_page(doctors, CATALOG_PAGE_SIZE))
+
+
+def prime_caches(db: DBStorage):
+    """
+    Desc:
+        loads the recently signed-in users into the principal cache and the
+        catalog's first page into the response cache
+    """
+    # taken before reading, like the route does, so a concurrent bump wins
+    catalog_key = catalog_cache.key_for(CATALOG_PATH)
+    principals = (
+        db.execute(recent_principals_statement(settings.PRINCIPAL_PREWARM))
+        .unique().scalars().all()
+    )
+    doctors = db.execute(catalog_statement(CATALOG_PAGE_SIZE)).scalars().all()
+    _fill_caches(principals, doctors, catalog_key)
+
+
+async def prime_caches_async(db: AsyncDBStorage):
+    """
+    Async variant of prime_caches.
+    """
+    catalog_key = catalog_cache.key_for(CATALOG_PATH)
+    result = await db.execute(recent_principals_statement(settings.PRINCIPAL_PREWARM))
+    principals = result.unique().scalars().all()
+    doctors = (await db.execute(catalog_statement(CATALOG_PAGE_SIZE))).scalars().all()
+    _fill_caches(principals, doctors, catalog_key)
+
+
+def warm_up():
+    """
+    Desc:
+        prewarms the pool and primes the caches on the sync engine
+    """
+    prewarm_pool(prewarm_connections())
+    db = DBStorage()
+    db.setup_db()
+    try:
+        prime_caches(db)
+    finally:
+        # detaches the cached rows with every attribute loaded
+        db.close()
+
+
+async def warm_up_async():
+    """
+    Async variant of warm_up.
+    """
+    await prewarm_pool_async(prewarm_connections())
+    db = AsyncDBStorage()
+    db.setup_db()
+    try:
+        await prime_caches_async(db)
+    finally:
+        await db.close()
@@ -0,0 +1,14 @@
+#!/usr/bin/env python
+"""
+Load benchmarks for the API
+
+contains:
+    - datagen: seeds a local database with a synthetic population
+    - scenarios: scripted user journeys against the API
+    - runner: drives the scenarios and collects per-endpoint latencies
+    - report: throughput and p50/p95/p99 summaries as JSON
+
+usage:
+    python -m bench seed --patients 1000000 --doctors 50000
+    python -m bench run --patients 1000000 --duration 60 -o results.json
+"""
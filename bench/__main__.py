@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+Command line entry point of the benchmarks
+
+usage:
+    python -m bench seed --patients 1000000 --doctors 50000
+    python -m bench run session --users 32 --duration 60 -o results.json
+    python -m bench run catalog --target http://127.0.0.1:8000
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from bench.scenarios import SCENARIOS
+
+
+def run_seed(args):
+    from bench.datagen import generate
+
+    def progress(role, done):
+        print(f"{role}: {done}", file=sys.stderr)
+
+    counts = generate(args.patients, args.doctors, batch_size=args.batch_size,
+                      seed=args.seed, progress=progress)
+    json.dump(counts, sys.stdout)
+    sys.stdout.write("\n")
+    return 0
+
+
+def run_bench(args):
+    from bench.runner import run
+
+    report = asyncio.run(run(
+        args.scenario, target=args.target, users=args.users,
+        duration=args.duration, warmup=args.warmup, iterations=args.iterations,
+        patients=args.patients, seed=args.seed,
+    ))
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        json.dump(report, out, indent=2)
+        out.write("\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 1 if report["total"]["errors"] else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed = commands.add_parser("seed", help="generate a synthetic population")
+    seed.add_argument("--patients", type=int, default=1000)
+    seed.add_argument("--doctors", type=int, default=100)
+    seed.add_argument("--batch-size", type=int, default=5000)
+    seed.add_argument("--seed", type=int, default=0)
+    seed.set_defaults(func=run_seed)
+
+    bench = commands.add_parser("run", help="run a scenario and report latencies as JSON")
+    bench.add_argument("scenario", choices=sorted(SCENARIOS))
+    bench.add_argument("--target", default="inprocess",
+                       help='"inprocess" or the base URL of a running server')
+    bench.add_argument("--users", type=int, default=16, help="concurrent virtual users")
+    bench.add_argument("--duration", type=float, default=30, help="measured seconds")
+    bench.add_argument("--warmup", type=float, default=5, help="unmeasured seconds first")
+    bench.add_argument("--iterations", type=int, help="scenario runs per virtual user")
+    bench.add_argument("--patients", type=int, default=1000,
+                       help="size of the seeded patient population")
+    bench.add_argument("--seed", type=int, default=0)
+    bench.add_argument("-o", "--output", help="defaults to stdout")
+    bench.set_defaults(func=run_bench)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
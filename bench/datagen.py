@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+"""
+Synthetic data generator for the benchmarks
+
+Every generated user shares BENCH_PASSWORD, hashed once, and has an email
+derived from its role and index (patient42@bench.test), so scenarios can
+log in as any of them without reading the database. The same seed always
+produces the same population.
+"""
+import random
+import struct
+import uuid
+import zlib
+from datetime import date, datetime, timedelta
+
+from app.engine.blob_store import get_blob_store
+from app.engine.db_storage import DBStorage
+from app.models.doctor import Doctor
+from app.models.emergency_contact import EmergencyContact
+from app.models.patient import Patient
+from app.models.user import User
+from app.utils.hasher import bcrypt_hash
+from sqlalchemy import insert
+
+BENCH_PASSWORD = "Bench@2024"
+EMAIL_DOMAIN = "bench.test"
+PHONE_PREFIX = {"patient": "0800", "doctor": "0900"}
+
+FIRST_NAMES = (
+    "Ada", "Bola", "Chidi", "Dayo", "Emeka", "Funke", "Gbenga", "Halima",
+    "Ifeoma", "Jide", "Kemi", "Lola", "Musa", "Ngozi", "Obi", "Tunde",
+)
+LAST_NAMES = (
+    "Adeyemi", "Bello", "Chukwu", "Danjuma", "Eze", "Fashola", "Garba",
+    "Ibrahim", "Johnson", "Kalu", "Lawal", "Musa", "Nwosu", "Okafor",
+)
+HOSPITALS = (
+    "Lagos University Teaching Hospital", "National Hospital Abuja",
+    "University College Hospital Ibadan", "Reddington Hospital",
+    "St. Nicholas Hospital", "Eko Hospital",
+)
+BIO_WORDS = (
+    "cardiology", "paediatrics", "dermatology", "oncology", "surgery",
+    "neurology", "family", "medicine", "care", "years", "experience",
+    "consultant", "specialist", "general", "practice", "women's", "health",
+)
+# distinct profile images shared round-robin by the doctors
+IMAGE_VARIANTS = 64
+
+
+def email_for(role: str, index: int) -> str:
+    """returns the email of the index-th generated user of a role"""
+    return f"{role}{index}@{EMAIL_DOMAIN}"
+
+
+def phone_for(role: str, index: int) -> str:
+    """returns the 11 digit phone of the index-th generated user of a role"""
+    return f"{PHONE_PREFIX[role]}{index:07d}"
+
+
+def _png(width: int, height: int, rgb: tuple) -> bytes:
+    """encodes a solid colour image as a minimal PNG"""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    row = b"\x00" + bytes(rgb) * width
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(row * height))
+        + chunk(b"IEND", b"")
+    )
+
+
+def seed_images(rng: random.Random) -> list:
+    """stores IMAGE_VARIANTS profile images and returns their blob keys"""
+    store = get_blob_store()
+    return [
+        store.put(_png(128, 128, (rng.randrange(256), rng.randrange(256), rng.randrange(256))))
+        for _ in range(IMAGE_VARIANTS)
+    ]
+
+
+def _user(rng: random.Random, role: str, index: int, password_hash: str, created_at) -> dict:
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        "created_at": created_at,
+        "updated_at": created_at,
+        "first_name": rng.choice(FIRST_NAMES),
+        "last_name": rng.choice(LAST_NAMES),
+        "email": email_for(role, index),
+        "phone": phone_for(role, index),
+        "password_hash": password_hash,
+        "role": role,
+    }
+
+
+def _body(rng: random.Random) -> dict:
+    return {
+        "dob": date(1950, 1, 1) + timedelta(days=rng.randrange(365 * 55)),
+        "gender": rng.choice(("M", "F")),
+        "height": round(rng.uniform(150, 200), 1),
+        "weight": round(rng.uniform(45, 120), 1),
+    }
+
+
+def _insert(rows: dict):
+    """writes one batch of rows, table by table, in a single transaction"""
+    with DBStorage.engine.begin() as conn:
+        for table in (User.__table__, Doctor.__table__, Patient.__table__,
+                      EmergencyContact.__table__):
+            if rows.get(table.name):
+                conn.execute(insert(table), rows[table.name])
+
+
+def generate(patients: int, doctors: int, batch_size: int = 5000, seed: int = 0,
+             progress=None) -> dict:
+    """
+    Insert a synthetic population into the configured database.
+
+    Parameters:
+        patients (int): Number of patients, each with one emergency contact.
+        doctors (int): Number of doctors, each with a profile image.
+        batch_size (int): Rows per INSERT.
+        seed (int): Seed of the random generator.
+        progress (callable, optional): Called with (role, rows_done) after each batch.
+
+    Returns:
+        dict: The counts inserted per role.
+    """
+    rng = random.Random(seed)
+    DBStorage.init_engine()
+    password_hash = bcrypt_hash(BENCH_PASSWORD)
+    images = seed_images(rng)
+    # spread creation times so the catalog's keyset order is realistic
+    epoch = datetime(2023, 1, 1)
+
+    for role, count in (("doctor", doctors), ("patient", patients)):
+        for start in range(0, count, batch_size):
+            rows = {"users": [], "doctors": [], "patients": [], "emergency_contacts": []}
+            for index in range(start, min(start + batch_size, count)):
+                created_at = epoch + timedelta(seconds=index * 7 + rng.randrange(7))
+                user = _user(rng, role, index, password_hash, created_at)
+                rows["users"].append(user)
+                if role == "doctor":
+                    rows["doctors"].append({
+                        "id": user["id"],
+                        **_body(rng),
+                        "image_hash": images[index % len(images)],
+                        "image_mime": "image/png",
+                        "medicalLicense": f"MDCN/{index:07d}",
+                        "hospitalAffiliation": rng.choice(HOSPITALS),
+                        "professionalBio": " ".join(rng.choices(BIO_WORDS, k=12)),
+                        "calendarLink": f"{user['first_name'].lower()}-{index}",
+                    })
+                else:
+                    rows["patients"].append({
+                        "id": user["id"],
+                        **_body(rng),
+                        "medical_history": None,
+                    })
+                    rows["emergency_contacts"].append({
+                        "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                        "created_at": created_at,
+                        "updated_at": created_at,
+                        "full_name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                        "phone": f"0700{index:07d}",
+                        "patient_id": user["id"],
+                    })
+            _insert(rows)
+            if progress:
+                progress(role, min(start + batch_size, count))
+    return {"doctor": doctors, "patient": patients}
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+"""throughput and latency percentiles of a benchmark run"""
+import math
+
+
+def percentile(ordered: list, q: float) -> float:
+    """nearest-rank percentile of an ascending list"""
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples: dict, errors: dict, elapsed: float, meta: dict) -> dict:
+    """
+    Build the machine readable report of a run.
+
+    Parameters:
+        samples (dict): Endpoint name -> list of latencies in seconds.
+        errors (dict): Endpoint name -> number of non 2xx/3xx responses or failures.
+        elapsed (float): Wall clock duration of the measured phase in seconds.
+        meta (dict): Run parameters echoed into the report.
+
+    Returns:
+        dict: {"meta": ..., "endpoints": {name: stats}, "total": stats}; latencies in ms.
+    """
+    def stats(latencies: list, failed: int) -> dict:
+        ordered = sorted(latencies)
+        return {
+            "requests": len(ordered),
+            "errors": failed,
+            "throughput_rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+            "mean_ms": round(1000 * sum(ordered) / len(ordered), 3) if ordered else 0.0,
+            "p50_ms": round(1000 * percentile(ordered, 50), 3),
+            "p95_ms": round(1000 * percentile(ordered, 95), 3),
+            "p99_ms": round(1000 * percentile(ordered, 99), 3),
+            "max_ms": round(1000 * ordered[-1], 3) if ordered else 0.0,
+        }
+
+    endpoints = {
+        name: stats(samples.get(name, []), errors.get(name, 0))
+        for name in sorted(set(samples) | set(errors))
+    }
+    every = [latency for latencies in samples.values() for latency in latencies]
+    return {
+        "meta": {**meta, "elapsed_s": round(elapsed, 3)},
+        "endpoints": endpoints,
+        "total": stats(every, sum(errors.values())),
+    }
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+"""
+Drives benchmark scenarios with a fixed number of concurrent virtual users
+
+The app is either called in-process through httpx's ASGI transport (no
+sockets, the app's lifespan runs around the measurement) or over
+HTTP against a running server such as a local uvicorn.
+"""
+import asyncio
+import random
+import time
+from collections import defaultdict
+from contextlib import AsyncExitStack
+
+import httpx
+
+from bench.report import summarize
+from bench.scenarios import SCENARIOS
+
+
+class VirtualUser:
+    """
+    One simulated client; scenarios issue their requests through call().
+    """
+
+    def __init__(self, client: httpx.AsyncClient, rng: random.Random, patients: int,
+                 recorder):
+        self.client = client
+        self.rng = rng
+        self.patients = patients
+        self.token = None
+        self.__recorder = recorder
+
+    async def call(self, name: str, method: str, path: str, **kwargs) -> httpx.Response:
+        """sends a request and records its latency under name"""
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, **kwargs)
+        except httpx.HTTPError:
+            self.__recorder.fail(name)
+            raise
+        self.__recorder.record(name, time.perf_counter() - start, response.status_code)
+        return response
+
+
+class Recorder:
+    """collects latencies per endpoint; only active once warm-up is over"""
+
+    def __init__(self):
+        self.active = False
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, name: str, latency: float, status_code: int):
+        if not self.active:
+            return
+        if status_code >= 400:
+            self.errors[name] += 1
+        else:
+            self.samples[name].append(latency)
+
+    def fail(self, name: str):
+        if self.active:
+            self.errors[name] += 1
+
+
+async def _virtual_user(vu: VirtualUser, scenario, deadline: float, iterations: int | None):
+    done = 0
+    while time.monotonic() < deadline and (iterations is None or done < iterations):
+        try:
+            await scenario(vu)
+        except httpx.HTTPError:
+            pass
+        done += 1
+
+
+def _client(target: str):
+    """returns the http client and, for in-process runs, the app it calls"""
+    if target == "inprocess":
+        from app.main import app
+        transport = httpx.ASGITransport(app=app)
+        return httpx.AsyncClient(transport=transport, base_url="http://bench"), app
+    return httpx.AsyncClient(base_url=target, timeout=30), None
+
+
+async def run(scenario: str, target: str = "inprocess", users: int = 16,
+              duration: float = 30, warmup: float = 5, iterations: int | None = None,
+              patients: int = 1000, seed: int = 0) -> dict:
+    """
+    Run a scenario and return the report.
+
+    Parameters:
+        scenario (str): A key of SCENARIOS.
+        target (str): "inprocess" or the base URL of a running server.
+        users (int): Concurrent virtual users.
+        duration (float): Seconds measured after warm-up.
+        warmup (float): Seconds run before measuring, to fill pools and caches.
+        iterations (int, optional): Stop each user after this many scenario runs.
+        patients (int): Size of the generated patient population to log in as.
+        seed (int): Seed of the virtual users' random choices.
+
+    Returns:
+        dict: The report built by bench.report.summarize.
+    """
+    recorder = Recorder()
+    client, app = _client(target)
+    async with AsyncExitStack() as stack:
+        if app is not None:
+            # opens the pool and warms the caches exactly as a served worker does
+            await stack.enter_async_context(app.router.lifespan_context(app))
+        async with client:
+            deadline = time.monotonic() + warmup + duration
+            vus = [
+                VirtualUser(client, random.Random(seed * 1000 + i), patients, recorder)
+                for i in range(users)
+            ]
+            tasks = [
+                asyncio.create_task(_virtual_user(vu, SCENARIOS[scenario], deadline, iterations))
+                for vu in vus
+            ]
+            if warmup:
+                await asyncio.wait(tasks, timeout=warmup)
+            recorder.active = True
+            started = time.perf_counter()
+            await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - started
+
+    meta = {
+        "scenario": scenario,
+        "target": target,
+        "users": users,
+        "duration_s": duration,
+        "warmup_s": warmup,
+        "iterations": iterations,
+        "patients": patients,
+        "seed": seed,
+    }
+    return summarize(recorder.samples, recorder.errors, elapsed, meta)
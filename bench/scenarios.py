@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Scripted user journeys driven by the benchmark runner
+
+Each scenario is a coroutine function taking a VirtualUser; every request
+it makes through VirtualUser.call is timed under the endpoint name it passes.
+"""
+import uuid
+
+from bench.datagen import BENCH_PASSWORD, email_for
+
+CATALOG_PAGES = 3
+
+
+async def login(vu) -> str:
+    """logs in as a random generated patient and returns the bearer token"""
+    index = vu.rng.randrange(vu.patients)
+    response = await vu.call(
+        "POST /v1/auth/token", "POST", "/v1/auth/token",
+        data={"username": email_for("patient", index), "password": BENCH_PASSWORD},
+    )
+    return response.json()["access_token"] if response.status_code == 200 else None
+
+
+async def _authorized(vu) -> dict:
+    # the API reads the token from the access_token cookie, not the
+    # Authorization header; the cookie's domain would keep the client
+    # from replaying it, so it is sent by hand
+    if vu.token is None:
+        vu.token = await login(vu)
+    return {"Cookie": f'access_token="Bearer {vu.token}"'}
+
+
+async def me(vu):
+    await vu.call("GET /v1/auth/me/", "GET", "/v1/auth/me/", headers=await _authorized(vu))
+
+
+async def profile_read(vu):
+    await vu.call("GET /v1/patient/profile", "GET", "/v1/patient/profile",
+                  headers=await _authorized(vu))
+
+
+async def profile_update(vu):
+    await vu.call(
+        "PATCH /v1/patient/update_profile", "PATCH", "/v1/patient/update_profile",
+        headers=await _authorized(vu),
+        json={"weight": round(vu.rng.uniform(45, 120), 1)},
+    )
+
+
+async def catalog_browse(vu):
+    """reads the first pages of the doctor catalog, following the cursor"""
+    params = {"limit": 20}
+    for _ in range(CATALOG_PAGES):
+        response = await vu.call("GET /v1/doctor/all", "GET", "/v1/doctor/all", params=params)
+        if response.status_code != 200:
+            return
+        cursor = response.json().get("next_cursor")
+        if not cursor:
+            return
+        params = {"limit": 20, "cursor": cursor}
+
+
+async def register(vu):
+    """registers a brand new patient, as in a sign-up burst"""
+    suffix = uuid.UUID(int=vu.rng.getrandbits(128), version=4).hex
+    await vu.call(
+        "POST /v1/patient/register", "POST", "/v1/patient/register",
+        json={
+            "first_name": "Bench",
+            "last_name": "Signup",
+            "email": f"signup-{suffix}@bench.test",
+            "phone": f"081{int(suffix[:8], 16) % 10**8:08d}",
+            "password1": BENCH_PASSWORD,
+            "password2": BENCH_PASSWORD,
+        },
+    )
+
+
+async def session(vu):
+    """a logged in patient's typical visit"""
+    vu.token = await login(vu)
+    await me(vu)
+    await profile_read(vu)
+    await catalog_browse(vu)
+    await profile_update(vu)
+
+
+SCENARIOS = {
+    "login": login,
+    "me": me,
+    "profile_read": profile_read,
+    "profile_update": profile_update,
+    "catalog": catalog_browse,
+    "register": register,
+    "session": session,
+}
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+"""alembic environment: runs migrations against the database from the app settings"""
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+from app.engine.db_storage import get_db_url
+from app.models.base_model import Base
+from app.models import appointment, doctor, emergency_contact, job, patient, refresh_token, user, vital  # noqa: F401
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    """emit the migration SQL to stdout instead of running it"""
+    context.configure(
+        url=get_db_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    """run the migrations on a dedicated, unpooled connection"""
+    connectable = create_engine(get_db_url(), poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
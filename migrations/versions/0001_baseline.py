@@ -0,0 +1,80 @@
+"""baseline: the schema create_all produced before migrations existed
+
+Databases created by the old runtime create_all are already at this
+revision; mark them with `alembic stamp 0001` before upgrading.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+gender_enum = sa.Enum("M", "F", name="gender_enum")
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.String(200), primary_key=True),
+        sa.Column("created_at", sa.DateTime, nullable=False),
+        sa.Column("updated_at", sa.DateTime, nullable=False),
+        sa.Column("first_name", sa.String(128), nullable=False),
+        sa.Column("last_name", sa.String(128), nullable=False),
+        sa.Column("phone", sa.String(60), nullable=False),
+        sa.Column("email", sa.String(128), nullable=False),
+        sa.Column("password_hash", sa.String(128), nullable=False),
+        sa.Column("role", sa.String(50), nullable=False),
+        sa.UniqueConstraint("id", name="users_id_key"),
+        sa.UniqueConstraint("phone", name="users_phone_key"),
+        sa.UniqueConstraint("email", name="users_email_key"),
+    )
+    op.create_table(
+        "patients",
+        sa.Column("id", sa.String, sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("image", sa.LargeBinary, nullable=True),
+        sa.Column("dob", sa.Date, nullable=True),
+        sa.Column("gender", gender_enum),
+        sa.Column("height", sa.Float, nullable=True),
+        sa.Column("weight", sa.Float, nullable=True),
+        sa.Column("medical_history", sa.String(270), nullable=True),
+        sa.Column("image_header", sa.String, nullable=True),
+    )
+    op.create_table(
+        "doctors",
+        sa.Column("id", sa.String, sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("image", sa.LargeBinary, nullable=True),
+        sa.Column("image_header", sa.String, nullable=True),
+        sa.Column("dob", sa.Date, nullable=True),
+        sa.Column("gender", gender_enum),
+        sa.Column("height", sa.Float, nullable=True),
+        sa.Column("weight", sa.Float, nullable=True),
+        sa.Column("medicalLicense", sa.String(270), nullable=True),
+        sa.Column("resumeLink", sa.String(270), nullable=True),
+        sa.Column("hospitalAffiliation", sa.String(270), nullable=True),
+        sa.Column("professionalBio", sa.String(220), nullable=True),
+        sa.Column("calendarLink", sa.String(270), nullable=True),
+    )
+    op.create_table(
+        "emergency_contacts",
+        sa.Column("id", sa.String(200), primary_key=True),
+        sa.Column("created_at", sa.DateTime, nullable=False),
+        sa.Column("updated_at", sa.DateTime, nullable=False),
+        sa.Column("full_name", sa.String(128), nullable=False),
+        sa.Column("phone", sa.String(60), nullable=False),
+        sa.Column("patient_id", sa.String, sa.ForeignKey("patients.id", ondelete="CASCADE")),
+        sa.UniqueConstraint("id", name="emergency_contacts_id_key"),
+    )
+
+
+def downgrade():
+    op.drop_table("emergency_contacts")
+    op.drop_table("doctors")
+    op.drop_table("patients")
+    op.drop_table("users")
+    gender_enum.drop(op.get_bind(), checkfirst=True)
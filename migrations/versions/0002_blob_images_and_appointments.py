@@ -0,0 +1,116 @@
+"""move profile images to the blob store; add availability windows and appointments
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+
+def _move_images(table_name: str):
+    """copies every image blob into the blob store and records its hash"""
+    from app.engine.blob_store import get_blob_store
+    from app.utils.images import sniff_image_type
+
+    store = get_blob_store()
+    conn = op.get_bind()
+    table = sa.table(
+        table_name,
+        sa.column("id", sa.String),
+        sa.column("image", sa.LargeBinary),
+        sa.column("image_header", sa.String),
+        sa.column("image_hash", sa.String),
+        sa.column("image_mime", sa.String),
+    )
+    last_id = ""
+    while True:
+        rows = conn.execute(
+            sa.select(table.c.id, table.c.image, table.c.image_header)
+            .where(table.c.image.isnot(None), table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        for id, image, header in rows:
+            data = bytes(image)
+            mime = sniff_image_type(data[:12])
+            if mime is None and header and header.startswith("data:"):
+                mime = header[len("data:"):]
+            conn.execute(
+                table.update()
+                .where(table.c.id == id)
+                .values(image_hash=store.put(data), image_mime=mime)
+            )
+        last_id = rows[-1].id
+
+
+def upgrade():
+    for table_name in ("patients", "doctors"):
+        op.add_column(table_name, sa.Column("image_hash", sa.String(64), nullable=True))
+        op.add_column(table_name, sa.Column("image_mime", sa.String(100), nullable=True))
+        _move_images(table_name)
+        op.drop_column(table_name, "image")
+        op.drop_column(table_name, "image_header")
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    op.create_table(
+        "availability_windows",
+        sa.Column("id", sa.String(200), primary_key=True),
+        sa.Column("created_at", sa.DateTime, nullable=False),
+        sa.Column("updated_at", sa.DateTime, nullable=False),
+        sa.Column("doctor_id", sa.String, sa.ForeignKey("doctors.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("starts_at", sa.DateTime, nullable=False),
+        sa.Column("ends_at", sa.DateTime, nullable=False),
+        sa.Column("slot_minutes", sa.Integer, nullable=False),
+        sa.UniqueConstraint("id", name="availability_windows_id_key"),
+        ExcludeConstraint(
+            (sa.column("doctor_id"), "="),
+            (sa.text("tsrange(starts_at, ends_at)"), "&&"),
+            name="ex_availability_windows_overlap",
+            using="gist",
+        ),
+    )
+    op.create_table(
+        "appointments",
+        sa.Column("id", sa.String(200), primary_key=True),
+        sa.Column("created_at", sa.DateTime, nullable=False),
+        sa.Column("updated_at", sa.DateTime, nullable=False),
+        sa.Column("doctor_id", sa.String, sa.ForeignKey("doctors.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("patient_id", sa.String, sa.ForeignKey("patients.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("starts_at", sa.DateTime, nullable=False),
+        sa.Column("ends_at", sa.DateTime, nullable=False),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.UniqueConstraint("id", name="appointments_id_key"),
+        ExcludeConstraint(
+            (sa.column("doctor_id"), "="),
+            (sa.text("tsrange(starts_at, ends_at)"), "&&"),
+            name="ex_appointments_overlap",
+            using="gist",
+            where=sa.text("status = 'booked'"),
+        ),
+    )
+    op.create_index(
+        "ix_appointments_patient_id_starts_at", "appointments", ["patient_id", "starts_at"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_appointments_patient_id_starts_at", table_name="appointments")
+    op.drop_table("appointments")
+    op.drop_table("availability_windows")
+    # the blobs stay in the blob store; rows lose their reference to them
+    for table_name in ("patients", "doctors"):
+        op.add_column(table_name, sa.Column("image", sa.LargeBinary, nullable=True))
+        op.add_column(table_name, sa.Column("image_header", sa.String, nullable=True))
+        op.drop_column(table_name, "image_hash")
+        op.drop_column(table_name, "image_mime")
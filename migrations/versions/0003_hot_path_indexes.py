@@ -0,0 +1,62 @@
+"""indexes for the hot lookups: lowercase email, emergency contacts by patient, doctor catalog
+
+The indexes are built CONCURRENTLY so the large tables stay writable
+while the migration runs.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # emails used to be stored as typed; the unique index below compares
+    # lower(email). Accounts whose emails differ only in case cannot both
+    # be lowercased, and only a person can tell which one to keep
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT lower(email) AS email, count(*) AS accounts FROM users "
+        "GROUP BY lower(email) HAVING count(*) > 1 ORDER BY 1 LIMIT 20"
+    )).all()
+    if duplicates:
+        listed = ", ".join(f"{row.email} ({row.accounts} accounts)" for row in duplicates)
+        raise RuntimeError(
+            "users share an email that differs only in case; merge or rename "
+            f"these accounts, then rerun the migration: {listed}"
+        )
+    op.execute("UPDATE users SET email = lower(email) WHERE email <> lower(email)")
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_users_email_lower", "users", [sa.text("lower(email)")],
+            unique=True, postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_emergency_contacts_patient_id", "emergency_contacts", ["patient_id"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_users_doctor_catalog", "users", ["created_at", "id"],
+            postgresql_where=sa.text("role = 'doctor'"), postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_doctors_hospital_affiliation_lower", "doctors",
+            [sa.text('lower("hospitalAffiliation")')], postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table in (
+            ("ix_doctors_hospital_affiliation_lower", "doctors"),
+            ("ix_users_doctor_catalog", "users"),
+            ("ix_emergency_contacts_patient_id", "emergency_contacts"),
+            ("ix_users_email_lower", "users"),
+        ):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
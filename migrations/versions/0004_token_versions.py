@@ -0,0 +1,32 @@
+"""per-user access token versions for revocation
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # a constant default lets Postgres add the column without rewriting users
+    op.add_column(
+        "users",
+        sa.Column("token_version", sa.Integer, nullable=False, server_default=sa.text("0")),
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_users_token_revoked", "users", ["updated_at"],
+            postgresql_where=sa.text("token_version > 0"), postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_users_token_revoked", table_name="users", postgresql_concurrently=True)
+    op.drop_column("users", "token_version")
@@ -0,0 +1,26 @@
+"""resized profile image variants
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # nullable columns without a default are added without rewriting the tables
+    for table in ("patients", "doctors"):
+        op.add_column(table, sa.Column("avatar_hash", sa.String(64), nullable=True))
+        op.add_column(table, sa.Column("thumbnail_hash", sa.String(64), nullable=True))
+
+
+def downgrade():
+    for table in ("patients", "doctors"):
+        op.drop_column(table, "thumbnail_hash")
+        op.drop_column(table, "avatar_hash")
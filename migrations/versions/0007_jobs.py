@@ -0,0 +1,41 @@
+"""durable background jobs (transactional outbox)
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.String(200), primary_key=True),
+        sa.Column("created_at", sa.DateTime, nullable=False),
+        sa.Column("updated_at", sa.DateTime, nullable=False),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("payload", sa.JSON, nullable=False),
+        sa.Column("status", sa.String(20), nullable=False, server_default=sa.text("'pending'")),
+        sa.Column("attempts", sa.Integer, nullable=False, server_default=sa.text("0")),
+        sa.Column("max_attempts", sa.Integer, nullable=False),
+        sa.Column("run_at", sa.DateTime, nullable=False),
+        sa.Column("locked_until", sa.DateTime, nullable=True),
+        sa.Column("last_error", sa.Text, nullable=True),
+        sa.UniqueConstraint("id", name="jobs_id_key"),
+    )
+    op.create_index(
+        "ix_jobs_claimable", "jobs", ["run_at"], postgresql_where=sa.text("status = 'pending'")
+    )
+    op.create_index(
+        "ix_jobs_leased", "jobs", ["locked_until"], postgresql_where=sa.text("status = 'running'")
+    )
+
+
+def downgrade():
+    op.drop_table("jobs")
@@ -0,0 +1,53 @@
+"""append-only vital sign measurements
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "vitals",
+        sa.Column("id", sa.String(200), primary_key=True),
+        sa.Column("created_at", sa.DateTime, nullable=False),
+        sa.Column("updated_at", sa.DateTime, nullable=False),
+        sa.Column("patient_id", sa.String, sa.ForeignKey("patients.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("kind", sa.String(20), nullable=False),
+        sa.Column("value", sa.Float, nullable=False),
+        sa.Column("measured_at", sa.DateTime, nullable=False),
+        sa.UniqueConstraint("id", name="vitals_id_key"),
+    )
+    op.create_index(
+        "ix_vitals_series", "vitals", ["patient_id", "kind", "measured_at"],
+        postgresql_include=["value"],
+    )
+
+    # the height and weight on file become each patient's first measurements.
+    # ids are built from md5 rather than gen_random_uuid(), which needs
+    # Postgres 13 or pgcrypto. users.updated_at is the app hosts' local time
+    # and measured_at naive UTC; the hosts are taken to share the session's
+    # TimeZone (run with PGTZ set to theirs if the database's differs)
+    op.execute(
+        """
+        INSERT INTO vitals (id, created_at, updated_at, patient_id, kind, value, measured_at)
+        SELECT md5(random()::text || clock_timestamp()::text)::uuid::text, now(), now(),
+               p.id, v.kind, v.value,
+               u.updated_at AT TIME ZONE current_setting('TimeZone') AT TIME ZONE 'UTC'
+        FROM patients p
+        JOIN users u ON u.id = p.id
+        CROSS JOIN LATERAL (VALUES ('weight', p.weight), ('height', p.height)) AS v(kind, value)
+        WHERE v.value IS NOT NULL
+        """
+    )
+
+
+def downgrade():
+    op.drop_table("vitals")
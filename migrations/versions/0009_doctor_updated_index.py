@@ -0,0 +1,30 @@
+"""partial index on users.updated_at for doctors, polled by the search index
+
+Built CONCURRENTLY so the users table stays writable while the migration runs.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_users_doctor_updated", "users", ["updated_at"],
+            postgresql_where=sa.text("role = 'doctor'"), postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_users_doctor_updated", table_name="users", postgresql_concurrently=True
+        )
@@ -0,0 +1,40 @@
+"""stamp token revocations on the database clock
+
+Processes poll token revocations past a watermark. users.updated_at is
+stamped by the app hosts' clocks, which may disagree, so revocations get a
+column of their own that only the database clock writes.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("users", sa.Column("tokens_revoked_at", sa.DateTime, nullable=True))
+    # every process loads all revocations at startup; stamping the existing
+    # ones now also makes running processes re-read them once
+    op.execute("UPDATE users SET tokens_revoked_at = now() WHERE token_version > 0")
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_users_token_revoked", table_name="users", postgresql_concurrently=True)
+        op.create_index(
+            "ix_users_token_revoked", "users", ["tokens_revoked_at"],
+            postgresql_where=sa.text("token_version > 0"), postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_users_token_revoked", table_name="users", postgresql_concurrently=True)
+        op.create_index(
+            "ix_users_token_revoked", "users", ["updated_at"],
+            postgresql_where=sa.text("token_version > 0"), postgresql_concurrently=True,
+        )
+    op.drop_column("users", "tokens_revoked_at")
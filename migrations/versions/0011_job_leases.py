@@ -0,0 +1,25 @@
+"""job lease tokens
+
+A claim stamps its jobs with a lease token and a worker only records the
+outcome of a job it still holds, so a worker outliving JOB_LEASE_SECONDS
+cannot delete or reset a job another worker has since claimed.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("jobs", sa.Column("lease", sa.String(36), nullable=True))
+
+
+def downgrade():
+    op.drop_column("jobs", "lease")
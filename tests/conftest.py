@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+shared fixtures: the app served on an in-memory SQLite database
+
+Only the tables the tested routes touch are created, and the lifespan is
+not entered, so no Postgres, job worker or poller is needed.
+"""
+import os
+import tempfile
+
+# required settings, set before the app reads them
+for name, value in {
+    "DB_USER": "test",
+    "DB_PASSWORD": "test",
+    "DB_NAME": "test",
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "JWT_SECRET_KEY": "test-secret",
+    "JWT_ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "15",
+    "REFRESH_TOKEN_EXPIRE_MINUTES": "60",
+    "BLOB_STORE_PATH": tempfile.mkdtemp(prefix="astrahealth-media-"),
+}.items():
+    os.environ.setdefault(name, value)
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from app.engine.db_storage import DBStorage  # noqa: E402
+from app.main import create_app  # noqa: E402
+from app.models.base_model import Base  # noqa: E402
+from app.models.emergency_contact import EmergencyContact  # noqa: E402
+from app.models.patient import Patient  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.utils.auth import create_access_token, principal_cache, token_claims  # noqa: E402
+
+
+@pytest.fixture
+def db_engine():
+    engine = create_engine(
+        "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(
+        engine, tables=[User.__table__, Patient.__table__, EmergencyContact.__table__]
+    )
+    DBStorage.engine = engine
+    DBStorage.session_factory = sessionmaker(bind=engine, expire_on_commit=False)
+    yield engine
+    DBStorage.engine = DBStorage.session_factory = None
+    engine.dispose()
+    principal_cache.clear()
+
+
+@pytest.fixture
+def client(db_engine):
+    return TestClient(create_app())
+
+
+@pytest.fixture
+def patient(db_engine):
+    session = DBStorage.session_factory()
+    row = Patient(
+        first_name="Ada",
+        last_name="Obi",
+        phone="08012345678",
+        email="ada@example.com",
+        password_hash="not-a-real-hash",
+        role="patient",
+        medical_history="asthma",
+    )
+    session.add(row)
+    session.commit()
+    session.close()
+    return row
+
+
+@pytest.fixture
+def patient_cookies(patient):
+    return {"access_token": f"Bearer {create_access_token(token_claims(patient))}"}
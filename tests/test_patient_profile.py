@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""the cached principal survives a rejected profile update"""
+
+
+def test_profile_after_rejected_image(client, patient_cookies):
+    # caches the principal
+    assert client.get("/v1/patient/profile", cookies=patient_cookies).status_code == 200
+
+    response = client.patch(
+        "/v1/patient/update_profile",
+        json={"medical_history": "never saved", "image": "data:image/png;base64,@@@"},
+        cookies=patient_cookies,
+    )
+    assert response.status_code == 400
+
+    response = client.get("/v1/patient/profile", cookies=patient_cookies)
+    assert response.status_code == 200
+    assert response.json()["medical_history"] == "asthma"
+
+
+def test_profile_after_unsupported_image(client, patient_cookies):
+    response = client.patch(
+        "/v1/patient/update_profile",
+        json={"medical_history": "never saved", "image": "aGVsbG8gd29ybGQ="},
+        cookies=patient_cookies,
+    )
+    assert response.status_code == 400
+
+    response = client.get("/v1/patient/profile", cookies=patient_cookies)
+    assert response.status_code == 200
+    assert response.json()["medical_history"] == "asthma"